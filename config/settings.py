@@ -170,5 +170,23 @@ LOGIN_URL = 'login'
 LOGOUT_REDIRECT_URL = 'login'
 
 
+# Pacote offline de índices (gerado por `manage.py pacote_indices exportar`), usado como
+# reserva quando a série não está no banco e a API do Banco Central está inacessível.
+GESTAO_INDICES_PACOTE = BASE_DIR / 'indices' / 'pacote_indices.bin'
+
+# Aquece as séries de índices mais usadas em memória ao subir cada worker (ver
+# gestao/services/indices/aquecimento.py). Desligado por padrão para não pesar em
+# comandos de gerenciamento; ative no ambiente dos workers web ou use
+# `manage.py aquecer_indices` antes de liberar o tráfego.
+GESTAO_AQUECER_INDICES = False
+
+# Cálculos com pelo menos este número de parcelas são divididos entre processos filhos
+# (fork), em GESTAO_CALCULO_PROCESSOS processos (padrão: um por núcleo). Desligado (None)
+# por padrão: o fork só é seguro em processos sem outras threads, e o motor recusa o
+# paralelismo quando encontra threads ativas (ver gestao/services/calculo.py). Ative em
+# comandos de gerenciamento ou workers síncronos, ex.: 2000.
+GESTAO_CALCULO_PARCELAS_PROCESSOS = None
+
+
 # Email Backend para Desenvolvimento
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
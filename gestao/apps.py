@@ -1,6 +1,7 @@
 # gestao/apps.py
 
 from django.apps import AppConfig
+from django.conf import settings
 from django.db.backends.signals import connection_created
 from unidecode import unidecode
 
@@ -24,4 +25,9 @@ class GestaoConfig(AppConfig):
         connection_created.connect(setup_sqlite_unaccent)
 
         # 2. Importa e registra os signals da aplicação. (Adicione esta linha)
-        import gestao.signals
\ No newline at end of file
+        import gestao.signals
+
+        # 3. Aquece os índices em memória (segundo plano), se configurado para os workers web.
+        if getattr(settings, 'GESTAO_AQUECER_INDICES', False):
+            from gestao.services.indices.aquecimento import aquecer_em_segundo_plano
+            aquecer_em_segundo_plano()
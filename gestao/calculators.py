@@ -1,10 +1,9 @@
 # gestao/calculators.py
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import date
-from dateutil.relativedelta import relativedelta
-import calendar
 
-from .services.indices.resolver import ServicoIndices
+from .services.nucleo_calculo import NucleoCalculo
+from .services.periodos import ano_mes
 
 def _q2(v: Decimal) -> Decimal:
     return Decimal(v).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -27,11 +26,19 @@ class CalculadoraMonetaria:
     """
     Motor de cálculo judicial com pró-rata mensal e SELIC diária composta.
     Espera fases com: ordem, indice, data_inicio, data_fim, juros_tipo, juros_taxa.
+    Os fatores de cada fase ficam guardados na instância: calcular várias parcelas
+    com as mesmas fases reaproveita os fatores já calculados.
     """
 
+    def __init__(self):
+        self._nucleo = NucleoCalculo()
+
     def calcular_fases(self, valor_original, fases):
         saldo_atual = Decimal(str(valor_original))
-        servico_indices = ServicoIndices()
+        # Busca cada índice uma única vez, no período que cobre todas as fases que o usam
+        for f in fases:
+            self._nucleo.adicionar((f.indice or '').strip(), f.data_inicio, f.data_fim)
+        self._nucleo.preparar()
         fases_resultados = []
 
         # Ordena fases por ordem declarada
@@ -45,54 +52,25 @@ class CalculadoraMonetaria:
             # ===================== CORREÇÃO MONETÁRIA (MENSAL) =====================
             # Se a fase NÃO é SELIC, aplica índice mensal pró-rata
             if 'SELIC' not in indice_nome_upper:
-                indices_periodo = servico_indices.get_indices_por_periodo(
-                    indice_nome, fase.data_inicio, fase.data_fim
-                )
-                data_corrente = fase.data_inicio
-
-                while data_corrente <= fase.data_fim:
-                    chave = data_corrente.strftime('%Y-%m')
-                    bruto = indices_periodo.get(chave, Decimal('0'))
+                for mes, bruto in self._nucleo.variacoes_mensais(indice_nome, fase.data_inicio, fase.data_fim):
                     fator_mensal = _norm_mensal(bruto)  # fração mensal
-
-                    dias_mes = calendar.monthrange(data_corrente.year, data_corrente.month)[1]
-
-                    # Pró-rata de dias
-                    if data_corrente.year == fase.data_inicio.year and data_corrente.month == fase.data_inicio.month:
-                        dias_aplic = dias_mes - fase.data_inicio.day + 1
-                    else:
-                        dias_aplic = dias_mes
-                    if data_corrente.year == fase.data_fim.year and data_corrente.month == fase.data_fim.month:
-                        if fase.data_inicio.strftime('%Y-%m') == fase.data_fim.strftime('%Y-%m'):
-                            dias_aplic = (fase.data_fim - fase.data_inicio).days + 1
-                        else:
-                            dias_aplic = fase.data_fim.day
-
-                    fator_pro_rata = (fator_mensal / dias_mes) * dias_aplic
+                    fator_pro_rata = (fator_mensal / mes.dias_no_mes) * mes.dias_aplicados
                     valor_correcao = saldo_atual * fator_pro_rata
+                    ano, mes_num = ano_mes(mes.ordinal)
 
                     memoria_fase.append({
-                        'descricao': f"Correção {indice_nome} ({data_corrente.strftime('%m/%Y')}, {dias_aplic} de {dias_mes} dias)",
+                        'descricao': f"Correção {indice_nome} ({mes_num:02d}/{ano}, {mes.dias_aplicados} de {mes.dias_no_mes} dias)",
                         'valor': _q2(valor_correcao)
                     })
 
                     saldo_atual += valor_correcao
-                    data_corrente = (data_corrente.replace(day=1) + relativedelta(months=1))
 
             # ===================== JUROS / SELIC (DIÁRIA) ==========================
             if 'SELIC' in indice_nome_upper:
-                # Usa EXATAMENTE o rótulo selecionado (ex.: 'SELIC (Taxa diária)') ao consultar o provider
-                indices_selic = servico_indices.get_indices_por_periodo(
-                    indice_nome, fase.data_inicio, fase.data_fim
-                )
-                fator_acum = Decimal('1.0')
-                d = fase.data_inicio
-                while d <= fase.data_fim:
-                    # Providers diários usam chave ISO 'YYYY-MM-DD'
-                    taxa_dia = Decimal(str(indices_selic.get(d.isoformat(), 0)))
-                    # Série SGS 11/… vem em PERCENTUAL ao dia -> /100
-                    fator_acum *= (Decimal('1.0') + (taxa_dia / Decimal('100')))
-                    d += relativedelta(days=1)
+                # Usa EXATAMENTE o rótulo selecionado (ex.: 'SELIC (Taxa diária)') ao consultar o provider.
+                # Série SGS vem em PERCENTUAL ao dia; o fator Π (1 + taxa/100) do período
+                # sai da tabela acumulada por dia (dias sem taxa valem fator 1)
+                fator_acum = self._nucleo.fator(indice_nome, 'daily_rate', fase.data_inicio, fase.data_fim).fator
 
                 valor_corrigido = valor_inicial_fase * fator_acum
                 juros = valor_corrigido - valor_inicial_fase
@@ -136,5 +114,6 @@ class CalculadoraMonetaria:
             'resumo': {
                 'valor_final': _q2(saldo_atual)
             },
-            'fases_resultados': fases_resultados
+            'fases_resultados': fases_resultados,
+            'memo_fatores': self._nucleo.memo.como_dict(),
         }
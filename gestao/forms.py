@@ -18,6 +18,7 @@ from .models import (
     LancamentoFinanceiro, CalculoJudicial, CalculoLancamento, CalculoCorrecao, CalculoJuros
 )
 from .models import CalculoJudicial, FaseCalculo
+from .services.calendario import calcular_prazo
 
 # Ferramenta do Django para criar conjuntos de formulários (formsets) a partir de
 # um modelo, essencial para editar múltiplos objetos relacionados em uma única tela.
@@ -385,6 +386,17 @@ class MovimentacaoForm(forms.ModelForm):
                     code='prazo_conflitante'
                 )
             )
+        elif dias_prazo and cleaned_data.get('data_intimacao'):
+            # Prazo em dias: calcula início e fim no servidor, com feriados nacionais e forenses.
+            tipo = cleaned_data.get('tipo_movimentacao')
+            tipo_contagem = tipo.tipo_contagem_prazo if tipo else 'UTEIS'
+            try:
+                inicio, fim = calcular_prazo(cleaned_data['data_intimacao'], dias_prazo, tipo_contagem)
+            except ValueError as e:
+                self.add_error('dias_prazo', str(e))
+            else:
+                self.instance.data_inicio_prazo = inicio
+                cleaned_data['data_prazo_final'] = fim
         return cleaned_data
 
 
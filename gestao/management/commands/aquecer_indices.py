@@ -0,0 +1,29 @@
+# gestao/management/commands/aquecer_indices.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestao.services.indices import aquecimento
+
+
+class Command(BaseCommand):
+    help = (
+        "Carrega em memória as séries de índices mais usadas e as tabelas estáticas, informando "
+        "quanto tempo levou. Pensado para rodar antes de liberar o tráfego após um deploy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('indices', nargs='*',
+                            help="Chaves do catálogo (ex.: IPCA SELIC_DIARIA). Padrão: séries quentes + tabelas estáticas.")
+
+    def handle(self, *args, **options):
+        resultado = aquecimento.aquecer(options['indices'] or None)
+
+        for chave, n in resultado.observacoes.items():
+            self.stdout.write(f"{chave}: {n} observação(ões) em memória.")
+        for chave, motivo in resultado.erros.items():
+            self.stderr.write(self.style.ERROR(f"{chave}: falha no aquecimento: {motivo}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Aquecimento concluído em {resultado.segundos:.2f}s ({len(resultado.observacoes)} índice(s))."
+        ))
+        if resultado.erros:
+            raise CommandError(f"{len(resultado.erros)} índice(s) não puderam ser aquecidos.")
@@ -0,0 +1,51 @@
+# gestao/management/commands/metricas_indices.py
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from gestao.services.indices import aquecimento, metricas
+from gestao.services.indices.catalog import INDICE_CATALOG
+
+
+class Command(BaseCommand):
+    help = (
+        "Mostra o estado das séries no armazenamento local (última observação, idade, tamanho) e as "
+        "métricas dos provedores de índices deste processo. Com --aquecer, mede antes uma carga "
+        "completa das séries quentes. As métricas dos workers web ficam em /api/indices/metricas/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aquecer', action='store_true',
+                            help="Carrega as séries quentes e as tabelas estáticas antes de mostrar as métricas.")
+        parser.add_argument('--json', action='store_true', help="Saída em JSON.")
+
+    def handle(self, *args, **options):
+        if options['aquecer']:
+            aquecimento.aquecer()
+        dados = {"armazenamento": metricas.estado_armazenamento(), **metricas.snapshot()}
+
+        if options['json']:
+            self.stdout.write(json.dumps(dados, indent=2, ensure_ascii=False))
+            return
+
+        chaves = {meta['params']['serie_id']: chave for chave, meta in INDICE_CATALOG.items()
+                  if meta.get('provider') == 'BacenSGSProvider'}
+        self.stdout.write(self.style.MIGRATE_HEADING("Armazenamento local"))
+        for serie_id, estado in dados["armazenamento"].items():
+            self.stdout.write(
+                f"  {chaves.get(serie_id, '?')} (SGS {serie_id}): {estado['observacoes']} observação(ões), "
+                f"última {estado['ultima_observacao'] or '-'} ({estado['idade_dias']} dia(s)), "
+                f"sincronizada em {estado['sincronizado_em'] or 'nunca'}"
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Provedores (desde {dados['desde']})"))
+        for nome, provider in sorted(dados["providers"].items()):
+            self.stdout.write(f"  {nome}")
+            for contador, valor in sorted(provider["contadores"].items()):
+                self.stdout.write(f"    {contador}: {valor}")
+            for metrica, h in sorted(provider["histogramas"].items()):
+                self.stdout.write(
+                    f"    {metrica}: n={h['contagem']} média={h['media']}s p50<={h['p50']}s "
+                    f"p95<={h['p95']}s máx={h['maximo']}s"
+                )
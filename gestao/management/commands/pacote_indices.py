@@ -0,0 +1,67 @@
+# gestao/management/commands/pacote_indices.py
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestao.services import revisoes
+from gestao.services.indices import pacote, store
+from gestao.services.indices.catalog import INDICE_CATALOG
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta/importa as séries do armazenamento local de índices como pacote offline "
+        "(json, csv ou bin, com checksum SHA-256), para servidores sem acesso à API do Banco Central."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('acao', choices=['exportar', 'importar'])
+        parser.add_argument('caminho', help="Arquivo do pacote (o formato é deduzido da extensão).")
+        parser.add_argument('--formato', choices=pacote.FORMATOS, help="Força o formato do pacote.")
+        parser.add_argument('--indices', nargs='*', default=None,
+                            help="Chaves do catálogo a exportar (ex.: IPCA SELIC_DIARIA). Padrão: todas.")
+
+    def handle(self, *args, **options):
+        caminho = Path(options['caminho'])
+        try:
+            if options['acao'] == 'exportar':
+                self._exportar(caminho, options['formato'], options['indices'])
+            else:
+                self._importar(caminho, options['formato'])
+        except (OSError, pacote.PacoteInvalido) as e:
+            raise CommandError(str(e))
+
+    def _serie_ids(self, chaves):
+        serie_ids = []
+        for chave in chaves:
+            meta = INDICE_CATALOG.get(chave)
+            if not meta:
+                raise CommandError(f"Índice desconhecido: {chave}")
+            if meta.get('provider') != 'BacenSGSProvider':
+                raise CommandError(f"{chave}: não é uma série do SGS.")
+            serie_ids.append(meta['params']['serie_id'])
+        return serie_ids
+
+    def _exportar(self, caminho, formato, chaves):
+        series = pacote.series_armazenadas(self._serie_ids(chaves) if chaves else None)
+        if not series:
+            raise CommandError("Nenhuma observação armazenada para exportar. Rode `sincronizar_indices` antes.")
+        tamanho = pacote.escrever_pacote(caminho, series, formato)
+        total = sum(len(pares) for pares in series.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(series)} série(s), {total} observação(ões) exportadas para {caminho} ({tamanho} bytes)."
+        ))
+
+    def _importar(self, caminho, formato):
+        series = pacote.ler_pacote(caminho, formato)
+        # Valores revisados pelo pacote só marcam os rascunhos: o recálculo é feito aqui
+        with revisoes.recalculo_no_chamador():
+            total = pacote.gravar_series(series)
+        store.limpar_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(series)} série(s), {total} observação(ões) importadas de {caminho}."
+        ))
+        recalculados = revisoes.recalcular_pendentes()
+        if recalculados:
+            self.stdout.write(f"{recalculados} rascunho(s) recalculado(s) após revisão de índices.")
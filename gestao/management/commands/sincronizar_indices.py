@@ -0,0 +1,53 @@
+# gestao/management/commands/sincronizar_indices.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestao.services import revisoes
+from gestao.services.indices import store
+from gestao.services.indices.catalog import INDICE_CATALOG
+from gestao.services.indices.providers import BacenSGSProvider
+
+
+class Command(BaseCommand):
+    help = (
+        "Sincroniza incrementalmente as séries do SGS (Banco Central) no armazenamento local. "
+        "Pensado para rodar diariamente (cron) antes do expediente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('indices', nargs='*', help="Chaves do catálogo (ex.: IPCA SELIC_DIARIA). Padrão: todas.")
+        parser.add_argument('--forcar', action='store_true',
+                            help="Sincroniza mesmo que a série já tenha sido atualizada hoje.")
+
+    def handle(self, *args, **options):
+        chaves = options['indices'] or [
+            k for k, meta in INDICE_CATALOG.items() if meta.get('provider') == 'BacenSGSProvider'
+        ]
+        provider = BacenSGSProvider()
+        falhas = 0
+
+        with revisoes.recalculo_no_chamador():
+            for chave in chaves:
+                meta = INDICE_CATALOG.get(chave)
+                if not meta:
+                    raise CommandError(f"Índice desconhecido: {chave}")
+                if meta.get('provider') != 'BacenSGSProvider':
+                    self.stdout.write(f"{chave}: ignorado (não é uma série do SGS).")
+                    continue
+
+                serie_id = meta['params']['serie_id']
+                try:
+                    novas = store.sincronizar_serie(serie_id, provider._fetch_from_api, forcar=options['forcar'])
+                except Exception as e:
+                    falhas += 1
+                    self.stderr.write(self.style.ERROR(f"{chave} (SGS {serie_id}): falha na sincronização: {e}"))
+                    continue
+                self.stdout.write(self.style.SUCCESS(f"{chave} (SGS {serie_id}): {novas} observação(ões) nova(s)."))
+
+        store.limpar_cache()
+        # Rascunhos afetados por revisões: recalculados aqui, pois o processo do comando termina em seguida.
+        recalculados = revisoes.recalcular_pendentes()
+        if recalculados:
+            self.stdout.write(f"{recalculados} rascunho(s) recalculado(s) após revisão de índices.")
+        if falhas:
+            raise CommandError(f"{falhas} série(s) não puderam ser sincronizadas.")
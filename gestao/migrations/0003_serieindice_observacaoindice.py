@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestao', '0002_calculoparcela_calculofaixa_calculorascunho_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieIndice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serie_id', models.PositiveIntegerField(unique=True, verbose_name='Código da Série (SGS)')),
+                ('ultima_observacao', models.DateField(blank=True, null=True, verbose_name='Data da Última Observação')),
+                ('sincronizado_em', models.DateTimeField(blank=True, null=True, verbose_name='Última Sincronização')),
+            ],
+            options={
+                'verbose_name': 'Série de Índice',
+                'verbose_name_plural': 'Séries de Índices',
+                'ordering': ['serie_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ObservacaoIndice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('valor', models.DecimalField(decimal_places=8, max_digits=20)),
+                ('serie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='observacoes', to='gestao.serieindice')),
+            ],
+            options={
+                'verbose_name': 'Observação de Índice',
+                'verbose_name_plural': 'Observações de Índices',
+                'ordering': ['serie', 'data'],
+                'constraints': [models.UniqueConstraint(fields=('serie', 'data'), name='unique_observacao_serie_data')],
+            },
+        ),
+    ]
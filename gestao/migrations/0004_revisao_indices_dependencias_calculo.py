@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestao', '0003_serieindice_observacaoindice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calculorascunho',
+            name='resultado_desatualizado',
+            field=models.BooleanField(default=False, verbose_name='Resultado Desatualizado'),
+        ),
+        migrations.AddField(
+            model_name='serieindice',
+            name='versao',
+            field=models.PositiveIntegerField(default=0, help_text='Incrementada a cada revisão de observações já publicadas.', verbose_name='Versão'),
+        ),
+        migrations.CreateModel(
+            name='RevisaoIndice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('versao', models.PositiveIntegerField(verbose_name='Versão')),
+                ('data_inicio', models.DateField(verbose_name='Primeira Observação Revisada')),
+                ('data_fim', models.DateField(verbose_name='Última Observação Revisada')),
+                ('observacoes', models.PositiveIntegerField(verbose_name='Observações Revisadas')),
+                ('detectada_em', models.DateTimeField(auto_now_add=True)),
+                ('serie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisoes', to='gestao.serieindice')),
+            ],
+            options={
+                'verbose_name': 'Revisão de Índice',
+                'verbose_name_plural': 'Revisões de Índices',
+                'ordering': ['serie', 'versao'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CalculoDependenciaIndice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indice', models.CharField(max_length=100, verbose_name='Índice (chave do catálogo)')),
+                ('data_inicio', models.DateField()),
+                ('data_fim', models.DateField()),
+                ('rascunho', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependencias_indices', to='gestao.calculorascunho')),
+            ],
+            options={
+                'verbose_name': 'Dependência de Índice do Cálculo',
+                'verbose_name_plural': 'Dependências de Índices dos Cálculos',
+                'indexes': [models.Index(fields=['indice', 'data_inicio', 'data_fim'], name='dependencia_indice_periodo')],
+            },
+        ),
+    ]
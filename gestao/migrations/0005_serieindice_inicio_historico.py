@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestao', '0004_revisao_indices_dependencias_calculo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serieindice',
+            name='inicio_historico',
+            field=models.DateField(blank=True, help_text='Data a partir da qual a série foi buscada na API.', null=True, verbose_name='Início do Histórico Local'),
+        ),
+    ]
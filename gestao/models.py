@@ -732,6 +732,8 @@ class CalculoRascunho(models.Model):
 
     # Armazena o último resultado gerado para fácil visualização
     ultimo_resultado_json = models.JSONField(encoder=DecimalEncoder, null=True, blank=True)
+    # Marcado quando uma série usada pelo resultado é revisada; o recálculo em lote desmarca.
+    resultado_desatualizado = models.BooleanField(default=False, verbose_name="Resultado Desatualizado")
 
     usuario_criacao = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True,
                                         related_name='calculos_criados')
@@ -747,6 +749,25 @@ class CalculoRascunho(models.Model):
         return f"Cálculo '{self.descricao}' para Processo {self.processo_id or 'avulso'}"
 
 
+class CalculoDependenciaIndice(models.Model):
+    """
+    Série e período de que o último resultado de um rascunho depende. Permite localizar,
+    por consulta indexada, apenas os rascunhos afetados pela revisão de uma série.
+    """
+    rascunho = models.ForeignKey(CalculoRascunho, on_delete=models.CASCADE, related_name='dependencias_indices')
+    indice = models.CharField(max_length=100, verbose_name="Índice (chave do catálogo)")
+    data_inicio = models.DateField()
+    data_fim = models.DateField()
+
+    class Meta:
+        verbose_name = "Dependência de Índice do Cálculo"
+        verbose_name_plural = "Dependências de Índices dos Cálculos"
+        indexes = [models.Index(fields=['indice', 'data_inicio', 'data_fim'], name='dependencia_indice_periodo')]
+
+    def __str__(self):
+        return f"{self.indice} de {self.data_inicio} a {self.data_fim}"
+
+
 class CalculoParcela(models.Model):
     """
     Representa uma 'parcela' ou 'item de débito/crédito' dentro de um cálculo.
@@ -811,3 +832,69 @@ class CalculoExtra(models.Model):
 
     def __str__(self):
         return f"{self.get_tipo_display()}: {self.descricao}"
+
+
+# ==============================================================================
+# SEÇÃO 7: SÉRIES DE ÍNDICES ECONÔMICOS (ARMAZENAMENTO LOCAL)
+# ==============================================================================
+
+class SerieIndice(models.Model):
+    """
+    Cabeçalho de uma série temporal do SGS (Banco Central) armazenada localmente.
+    Guarda a data da última observação e da última sincronização, o que permite
+    uma atualização incremental (apenas observações novas) no máximo uma vez por dia.
+    """
+    serie_id = models.PositiveIntegerField(unique=True, verbose_name="Código da Série (SGS)")
+    ultima_observacao = models.DateField(null=True, blank=True, verbose_name="Data da Última Observação")
+    sincronizado_em = models.DateTimeField(null=True, blank=True, verbose_name="Última Sincronização")
+    versao = models.PositiveIntegerField(default=0, verbose_name="Versão",
+                                         help_text="Incrementada a cada revisão de observações já publicadas.")
+    inicio_historico = models.DateField(null=True, blank=True, verbose_name="Início do Histórico Local",
+                                        help_text="Data a partir da qual a série foi buscada na API.")
+
+    class Meta:
+        verbose_name = "Série de Índice"
+        verbose_name_plural = "Séries de Índices"
+        ordering = ['serie_id']
+
+    def __str__(self):
+        return f"Série SGS {self.serie_id}"
+
+
+class ObservacaoIndice(models.Model):
+    """Uma observação (data, valor) de uma série de índice armazenada localmente."""
+    serie = models.ForeignKey(SerieIndice, on_delete=models.CASCADE, related_name='observacoes')
+    data = models.DateField()
+    valor = models.DecimalField(max_digits=20, decimal_places=8)
+
+    class Meta:
+        verbose_name = "Observação de Índice"
+        verbose_name_plural = "Observações de Índices"
+        ordering = ['serie', 'data']
+        constraints = [
+            models.UniqueConstraint(fields=['serie', 'data'], name='unique_observacao_serie_data'),
+        ]
+
+    def __str__(self):
+        return f"{self.serie.serie_id} {self.data:%d/%m/%Y}: {self.valor}"
+
+
+class RevisaoIndice(models.Model):
+    """
+    Revisão de observações já armazenadas de uma série (ex.: IBGE/FGV republicando
+    meses anteriores). Cada revisão gera uma nova versão da série.
+    """
+    serie = models.ForeignKey(SerieIndice, on_delete=models.CASCADE, related_name='revisoes')
+    versao = models.PositiveIntegerField(verbose_name="Versão")
+    data_inicio = models.DateField(verbose_name="Primeira Observação Revisada")
+    data_fim = models.DateField(verbose_name="Última Observação Revisada")
+    observacoes = models.PositiveIntegerField(verbose_name="Observações Revisadas")
+    detectada_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Revisão de Índice"
+        verbose_name_plural = "Revisões de Índices"
+        ordering = ['serie', 'versao']
+
+    def __str__(self):
+        return f"Série SGS {self.serie.serie_id} v{self.versao}: {self.data_inicio:%d/%m/%Y} a {self.data_fim:%d/%m/%Y}"
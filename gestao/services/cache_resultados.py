@@ -0,0 +1,79 @@
+# gestao/services/cache_resultados.py
+
+"""
+Cache dos resultados de simulação, endereçado pelo conteúdo do pedido.
+
+As pré-visualizações do wizard repetem o mesmo payload várias vezes seguidas. Cada
+resultado fica guardado sob o hash SHA-256 do payload canônico (JSON com chaves
+ordenadas) e a geração dos dados de índices do processo (`store.geracao`): quando
+uma série recebe observações novas ou revisadas, a geração muda e os resultados
+anteriores deixam de ser encontrados, sem invalidação explícita. O mesmo vale para as
+tabelas estáticas (`tabela_compilada.geracao`), conferidas pelo `stat` dos CSVs já
+abertos a cada consulta ao cache. A data local também
+faz parte da chave: o resultado traz campos que dependem do dia (idade das séries em
+`frescor_indices`, datas finais padrão "hoje").
+
+    resultados = resultado_em_cache("simular", payload, executar_calculo)
+
+O cache é por processo, limitado a CACHE_MAX_RESULTADOS entradas (LRU). Quem chama
+recebe sempre uma cópia: resultados guardados nunca são alterados.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Tuple
+
+from django.utils import timezone
+
+from ..encoders import DecimalEncoder
+from .indices import metricas, store, tabela_compilada
+
+# Quantidade máxima de resultados mantidos em memória por processo.
+CACHE_MAX_RESULTADOS = 256
+
+_cache: "OrderedDict[Tuple[str, int, int, date], Any]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def hash_payload(escopo: str, payload: Any) -> str:
+    """SHA-256 do payload canônico: mesma estrutura e valores, mesmo hash (a ordem das chaves não importa)."""
+    canonico = json.dumps([escopo, payload], sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+                          cls=DecimalEncoder)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def resultado_em_cache(escopo: str, payload: Any, calcular: Callable[[Any], Any]) -> Any:
+    """
+    Resultado de `calcular(payload)`, reaproveitado se o mesmo payload já foi calculado
+    com os mesmos dados de índices no mesmo dia. `escopo` separa motores com payloads parecidos.
+    Exceções não são guardadas.
+    """
+    # A geração é lida antes do cálculo: se os dados mudarem durante ele, o resultado
+    # fica sob a geração antiga e não é servido com os dados novos.
+    chave = (hash_payload(escopo, payload), store.geracao(), tabela_compilada.geracao(), timezone.localdate())
+    with _cache_lock:
+        guardado = _cache.get(chave)
+        if guardado is not None:
+            _cache.move_to_end(chave)
+    if guardado is not None:
+        metricas.incrementar("cache_resultados", "acertos")
+        return copy.deepcopy(guardado)
+
+    metricas.incrementar("cache_resultados", "falhas")
+    resultado = calcular(copy.deepcopy(payload))
+    with _cache_lock:
+        _cache[chave] = copy.deepcopy(resultado)
+        _cache.move_to_end(chave)
+        while len(_cache) > CACHE_MAX_RESULTADOS:
+            _cache.popitem(last=False)
+    return resultado
+
+
+def limpar() -> None:
+    """Descarta os resultados guardados (útil em testes)."""
+    with _cache_lock:
+        _cache.clear()
@@ -1,58 +1,137 @@
 # gestao/services/calculo.py
 
-import calendar
+import copy
 import logging
-from datetime import date
+import multiprocessing
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
-from dateutil.relativedelta import relativedelta
 
-from .indices.catalog import get_indice_info
-from .indices.providers import PROVIDERS_MAP
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from .indices import store
+from .indices.catalog import get_indice_info, serie_sgs
+from .indices.fatores import ordinal_mes
+from .indices.providers import get_provider
+from .nucleo_calculo import NucleoCalculo
+from .periodos import mes_periodo
 
 logger = logging.getLogger(__name__)
 
+# A partir de quantas parcelas com o mesmo layout de faixas os fatores são calculados uma vez só
+MIN_PARCELAS_LOTE = 8
+
+# A partir de quantas parcelas o cálculo é dividido entre processos
+# (`settings.GESTAO_CALCULO_PARCELAS_PROCESSOS`; None, o padrão, desliga). O número de
+# processos é `settings.GESTAO_CALCULO_PROCESSOS` ou a quantidade de núcleos.
+MIN_PARCELAS_PROCESSOS = None
+BLOCOS_POR_PROCESSO = 4
+
+# Motor cujos blocos os processos filhos avaliam (herdado por fork; ver `_avaliar_em_processos`).
+# Um cálculo em paralelo por vez no processo, para que cada pool herde o próprio motor.
+_motor_em_paralelo = None
+_paralelo_lock = threading.Lock()
+
+
+def _iniciar_processo():
+    # As conexões de banco herdadas pertencem ao processo pai: são esquecidas, sem fechar.
+    for conexao in connections.all(initialized_only=True):
+        conexao.connection = None
+
+
+def _avaliar_bloco(intervalo):
+    return _motor_em_paralelo._avaliar_bloco(*intervalo)
+
 
 class CalculoEngine:
     """
     Motor de cálculo judicial robusto. Opera com dados pré-validados e tipados.
     """
 
-    def __init__(self, payload: dict):
+    def __init__(self, payload: dict, checkpoints=None, gerar_checkpoints: bool = False):
+        """
+        `checkpoints`: os do resultado anterior do mesmo cálculo (`results['checkpoints']`),
+        para retomar cada parcela de onde parou; `gerar_checkpoints` grava os do novo resultado.
+        """
         self.payload = payload
+        self._checkpoints = list(checkpoints or [])
+        self._gerar_checkpoints = gerar_checkpoints or bool(checkpoints)
         self.results = {
             'parcelas': [],
             'resumo': {
                 'principal': Decimal('0.0'), 'correcao': Decimal('0.0'), 'juros': Decimal('0.0'),
                 'multas': Decimal('0.0'), 'honorarios': Decimal('0.0')
             },
-            'memoria_calculo': {}
+            'memoria_calculo': {},
+            'avisos': [],
+        }
+        self._nucleo = NucleoCalculo(self._buscar_indices)
+        self._lotes = {}
+        self._versoes = None
+
+    def _buscar_indices(self, indice, data_inicio, data_fim):
+        info_indice = get_indice_info(indice)
+        provider = get_provider(info_indice['provider'])
+        return provider.get_indices(
+            inicio=data_inicio, fim=data_fim, params=info_indice.get('params', {}),
+            index_type=info_indice.get('type')
+        )
+
+    def _planejar_indices(self):
+        """Busca, uma única vez por índice, o período que cobre todas as faixas do payload."""
+        for parcela_data in self.payload.get('parcelas', []):
+            for faixa in parcela_data.get('faixas', []) or []:
+                if isinstance(faixa, dict):
+                    self._nucleo.adicionar(faixa.get('indice'), faixa.get('data_inicio'), faixa.get('data_fim'))
+        # Séries e períodos de que o resultado depende (ver services/revisoes.py)
+        self.results['dependencias_indices'] = {
+            chave: [inicio.isoformat(), fim.isoformat()] for chave, (inicio, fim) in self._nucleo.periodos.items()
         }
+        if self._gerar_checkpoints:
+            self._versoes = self._versoes_series(self._nucleo.periodos)
+        return self._nucleo.preparar()
+
+    @staticmethod
+    def _versoes_series(chaves):
+        """
+        {indice: versão da série do SGS que o alimenta}, lida antes da busca dos índices,
+        ou None se o armazenamento local estiver indisponível (sem checkpoints).
+        """
+        series = {chave: serie_sgs(chave) for chave in chaves}
+        try:
+            versoes = store.versoes(s for s in series.values() if s is not None)
+        except DatabaseError as e:
+            logger.warning(f"Versões das séries indisponíveis ({e}); o cálculo não gera checkpoints.")
+            return None
+        return {chave: versoes.get(serie, 0) for chave, serie in series.items() if serie is not None}
 
     def run(self):
         """Orquestra a execução do cálculo de forma segura."""
-        for parcela_data in self.payload.get('parcelas', []):
-            try:
-                resultado_parcela = self._calcular_parcela(parcela_data)
-                self.results['parcelas'].append(resultado_parcela)
+        self._planejar_indices()
+        self._preparar_lotes()
+        parcelas = self.payload.get('parcelas', [])
+        avaliadas = self._avaliar_em_processos(parcelas)
+        if avaliadas is None:
+            avaliadas = [self._avaliar_parcela(i, parcela_data) for i, parcela_data in enumerate(parcelas)]
+
+        if self._gerar_checkpoints:
+            self.results['checkpoints'] = []
+        for resultado_parcela, checkpoint, sucesso in avaliadas:
+            self.results['parcelas'].append(resultado_parcela)
+            if sucesso:
                 # Acumula apenas se o cálculo foi bem-sucedido
                 self.results['resumo']['principal'] += resultado_parcela['valor_original']
                 self.results['resumo']['correcao'] += resultado_parcela['correcao_total']
                 self.results['resumo']['juros'] += resultado_parcela['juros_total']
-            except Exception as e:
-                descricao_erro = parcela_data.get('descricao', 'Desconhecida')
-                logger.error(f"Erro CRÍTICO ao calcular parcela '{descricao_erro}': {e}", exc_info=True)
-                valor_original_fallback = parcela_data.get('valor_original', Decimal('0.0'))
-                self.results['parcelas'].append({
-                    'descricao': f"ERRO: {descricao_erro}",
-                    'valor_original': valor_original_fallback,
-                    'data_evento': parcela_data.get('data_evento').isoformat() if isinstance(
-                        parcela_data.get('data_evento'), date) else None,
-                    'correcao_total': Decimal('0.0'), 'juros_total': Decimal('0.0'),
-                    'valor_final': valor_original_fallback,
-                    'memoria_detalhada': [{'error': f"ERRO NO CÁLCULO: {e}"}]
-                })
+            if self._gerar_checkpoints:
+                self.results['checkpoints'].append(checkpoint)
 
         self._calcular_extras()
+        self.results['memo_fatores'] = self._nucleo.memo.como_dict()
 
         # Cálculo explícito e seguro do total geral
         resumo = self.results['resumo']
@@ -60,93 +139,176 @@ class CalculoEngine:
             'honorarios']
 
         self._gerar_memoria_de_calculo_estruturada()
+        # Atualização das séries usadas (última observação, idade), para sinalizar dados desatualizados
+        self.results['frescor_indices'] = self._nucleo.frescor()
         return self.results
 
-    def _get_dias_pro_rata(self, data_ref, data_inicio_faixa, data_fim_faixa):
-        dias_no_mes = calendar.monthrange(data_ref.year, data_ref.month)[1]
-        if data_inicio_faixa.year == data_fim_faixa.year and data_inicio_faixa.month == data_fim_faixa.month:
-            return (data_fim_faixa - data_inicio_faixa).days + 1
-        if data_inicio_faixa.year == data_ref.year and data_inicio_faixa.month == data_ref.month:
-            return dias_no_mes - data_inicio_faixa.day + 1
-        if data_fim_faixa.year == data_ref.year and data_fim_faixa.month == data_ref.month:
-            return data_fim_faixa.day
-        return dias_no_mes
-
-    def _calcular_parcela(self, parcela_data: dict):
-        valor_original = parcela_data['valor_original']
-        valor_atual = valor_original
-        correcao_total_parcela = Decimal('0.0')
-        juros_total_parcela = Decimal('0.0')
+    def _avaliar_parcela(self, i, parcela_data):
+        """(resultado, checkpoint, sucesso) da i-ésima parcela; a falha vira uma parcela de erro."""
+        checkpoint = self._checkpoints[i] if i < len(self._checkpoints) else None
+        try:
+            resultado_parcela = self._calcular_parcela(parcela_data, checkpoint)
+            return resultado_parcela, resultado_parcela.pop('checkpoint', None), True
+        except Exception as e:
+            descricao_erro = parcela_data.get('descricao', 'Desconhecida')
+            logger.error(f"Erro CRÍTICO ao calcular parcela '{descricao_erro}': {e}", exc_info=True)
+            valor_original_fallback = parcela_data.get('valor_original', Decimal('0.0'))
+            return {
+                'descricao': f"ERRO: {descricao_erro}",
+                'valor_original': valor_original_fallback,
+                'data_evento': parcela_data.get('data_evento').isoformat() if isinstance(
+                    parcela_data.get('data_evento'), date) else None,
+                'correcao_total': Decimal('0.0'), 'juros_total': Decimal('0.0'),
+                'valor_final': valor_original_fallback,
+                'memoria_detalhada': [{'error': f"ERRO NO CÁLCULO: {e}"}]
+            }, None, False
 
-        faixas = sorted(parcela_data.get('faixas', []), key=lambda x: x['data_inicio'])
+    # --- Cálculo em paralelo (processos) ---
+    #
+    # Com muitas parcelas, blocos contíguos são avaliados em processos filhos criados por
+    # fork depois do planejamento: cada um parte de uma cópia deste motor, com as séries
+    # buscadas, as tabelas acumuladas e os coeficientes dos lotes já prontos, e não
+    # acessa a rede nem o banco. As contas de cada parcela não dependem das demais, e os
+    # blocos voltam na ordem das parcelas; avisos e memória de fatores são somados na
+    # mesma ordem. O resultado é idêntico ao do cálculo sequencial.
+    #
+    # O fork só copia a thread que o faz: uma trava segura por outra thread (revalidação
+    # de séries, pré-busca, aquecimento, outra requisição de um servidor com threads)
+    # ficaria presa para sempre no filho. Por isso o modo vem desligado e, mesmo ligado,
+    # só é usado quando o processo não tem outras threads (comandos, workers síncronos);
+    # caso contrário, as parcelas são avaliadas neste processo.
 
-        for faixa in faixas:
-            data_inicio, data_fim = faixa['data_inicio'], faixa['data_fim']
-            info_indice = get_indice_info(faixa['indice'])
-            ProviderClass = PROVIDERS_MAP[info_indice['provider']]
-            provider = ProviderClass()
+    def _avaliar_em_processos(self, parcelas):
+        """Parcelas avaliadas em processos filhos, ou None para avaliar neste processo."""
+        minimo = getattr(settings, 'GESTAO_CALCULO_PARCELAS_PROCESSOS', MIN_PARCELAS_PROCESSOS)
+        processos = min(getattr(settings, 'GESTAO_CALCULO_PROCESSOS', None) or os.cpu_count() or 1,
+                        len(parcelas))
+        if minimo is None or len(parcelas) < minimo or processos < 2 \
+                or 'fork' not in multiprocessing.get_all_start_methods():
+            return None
+        if threading.active_count() > 1:
+            logger.info(f"Cálculo em paralelo evitado: o processo tem {threading.active_count()} threads "
+                        f"ativas; calculando as {len(parcelas)} parcelas neste processo.")
+            return None
+
+        tamanho = -(-len(parcelas) // (processos * BLOCOS_POR_PROCESSO))
+        blocos = [(inicio, min(inicio + tamanho, len(parcelas))) for inicio in range(0, len(parcelas), tamanho)]
+        global _motor_em_paralelo
+        with _paralelo_lock:
+            _motor_em_paralelo = self
+            try:
+                with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('fork'),
+                                         initializer=_iniciar_processo) as pool:
+                    avaliados = list(pool.map(_avaliar_bloco, blocos))
+            except Exception as e:
+                logger.warning(f"Cálculo em paralelo indisponível ({e}); calculando as {len(parcelas)} parcelas "
+                               f"neste processo.")
+                return None
+            finally:
+                _motor_em_paralelo = None
+        logger.info(f"{len(parcelas)} parcela(s) calculada(s) em {len(blocos)} bloco(s) por {processos} processo(s).")
+
+        avaliadas = []
+        for bloco, avisos, memo in avaliados:
+            avaliadas.extend(bloco)
+            self.results['avisos'].extend(avisos)
+            self._nucleo.memo.incorporar(*memo)
+        return avaliadas
+
+    def _avaliar_bloco(self, inicio, fim):
+        """Parcelas [inicio, fim) avaliadas no processo filho, com os avisos e o trabalho da memória de fatores."""
+        avisos, memo = len(self.results['avisos']), self._nucleo.memo.marca()
+        bloco = [self._avaliar_parcela(i, self.payload['parcelas'][i]) for i in range(inicio, fim)]
+        return bloco, self.results['avisos'][avisos:], self._nucleo.memo.desde(memo)
 
-            indices = provider.get_indices(
-                inicio=data_inicio, fim=data_fim, params=info_indice.get('params', {}),
-                index_type=info_indice.get('type')
+    def _get_dias_pro_rata(self, data_ref, data_inicio_faixa, data_fim_faixa):
+        return mes_periodo(ordinal_mes(data_ref), data_inicio_faixa, data_fim_faixa).dias_aplicados
+
+    def _registrar_lacunas(self, parcela_data, lacunas):
+        """
+        Lacunas das séries nas faixas da parcela (conferidas em O(1) pelo mapa de cobertura)
+        viram aviso no resultado, ou erro da parcela se o payload pedir
+        `extras.exigir_indices_completos`.
+        """
+        for indice, lacunas_faixa in lacunas:
+            mensagem = (f"Parcela '{parcela_data.get('descricao', '')}': índice '{indice}' sem dados em "
+                        f"{', '.join(lacunas_faixa)} (tratados como variação zero).")
+            if (self.payload.get('extras') or {}).get('exigir_indices_completos'):
+                raise ValueError(mensagem)
+            logger.warning(mensagem)
+            self.results['avisos'].append(mensagem)
+
+    def _layout_faixas(self, parcela_data):
+        """
+        Estrutura das faixas da parcela (tudo o que entra no cálculo, menos o valor).
+        Parcelas com o mesmo layout têm os mesmos fatores; None se a parcela for inválida.
+        """
+        try:
+            return tuple(
+                (f['indice'], f['data_inicio'], f['data_fim'], f.get('pro_rata', True), f['juros_tipo'],
+                 f['juros_taxa_mensal'], f.get('modo_selic_exclusiva', False))
+                for f in sorted(parcela_data.get('faixas', []), key=lambda x: x['data_inicio'])
             )
+        except (KeyError, TypeError, AttributeError):
+            return None
 
-            if not indices and info_indice['provider'] == 'BacenSGSProvider':
-                raise ConnectionError(
-                    f"Não foi possível obter dados para o índice '{faixa['indice']}'. A API do Banco Central pode estar instável.")
-
-            valor_base_faixa = valor_atual
-            fator_correcao = Decimal('1.0')
-
-            if info_indice['type'] == 'monthly_variation':
-                data_loop = data_inicio.replace(day=1)
-                while data_loop <= data_fim:
-                    variacao = indices.get(data_loop.strftime('%Y-%m'), Decimal('0.0')) / 100
-                    if faixa.get('pro_rata', True):
-                        dias_aplicar = self._get_dias_pro_rata(data_loop, data_inicio, data_fim)
-                        dias_no_mes = calendar.monthrange(data_loop.year, data_loop.month)[1]
-                        if dias_no_mes == 0: raise ValueError("Divisão por zero: dias no mês é zero.")
-                        fator_correcao *= (1 + (variacao / Decimal(dias_no_mes) * Decimal(dias_aplicar)))
-                    else:
-                        fator_correcao *= (1 + variacao)
-                    data_loop += relativedelta(months=1)
-            elif info_indice['type'] == 'daily_rate':
-                data_loop = data_inicio
-                while data_loop <= data_fim:
-                    taxa_dia = indices.get(data_loop.isoformat(), Decimal('0.0')) / 100
-                    fator_correcao *= (1 + taxa_dia)
-                    data_loop += relativedelta(days=1)
-
-            if not fator_correcao.is_finite():
-                raise InvalidOperation(
-                    f"Fator de correção tornou-se não-finito na faixa do índice '{faixa['indice']}'.")
-
-            correcao_faixa = valor_base_faixa * (fator_correcao - 1)
-            valor_corrigido_faixa = valor_base_faixa + correcao_faixa
-            juros_faixa = Decimal('0.0')
-
-            if not faixa.get('modo_selic_exclusiva', False) and faixa['juros_tipo'] != 'NENHUM':
-                taxa_mensal = faixa['juros_taxa_mensal'] / 100
-                meses = Decimal((data_fim - data_inicio).days + 1) / Decimal('30.4375')
-                if faixa['juros_tipo'] == 'SIMPLES':
-                    juros_faixa = valor_corrigido_faixa * taxa_mensal * meses
-                elif faixa['juros_tipo'] == 'COMPOSTO':
-                    base_juros = 1 + taxa_mensal
-                    if base_juros < 0 and meses % 1 != 0:
-                        raise InvalidOperation("Cálculo de juros compostos inválido (raiz de número negativo).")
-                    juros_faixa = valor_corrigido_faixa * ((base_juros ** meses) - 1)
-
-            valor_atual = valor_corrigido_faixa + juros_faixa
-            if not valor_atual.is_finite():
-                raise InvalidOperation(f"Valor atual tornou-se não-finito ({valor_atual}) após juros/correção.")
+    def _preparar_lotes(self):
+        """
+        Layouts compartilhados por pelo menos MIN_PARCELAS_LOTE parcelas passam a ser
+        calculados em lote. Os coeficientes de cada lote são calculados já aqui, antes
+        das parcelas, para que os processos do cálculo em paralelo os recebam prontos.
+        """
+        parcelas = self.payload.get('parcelas', [])
+        layouts = [self._layout_faixas(p) for p in parcelas]
+        contagem = Counter(layouts)
+        self._lotes = {layout: None for layout, n in contagem.items()
+                       if layout is not None and n >= MIN_PARCELAS_LOTE}
+        if not self._lotes:
+            return
+        logger.debug(f"Cálculo em lote: {len(self._lotes)} layout(s) de faixas, "
+                     f"{sum(contagem[l] for l in self._lotes)} parcela(s).")
+        for layout, parcela_data in zip(layouts, parcelas):
+            if layout in self._lotes and self._lotes[layout] is None:
+                try:
+                    self._lotes[layout] = (self._aplicar_faixas(parcela_data, Decimal('1')), None)
+                except Exception as e:
+                    self._lotes[layout] = (None, e)
 
-            correcao_total_parcela += correcao_faixa
-            juros_total_parcela += juros_faixa
+    def _coeficientes_lote(self, layout):
+        """
+        Correção, juros e valor final de uma parcela de valor 1 com o layout dado,
+        calculados uma vez por layout (inclusive a falha, repetida para todas as parcelas).
+        Como todas as contas são lineares no valor original, cada parcela do lote custa
+        três multiplicações.
+        """
+        coeficientes, erro = self._lotes[layout]
+        if erro is not None:
+            raise erro
+        return coeficientes
+
+    def _calcular_parcela(self, parcela_data: dict, checkpoint=None):
+        valor_original = parcela_data['valor_original']
+        layout = self._layout_faixas(parcela_data) if self._lotes else None
+        retomada = self._retomar(parcela_data, checkpoint) if checkpoint else None
+
+        if retomada is not None:
+            correcao_total_parcela, juros_total_parcela, valor_atual, lacunas, estado = retomada
+        elif layout in self._lotes:
+            correcao, juros, final, lacunas, estado = self._coeficientes_lote(layout)
+            correcao_total_parcela = valor_original * correcao
+            juros_total_parcela = valor_original * juros
+            valor_atual = valor_original * final
+            estado = tuple(valor_original * v for v in estado)
+        else:
+            correcao_total_parcela, juros_total_parcela, valor_atual, lacunas, estado = \
+                self._aplicar_faixas(parcela_data, valor_original)
+
+        self._registrar_lacunas(parcela_data, lacunas)
 
         if not all(v.is_finite() for v in [valor_original, correcao_total_parcela, juros_total_parcela, valor_atual]):
             raise InvalidOperation("Resultado final da parcela contém valores não-finitos.")
 
-        return {
+        resultado = {
             'descricao': parcela_data['descricao'],
             'data_evento': parcela_data['data_evento'].isoformat(),
             'valor_original': valor_original,
@@ -154,6 +316,141 @@ class CalculoEngine:
             'juros_total': juros_total_parcela,
             'valor_final': valor_atual,
         }
+        if self._gerar_checkpoints:
+            resultado['checkpoint'] = self._checkpoint(parcela_data, estado)
+        return resultado
+
+    # --- Checkpoints ("atualizar até hoje") ---
+    #
+    # Só a última faixa de uma parcela avança quando a data final do cálculo muda. O
+    # checkpoint guarda o estado da parcela antes dela (valor base, correção e juros
+    # acumulados) e o fator da última faixa até o fim do mês anterior ao da data final
+    # (`corte`): o mês da data final pode estar incompleto (pró-rata) ou ainda sem índice
+    # publicado. Avançar o cálculo aplica só o fator de `corte + 1` até a nova data final.
+    # O checkpoint também guarda a versão de cada série usada pela parcela: uma revisão
+    # posterior de qualquer delas (inclusive nas faixas anteriores) o invalida.
+
+    def _versoes_parcela(self, parcela_data):
+        return {f['indice']: self._versoes[f['indice']] for f in parcela_data['faixas'] if f['indice'] in self._versoes}
+
+    def _checkpoint(self, parcela_data, estado):
+        if self._versoes is None:
+            return None
+        faixa = max(parcela_data['faixas'], key=lambda x: x['data_inicio'])
+        data_inicio, data_fim = faixa['data_inicio'], faixa['data_fim']
+        corte = data_fim.replace(day=1) - timedelta(days=1)
+        if corte < data_inicio:
+            corte, fator = data_inicio - timedelta(days=1), Decimal('1')
+        else:
+            info_indice = get_indice_info(faixa['indice'])
+            fator, lacunas, _ = self._nucleo.fator(faixa['indice'], info_indice['type'], data_inicio, corte,
+                                                   faixa.get('pro_rata', True))
+            if lacunas:
+                # Meses tratados como variação zero não podem ficar congelados no checkpoint
+                return None
+        valor_base, correcao, juros = estado
+        return {
+            'indice': faixa['indice'], 'data_inicio': data_inicio.isoformat(), 'pro_rata': faixa.get('pro_rata', True),
+            'valor_original': parcela_data['valor_original'], 'corte': corte.isoformat(), 'fator': fator,
+            'valor_base': valor_base, 'correcao': correcao, 'juros': juros,
+            'versoes': self._versoes_parcela(parcela_data),
+        }
+
+    def _retomar(self, parcela_data, checkpoint):
+        """
+        Resultado da parcela a partir do checkpoint do cálculo anterior, ou None se ele
+        não servir (parcela ou última faixa alteradas, série revisada desde então, data
+        final não posterior ao corte).
+        """
+        if self._versoes is None:
+            return None
+        faixa = max(parcela_data['faixas'], key=lambda x: x['data_inicio'])
+        try:
+            corte = date.fromisoformat(checkpoint['corte'])
+            compativel = (
+                checkpoint['indice'] == faixa['indice']
+                and checkpoint['data_inicio'] == faixa['data_inicio'].isoformat()
+                and checkpoint['pro_rata'] == faixa.get('pro_rata', True)
+                and Decimal(str(checkpoint['valor_original'])) == parcela_data['valor_original']
+                and corte < faixa['data_fim']
+                and checkpoint['versoes'] == self._versoes_parcela(parcela_data)
+            )
+            if not compativel:
+                return None
+            fator_corte, valor_base, correcao, juros = (
+                Decimal(str(checkpoint[k])) for k in ('fator', 'valor_base', 'correcao', 'juros'))
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            return None
+
+        info_indice = get_indice_info(faixa['indice'])
+        fator, lacunas, _ = self._nucleo.fator(faixa['indice'], info_indice['type'], corte + timedelta(days=1),
+                                               faixa['data_fim'], faixa.get('pro_rata', True))
+        correcao_faixa, juros_faixa, valor_atual = self._aplicar_faixa(faixa, valor_base, fator_corte * fator)
+        return (correcao + correcao_faixa, juros + juros_faixa, valor_atual,
+                [(faixa['indice'], lacunas)] if lacunas else [], (valor_base, correcao, juros))
+
+    def _fator_faixa(self, faixa):
+        """Fator de correção da faixa e os períodos sem dados no índice (ver NucleoCalculo.fator)."""
+        info_indice = get_indice_info(faixa['indice'])
+        fator_correcao, lacunas, sem_dados = self._nucleo.fator(
+            faixa['indice'], info_indice['type'], faixa['data_inicio'], faixa['data_fim'], faixa.get('pro_rata', True)
+        )
+        if sem_dados and info_indice['provider'] == 'BacenSGSProvider':
+            raise ConnectionError(
+                f"Não foi possível obter dados para o índice '{faixa['indice']}'. A API do Banco Central pode estar instável.")
+        if not fator_correcao.is_finite():
+            raise InvalidOperation(
+                f"Fator de correção tornou-se não-finito na faixa do índice '{faixa['indice']}'.")
+        return fator_correcao, lacunas
+
+    def _aplicar_faixas(self, parcela_data: dict, valor_original):
+        """
+        Aplica as faixas da parcela, em ordem, a `valor_original`. Devolve
+        (correção, juros, valor final, [(índice, lacunas)], estado antes da última faixa),
+        com o estado em (valor base, correção, juros).
+        """
+        valor_atual = valor_original
+        correcao_total_parcela = Decimal('0.0')
+        juros_total_parcela = Decimal('0.0')
+        lacunas_parcela = []
+        estado = (valor_atual, correcao_total_parcela, juros_total_parcela)
+
+        faixas = sorted(parcela_data.get('faixas', []), key=lambda x: x['data_inicio'])
+
+        for faixa in faixas:
+            fator_correcao, lacunas = self._fator_faixa(faixa)
+            if lacunas:
+                lacunas_parcela.append((faixa['indice'], lacunas))
+
+            estado = (valor_atual, correcao_total_parcela, juros_total_parcela)
+            correcao_faixa, juros_faixa, valor_atual = self._aplicar_faixa(faixa, valor_atual, fator_correcao)
+            correcao_total_parcela += correcao_faixa
+            juros_total_parcela += juros_faixa
+
+        return correcao_total_parcela, juros_total_parcela, valor_atual, lacunas_parcela, estado
+
+    def _aplicar_faixa(self, faixa, valor_base_faixa, fator_correcao):
+        """Correção e juros da faixa sobre `valor_base_faixa`. Devolve (correção, juros, valor atual)."""
+        data_inicio, data_fim = faixa['data_inicio'], faixa['data_fim']
+        correcao_faixa = valor_base_faixa * (fator_correcao - 1)
+        valor_corrigido_faixa = valor_base_faixa + correcao_faixa
+        juros_faixa = Decimal('0.0')
+
+        if not faixa.get('modo_selic_exclusiva', False) and faixa['juros_tipo'] != 'NENHUM':
+            taxa_mensal = faixa['juros_taxa_mensal'] / 100
+            meses = Decimal((data_fim - data_inicio).days + 1) / Decimal('30.4375')
+            if faixa['juros_tipo'] == 'SIMPLES':
+                juros_faixa = valor_corrigido_faixa * taxa_mensal * meses
+            elif faixa['juros_tipo'] == 'COMPOSTO':
+                base_juros = 1 + taxa_mensal
+                if base_juros < 0 and meses % 1 != 0:
+                    raise InvalidOperation("Cálculo de juros compostos inválido (raiz de número negativo).")
+                juros_faixa = valor_corrigido_faixa * ((base_juros ** meses) - 1)
+
+        valor_atual = valor_corrigido_faixa + juros_faixa
+        if not valor_atual.is_finite():
+            raise InvalidOperation(f"Valor atual tornou-se não-finito ({valor_atual}) após juros/correção.")
+        return correcao_faixa, juros_faixa, valor_atual
 
     def _calcular_extras(self):
         extras = self.payload.get('extras', {})
@@ -204,4 +501,112 @@ class CalculoEngine:
             ],
             'total_geral': resumo_quantized.get('total_geral', Decimal('0.0')),
             'detalhe_parcelas': detalhe_parcelas_formatado
-        }
\ No newline at end of file
+        }
+
+
+# ------------------------------------------------------------------------------
+# Entrada do wizard: validação do payload e execução completa
+# ------------------------------------------------------------------------------
+
+def _to_decimal(value, field_name="Valor"):
+    """Função utilitária robusta para conversão de string para Decimal."""
+    if value is None or str(value).strip() == '':
+        return Decimal('0.00')
+
+    s_value = str(value).strip()
+    if ',' in s_value:
+        s_value = s_value.replace('.', '').replace(',', '.')
+
+    try:
+        return Decimal(s_value)
+    except InvalidOperation:
+        raise ValueError(f"{field_name} inválido: '{value}' não é um número válido.")
+
+def validar_payload(payload):
+    """
+    Valida e normaliza rigorosamente o payload. Levanta ValueError em caso de falha.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("O corpo da requisição deve ser um objeto JSON.")
+
+    # Valida parcelas
+    parcelas = payload.get("parcelas")
+    if not parcelas or not isinstance(parcelas, list):
+        raise ValueError("É necessário fornecer pelo menos uma parcela para o cálculo.")
+
+    for i, p_data in enumerate(parcelas):
+        p_num = i + 1
+        p_data["descricao"] = p_data.get("descricao") or f"Parcela {p_num}"
+        p_data["valor_original"] = _to_decimal(p_data.get("valor_original"), f"Valor original da Parcela {p_num}")
+
+        try:
+            p_data["data_evento"] = date.fromisoformat(p_data.get("data_evento"))
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"Parcela {p_num}: Data do valor é inválida ou está ausente. Use o formato AAAA-MM-DD.")
+
+        if not p_data.get("faixas"):
+            raise ValueError(f"Parcela {p_num}: Nenhuma faixa de cálculo foi definida.")
+
+        for j, f_data in enumerate(p_data["faixas"]):
+            f_num = j + 1
+            try:
+                f_data["data_inicio"] = date.fromisoformat(f_data.get("data_inicio"))
+                f_data["data_fim"] = date.fromisoformat(f_data.get("data_fim"))
+            except (TypeError, ValueError):
+                raise ValueError(
+                    f"Parcela {p_num}, Faixa {f_num}: Datas de início/fim são inválidas ou ausentes. Use AAAA-MM-DD.")
+
+            if f_data["data_inicio"] > f_data["data_fim"]:
+                raise ValueError(
+                    f"Parcela {p_num}, Faixa {f_num}: A data de início não pode ser posterior à data de fim.")
+
+            f_data["juros_taxa_mensal"] = _to_decimal(f_data.get("juros_taxa_mensal"),
+                                                      f"Taxa de juros da Faixa {f_num}")
+
+    # Valida extras
+    extras = payload.get("extras", {})
+    if isinstance(extras, dict):
+        extras["multa_percentual"] = _to_decimal(extras.get("multa_percentual"), "Percentual de multa")
+        extras["honorarios_percentual"] = _to_decimal(extras.get("honorarios_percentual"),
+                                                      "Percentual de honorários")
+
+    return payload
+
+
+def executar_calculo(payload: dict, checkpoints=None) -> dict:
+    """
+    Valida o payload (formato do wizard ou `form_data` de um resultado salvo), executa o
+    cálculo e anexa ao resultado o `form_data` serializável, que permite refazê-lo, e os
+    checkpoints por parcela, que permitem avançá-lo (`atualizar_calculo`).
+    """
+    payload = validar_payload(payload)
+    resultados = CalculoEngine(payload, checkpoints=checkpoints, gerar_checkpoints=True).run()
+
+    resultados['form_data'] = payload
+    for parcela in payload['parcelas']:
+        parcela['data_evento'] = parcela['data_evento'].isoformat()
+        for faixa in parcela['faixas']:
+            faixa['data_inicio'] = faixa['data_inicio'].isoformat()
+            faixa['data_fim'] = faixa['data_fim'].isoformat()
+    return resultados
+
+
+def atualizar_calculo(resultado_anterior: dict, data_final: date, reaproveitar: bool = True) -> dict:
+    """
+    "Atualizar até hoje": estende até `data_final` a última faixa de cada parcela do
+    resultado salvo e refaz o cálculo. As parcelas com checkpoint compatível só aplicam
+    os meses novos; as demais (ou resultados salvos sem checkpoints) são recalculadas.
+    Com `reaproveitar=False` (resultado marcado como desatualizado), tudo é recalculado.
+    """
+    form_data = copy.deepcopy(resultado_anterior['form_data'])
+    for parcela in form_data.get('parcelas', []):
+        faixas = parcela.get('faixas') or []
+        if not faixas:
+            continue
+        ultima = max(faixas, key=lambda x: x['data_inicio'])
+        if date.fromisoformat(ultima['data_fim']) < data_final:
+            ultima['data_fim'] = data_final.isoformat()
+    if not reaproveitar:
+        return executar_calculo(form_data)
+    return executar_calculo(form_data, checkpoints=resultado_anterior.get('checkpoints'))
@@ -1,7 +1,7 @@
 # gestao/services/calculo_v2.py
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
 from datetime import date
-from .indices.providers import ServicoIndices
+from .indices.providers import get_servico_indices
 
 
 def to_decimal(value, default=Decimal('0.00')):
@@ -24,7 +24,7 @@ def safe_quantize(value):
 class CalculoProEngine:
     def __init__(self, payload):
         self.payload = payload
-        self.indice_service = ServicoIndices()
+        self.indice_service = get_servico_indices()
         self.totais = {
             'principal': Decimal('0.0'), 'correcao': Decimal('0.0'),
             'juros': Decimal('0.0'), 'multa': Decimal('0.0'),
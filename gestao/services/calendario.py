@@ -0,0 +1,185 @@
+# gestao/services/calendario.py
+
+"""
+Calendário de dias úteis (feriados nacionais e forenses) com índice ordinal pré-computado.
+
+Para cada calendário, os dias de ANO_INICIAL a ANO_FINAL são percorridos uma única
+vez e guardados em dois arrays:
+
+    acumulado[i] = quantidade de dias úteis em [base, base + i)
+    uteis[k]     = ordinal (date.toordinal) do k-ésimo dia útil
+
+de modo que "contar dias úteis entre duas datas" é uma subtração e "somar N dias
+úteis" é uma indexação, ambas O(1), sem laços dia a dia.
+
+Calendários:
+  - NACIONAL: feriados nacionais (os do calendário bancário: inclui a segunda e a
+    terça de Carnaval). É o calendário das séries diárias do SGS (SELIC, TR).
+  - FORENSE: NACIONAL + feriados forenses da Lei 5.010/66, art. 62 (quarta e quinta-feira
+    santas, 11/08, 01/11, 08/12) + suspensão dos prazos de 20/12 a 20/01 (CPC, art. 220).
+    É o calendário da contagem de prazos processuais (CPC, art. 219).
+"""
+
+from array import array
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+ANO_INICIAL = 1990
+ANO_FINAL = 2100
+
+FERIADOS_FIXOS = (
+    (1, 1, "Confraternização Universal"),
+    (4, 21, "Tiradentes"),
+    (5, 1, "Dia do Trabalho"),
+    (9, 7, "Independência do Brasil"),
+    (10, 12, "Nossa Senhora Aparecida"),
+    (11, 2, "Finados"),
+    (11, 15, "Proclamação da República"),
+    (12, 25, "Natal"),
+)
+# Dia Nacional de Zumbi e da Consciência Negra: feriado nacional desde 2024 (Lei 14.759/2023).
+CONSCIENCIA_NEGRA_DESDE = 2024
+
+FERIADOS_FORENSES_FIXOS = (
+    (8, 11, "Dia dos Cursos Jurídicos"),
+    (11, 1, "Dia de Todos os Santos"),
+    (12, 8, "Dia da Justiça"),
+)
+
+
+def pascoa(ano: int) -> date:
+    """Domingo de Páscoa (calendário gregoriano, algoritmo de Meeus/Jones/Butcher)."""
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados_nacionais(ano: int) -> Dict[date, str]:
+    """Feriados nacionais (e Carnaval) do ano."""
+    feriados = {date(ano, m, d): nome for m, d, nome in FERIADOS_FIXOS}
+    if ano >= CONSCIENCIA_NEGRA_DESDE:
+        feriados[date(ano, 11, 20)] = "Dia Nacional de Zumbi e da Consciência Negra"
+    p = pascoa(ano)
+    feriados[p - timedelta(days=48)] = "Carnaval"
+    feriados[p - timedelta(days=47)] = "Carnaval"
+    feriados[p - timedelta(days=2)] = "Sexta-feira Santa"
+    feriados[p + timedelta(days=60)] = "Corpus Christi"
+    return feriados
+
+
+def feriados_forenses(ano: int) -> Dict[date, str]:
+    """Dias sem contagem de prazo processual no ano (feriados nacionais e forenses, art. 220 do CPC)."""
+    feriados = {date(ano, 1, d): "Suspensão de prazos (CPC, art. 220)" for d in range(1, 21)}
+    feriados.update({date(ano, 12, d): "Suspensão de prazos (CPC, art. 220)" for d in range(20, 32)})
+    feriados.update({date(ano, m, d): nome for m, d, nome in FERIADOS_FORENSES_FIXOS})
+    p = pascoa(ano)
+    feriados[p - timedelta(days=4)] = "Quarta-feira Santa"
+    feriados[p - timedelta(days=3)] = "Quinta-feira Santa"
+    feriados.update(feriados_nacionais(ano))
+    return feriados
+
+
+class CalendarioDiasUteis:
+    """Dias úteis (segunda a sexta, exceto feriados) de ANO_INICIAL a ANO_FINAL, com consultas O(1)."""
+
+    __slots__ = ("nome", "base", "fim", "acumulado", "uteis")
+
+    def __init__(self, nome: str, feriados: Callable[[int], Dict[date, str]],
+                 ano_inicial: int = ANO_INICIAL, ano_final: int = ANO_FINAL) -> None:
+        self.nome = nome
+        self.base = date(ano_inicial, 1, 1).toordinal()
+        self.fim = date(ano_final, 12, 31).toordinal()
+        fechados = {d.toordinal() for ano in range(ano_inicial, ano_final + 1) for d in feriados(ano)}
+        self.acumulado = array("i", [0])
+        self.uteis = array("i")
+        for o in range(self.base, self.fim + 1):
+            # date.fromordinal(1) é uma segunda-feira: (o - 1) % 7 >= 5 é sábado ou domingo.
+            if (o - 1) % 7 < 5 and o not in fechados:
+                self.uteis.append(o)
+            self.acumulado.append(len(self.uteis))
+
+    def _indice(self, d: date) -> int:
+        o = d.toordinal()
+        if not self.base <= o <= self.fim:
+            raise ValueError(f"Data {d.isoformat()} fora do calendário {self.nome} "
+                             f"({date.fromordinal(self.base).year}–{date.fromordinal(self.fim).year}).")
+        return o - self.base
+
+    def cobre(self, inicio: date, fim: date) -> bool:
+        return self.base <= inicio.toordinal() and fim.toordinal() <= self.fim
+
+    def dia_util(self, d: date) -> bool:
+        i = self._indice(d)
+        return self.acumulado[i + 1] != self.acumulado[i]
+
+    def contar_dias_uteis(self, inicio: date, fim: date) -> int:
+        """Quantidade de dias úteis em [inicio, fim] (0 se fim < inicio)."""
+        if fim < inicio:
+            return 0
+        return self.acumulado[self._indice(fim) + 1] - self.acumulado[self._indice(inicio)]
+
+    def somar_dias_uteis(self, d: date, n: int) -> date:
+        """
+        O n-ésimo dia útil depois de `d` (n > 0) ou antes de `d` (n < 0); `d` não entra
+        na contagem. Com n == 0, devolve `d`.
+        """
+        if n == 0:
+            return d
+        i = self._indice(d)
+        k = self.acumulado[i + 1] + n - 1 if n > 0 else self.acumulado[i] + n
+        if not 0 <= k < len(self.uteis):
+            raise ValueError(f"{n} dia(s) úteis a partir de {d.isoformat()} saem do calendário {self.nome}.")
+        return date.fromordinal(self.uteis[k])
+
+    def proximo_dia_util(self, d: date) -> date:
+        """`d`, se for dia útil; senão, o primeiro dia útil seguinte."""
+        return d if self.dia_util(d) else self.somar_dias_uteis(d, 1)
+
+    def ordinais_uteis(self, inicio: date, fim: date) -> array:
+        """Ordinais (date.toordinal) dos dias úteis em [inicio, fim], sem percorrer o período."""
+        if fim < inicio:
+            return array("i")
+        return self.uteis[self.acumulado[self._indice(inicio)]:self.acumulado[self._indice(fim) + 1]]
+
+    def dias_sem_expediente(self, inicio: date, fim: date) -> List[date]:
+        """Dias de segunda a sexta sem expediente (feriados) em [inicio, fim]."""
+        uteis = set(self.ordinais_uteis(inicio, fim))
+        return [d for d in (inicio + timedelta(days=k) for k in range((fim - inicio).days + 1))
+                if d.weekday() < 5 and d.toordinal() not in uteis]
+
+
+CALENDARIOS: Dict[str, Callable[[int], Dict[date, str]]] = {
+    "NACIONAL": feriados_nacionais,
+    "FORENSE": feriados_forenses,
+}
+
+
+@lru_cache(maxsize=None)
+def get_calendario(nome: str = "FORENSE") -> CalendarioDiasUteis:
+    """Calendário pré-computado (um por processo)."""
+    try:
+        return CalendarioDiasUteis(nome, CALENDARIOS[nome])
+    except KeyError:
+        raise ValueError(f"Calendário desconhecido: '{nome}'.")
+
+
+def calcular_prazo(data_intimacao: date, dias: int, tipo_contagem: str = "UTEIS",
+                   calendario: str = "FORENSE") -> Tuple[date, date]:
+    """
+    Primeiro e último dia de um prazo processual a partir da intimação (CPC, arts. 219 e 224):
+    o prazo começa no primeiro dia útil seguinte; em dias úteis, termina no `dias`-ésimo
+    dia útil; em dias corridos, termina `dias - 1` dias depois do início, prorrogado para
+    o primeiro dia útil seguinte se cair em dia sem expediente.
+    """
+    cal = get_calendario(calendario)
+    inicio = cal.somar_dias_uteis(data_intimacao, 1)
+    if tipo_contagem == "UTEIS":
+        return inicio, cal.somar_dias_uteis(data_intimacao, dias)
+    return inicio, cal.proximo_dia_util(inicio + timedelta(days=dias - 1))
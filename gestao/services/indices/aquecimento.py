@@ -0,0 +1,100 @@
+# gestao/services/indices/aquecimento.py
+
+"""
+Aquecimento dos índices em memória ao subir um worker.
+
+Sem aquecimento, o primeiro cálculo depois de um deploy (ou da reciclagem de um
+worker do gunicorn) paga a carga de cada série que toca: leitura do banco,
+tabelas acumuladas, abertura das tabelas compiladas. O aquecimento faz esse
+trabalho antes do tráfego, para as séries mais usadas e as tabelas estáticas,
+passando pelo mesmo caminho dos cálculos (plano de índices + tabelas compartilhadas).
+
+Pode rodar de duas formas:
+  - `manage.py aquecer_indices`, antes de liberar o tráfego;
+  - no `GestaoConfig.ready()` de cada worker, em segundo plano, se
+    `settings.GESTAO_AQUECER_INDICES` for verdadeiro.
+"""
+
+import logging
+import time
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import store
+from .catalog import INDICE_CATALOG, public_catalog_snapshot
+from .planner import MAX_BUSCAS_PARALELAS, PlanoIndices
+from .providers import get_servico_indices
+
+logger = logging.getLogger(__name__)
+
+# Séries mais usadas nos cálculos; as tabelas estáticas do catálogo entram sempre.
+INDICES_QUENTES = ("IPCA", "IPCA-E", "INPC", "SELIC_DIARIA", "TR_DIARIA")
+
+
+class ResultadoAquecimento(NamedTuple):
+    segundos: float
+    observacoes: Dict[str, int]  # chave -> quantidade de observações carregadas
+    erros: Dict[str, str]  # chave -> motivo da falha
+
+
+def indices_para_aquecer() -> List[str]:
+    """Chaves aquecidas por padrão: `settings.GESTAO_INDICES_AQUECIMENTO`, ou as séries quentes + tabelas estáticas."""
+    configuradas = getattr(settings, "GESTAO_INDICES_AQUECIMENTO", None)
+    if configuradas is not None:
+        return list(configuradas)
+    estaticas = [k for k, meta in INDICE_CATALOG.items() if meta.get("provider") == "StaticTableProvider"]
+    return list(INDICES_QUENTES) + estaticas
+
+
+def aquecer(chaves: Optional[Iterable[str]] = None, hoje: Optional[date] = None,
+            max_paralelas: int = MAX_BUSCAS_PARALELAS) -> ResultadoAquecimento:
+    """
+    Carrega em memória as séries `chaves` (padrão: `indices_para_aquecer()`) desde
+    o início do histórico e monta as respectivas tabelas acumuladas compartilhadas.
+    Falhas em uma série não impedem o aquecimento das demais.
+    """
+    inicio_relogio = time.perf_counter()
+    hoje = hoje or timezone.localdate()
+    chaves = list(chaves) if chaves is not None else indices_para_aquecer()
+
+    erros: Dict[str, str] = {}
+    plano = PlanoIndices(get_servico_indices().get_indices_por_periodo)
+    for chave in chaves:
+        if chave not in INDICE_CATALOG:
+            erros[chave] = "índice desconhecido"
+            continue
+        plano.adicionar(chave, store.INICIO_HISTORICO, hoje)
+    indices = plano.executar(max_paralelas)
+
+    observacoes: Dict[str, int] = {}
+    for chave in plano.periodos:
+        tipo = INDICE_CATALOG[chave].get("type")
+        try:
+            serie = indices.get_indices_por_periodo(chave, store.INICIO_HISTORICO, hoje)
+            if tipo == "monthly_variation":
+                indices.numero_indice(chave, store.INICIO_HISTORICO, hoje)
+            elif tipo == "daily_rate":
+                indices.fator_diario(chave, store.INICIO_HISTORICO, hoje)
+        except Exception as e:
+            erros[chave] = str(e)
+            continue
+        observacoes[chave] = len(serie)
+
+    public_catalog_snapshot()
+    segundos = time.perf_counter() - inicio_relogio
+    logger.info(f"Aquecimento de {len(observacoes)} índice(s) concluído em {segundos:.2f}s"
+                + (f"; falhas: {', '.join(erros)}" if erros else "."))
+    return ResultadoAquecimento(segundos, observacoes, erros)
+
+
+def aquecer_em_segundo_plano() -> None:
+    """Agenda o aquecimento em uma thread própria (usado no `ready()` dos workers)."""
+    def tarefa():
+        try:
+            aquecer()
+        except Exception as e:
+            logger.error(f"Falha no aquecimento dos índices: {e}")
+    store.executar_em_segundo_plano(tarefa)
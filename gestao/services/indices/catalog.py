@@ -1,7 +1,13 @@
 # gestao/services/indices/catalog.py
 
 from __future__ import annotations
-from typing import Dict, Any
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, NamedTuple, Optional
 
 # Este dicionário é o coração do sistema de cálculos.
 # Ele mapeia um nome amigável (chave) para a configuração de como obter os dados.
@@ -14,6 +20,11 @@ from typing import Dict, Any
 # - "params": Dicionário com parâmetros específicos para o provider.
 #   - Para 'BacenSGSProvider': 'serie_id' é o código da série no sistema do Bacen.
 #   - Para 'StaticTableProvider': 'filename' é o nome do arquivo CSV/JSON dentro da pasta 'data/'.
+#   - Para 'SerieDerivadaProvider': 'origem' (chave de uma série do SGS deste catálogo) e
+#     'derivacao' ('mensal_composta', 'inicio_do_mes' ou 'acumulado_12m'; ver derivadas.py).
+#
+# Tipos: 'monthly_variation' e 'daily_rate' são usados na correção monetária;
+# 'accumulated_12m' é apenas informativo e fica fora do catálogo público dos cálculos.
 
 INDICE_CATALOG: Dict[str, Dict[str, Any]] = {
     # --- Índices de Preços (Inflação) ---
@@ -83,6 +94,36 @@ INDICE_CATALOG: Dict[str, Dict[str, Any]] = {
         "group": "Taxas de Remuneração",
     },
 
+    # --- Séries derivadas (calculadas a partir das séries acima) ---
+    "SELIC_MENSAL": {
+        "label": "SELIC (Mensal, composta da diária)",
+        "provider": "SerieDerivadaProvider",
+        "params": {"origem": "SELIC_DIARIA", "derivacao": "mensal_composta"},
+        "type": "monthly_variation",
+        "group": "Taxas de Juros",
+    },
+    "TR_MENSAL": {
+        "label": "TR - Taxa Referencial (Mensal)",
+        "provider": "SerieDerivadaProvider",
+        "params": {"origem": "TR_DIARIA", "derivacao": "inicio_do_mes"},
+        "type": "monthly_variation",
+        "group": "Taxas de Remuneração",
+    },
+    "IPCA_12M": {
+        "label": "IPCA acumulado em 12 meses",
+        "provider": "SerieDerivadaProvider",
+        "params": {"origem": "IPCA", "derivacao": "acumulado_12m"},
+        "type": "accumulated_12m",
+        "group": "Acumulados em 12 meses",
+    },
+    "INPC_12M": {
+        "label": "INPC acumulado em 12 meses",
+        "provider": "SerieDerivadaProvider",
+        "params": {"origem": "INPC", "derivacao": "acumulado_12m"},
+        "type": "accumulated_12m",
+        "group": "Acumulados em 12 meses",
+    },
+
     # --- Índices de Tribunais (Exemplos com arquivos locais) ---
     "TJSP": {
         "label": "Tabela Prática do TJSP",
@@ -100,6 +141,9 @@ INDICE_CATALOG: Dict[str, Dict[str, Any]] = {
     },
 }
 
+# Tipos de série aceitos pelos motores de cálculo.
+CALCULATION_TYPES = ("monthly_variation", "daily_rate")
+
 
 def get_indice_info(nome: str) -> Dict[str, Any]:
     """Função de conveniência para obter metadados de um índice."""
@@ -109,6 +153,16 @@ def get_indice_info(nome: str) -> Dict[str, Any]:
         raise ValueError(f"Índice desconhecido: {nome}") from exc
 
 
+def serie_sgs(nome: str) -> Optional[int]:
+    """Série do SGS que alimenta o índice, diretamente ou por derivação; None se não houver."""
+    meta = INDICE_CATALOG.get(nome) or {}
+    if meta.get('provider') == 'SerieDerivadaProvider':
+        meta = INDICE_CATALOG.get(meta.get('params', {}).get('origem')) or {}
+    if meta.get('provider') == 'BacenSGSProvider':
+        return meta['params'].get('serie_id')
+    return None
+
+
 def public_catalog_for_api() -> list[dict[str, Any]]:
     """
     Gera uma lista plana de índices para o frontend, garantindo que todos
@@ -116,6 +170,8 @@ def public_catalog_for_api() -> list[dict[str, Any]]:
     """
     indices = []
     for key, meta in INDICE_CATALOG.items():
+        if meta.get("type", "monthly_variation") not in CALCULATION_TYPES:
+            continue
         indices.append({
             "key": key,
             "label": meta.get("label", key),  # Garante que 'label' sempre exista
@@ -124,4 +180,23 @@ def public_catalog_for_api() -> list[dict[str, Any]]:
         })
     # Ordena a lista final pelo 'label' para uma exibição consistente
     indices.sort(key=lambda x: x['label'])
-    return indices
\ No newline at end of file
+    return indices
+
+
+class CatalogSnapshot(NamedTuple):
+    """Catálogo público serializado uma única vez, com validadores HTTP."""
+    content: bytes
+    etag: str
+    last_modified: datetime
+
+
+@lru_cache(maxsize=1)
+def public_catalog_snapshot() -> CatalogSnapshot:
+    """
+    O catálogo só muda em deploy: serializa-o uma vez por processo. O ETag é o hash
+    do conteúdo (igual em todos os workers) e o Last-Modified, a data deste arquivo.
+    """
+    content = json.dumps({"indices": public_catalog_for_api()}, ensure_ascii=False).encode("utf-8")
+    etag = hashlib.sha256(content).hexdigest()[:32]
+    last_modified = datetime.fromtimestamp(int(Path(__file__).stat().st_mtime), tz=timezone.utc)
+    return CatalogSnapshot(content, etag, last_modified)
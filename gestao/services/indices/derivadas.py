@@ -0,0 +1,97 @@
+# gestao/services/indices/derivadas.py
+
+"""
+Séries derivadas de séries do SGS, materializadas uma vez por carga da origem.
+
+Quando o armazenamento local entrega uma cópia nova da série de origem (após a
+sincronização diária), cada derivação usada é calculada uma única vez sobre a
+série inteira e guardada; as consultas seguintes só recortam o período.
+
+Derivações:
+  - mensal_composta: taxas diárias (% a.d.) compostas por mês, Π (1 + r/100) - 1,
+    apenas para meses encerrados (ex.: SELIC mensal a partir da diária);
+  - inicio_do_mes: valor da primeira observação de cada mês, normalmente a do dia 01
+    (ex.: TR mensal, cuja série diária traz a taxa do período mensal iniciado em cada
+    dia; meses sem observação no dia 01 usam a do primeiro dia publicado);
+  - acumulado_12m: variação acumulada em 12 meses de uma série mensal, só para
+    meses com as 12 competências publicadas (ex.: IPCA e INPC em 12 meses).
+"""
+
+import threading
+from datetime import date
+from decimal import Decimal
+from itertools import groupby
+from typing import Callable, Dict, Iterable, Tuple
+
+from . import metricas
+from .fatores import CEM, UM, NumeroIndiceMensal, ordinal_chave_mes
+
+Pares = Iterable[Tuple[str, Decimal]]  # ('YYYY-MM-DD', valor) em ordem de data
+
+
+def mensal_composta(pares: Pares, hoje: date) -> Dict[str, Decimal]:
+    mes_corrente = f"{hoje.year:04d}-{hoje.month:02d}"
+    saida: Dict[str, Decimal] = {}
+    for mes, grupo in groupby(pares, key=lambda p: p[0][:7]):
+        if mes >= mes_corrente:
+            break
+        fator = UM
+        for _, taxa in grupo:
+            fator *= UM + taxa / CEM
+        saida[mes] = (fator - UM) * CEM
+    return saida
+
+
+def inicio_do_mes(pares: Pares, hoje: date) -> Dict[str, Decimal]:
+    return {mes: next(grupo)[1] for mes, grupo in groupby(pares, key=lambda p: p[0][:7])}
+
+
+def acumulado_12m(pares: Pares, hoje: date) -> Dict[str, Decimal]:
+    variacoes = {d[:7]: v for d, v in pares}
+    if not variacoes:
+        return {}
+    chaves = sorted(variacoes)
+    tabela = NumeroIndiceMensal()
+    tabela.atualizar(variacoes, ordinal_chave_mes(chaves[0]), ordinal_chave_mes(chaves[-1]))
+    saida: Dict[str, Decimal] = {}
+    for chave in chaves:
+        o = ordinal_chave_mes(chave)
+        if tabela.completa(o - 11, o):
+            saida[chave] = (tabela.fator(o - 11, o) - UM) * CEM
+    return saida
+
+
+DERIVACOES: Dict[str, Callable[[Pares, date], Dict[str, Decimal]]] = {
+    "mensal_composta": mensal_composta,
+    "inicio_do_mes": inicio_do_mes,
+    "acumulado_12m": acumulado_12m,
+}
+
+
+# --- Séries materializadas: (serie_id, derivacao) -> (cópia de origem usada, série derivada) ---
+_materializadas: Dict[Tuple[int, str], Tuple[object, Dict[str, Decimal]]] = {}
+_materializadas_lock = threading.Lock()
+
+
+def materializar(serie, derivacao: str) -> Dict[str, Decimal]:
+    """
+    Série derivada de `serie` (uma `store.SerieArmazenada`), chaves 'YYYY-MM'.
+    Recalculada somente quando o armazenamento entrega uma nova cópia da origem.
+    """
+    chave = (serie.serie_id, derivacao)
+    with _materializadas_lock:
+        atual = _materializadas.get(chave)
+        if atual is not None and atual[0] is serie:
+            metricas.incrementar("SerieDerivadaProvider", "reaproveitadas")
+            return atual[1]
+    metricas.incrementar("SerieDerivadaProvider", "materializacoes")
+    derivada = DERIVACOES[derivacao](serie.intervalo("", "9999"), serie.carregada_em)
+    with _materializadas_lock:
+        _materializadas[chave] = (serie, derivada)
+    return derivada
+
+
+def limpar_materializadas() -> None:
+    """Descarta as séries derivadas (útil em testes)."""
+    with _materializadas_lock:
+        _materializadas.clear()
@@ -0,0 +1,337 @@
+# gestao/services/indices/fatores.py
+
+"""
+Tabelas de fatores acumulados ("número-índice") das séries do catálogo.
+
+Para uma série de variações mensais v (em %), guarda o produto acumulado
+    N[i] = Π_{j < i} (1 + v_j/100)
+de modo que o fator entre duas competências quaisquer é uma única divisão:
+    fator(m0..m1) = N[m1 + 1] / N[m0]
+
+Séries de taxa diária (SELIC, TR) usam a mesma estrutura indexada pelo ordinal
+do dia. Períodos sem observação (meses ausentes, fins de semana e feriados, que
+não constam das séries SGS 1178/226) valem fator 1, como nos motores de cálculo.
+As tabelas são compartilhadas pelo processo (uma por índice do catálogo) e
+crescem incrementalmente quando chegam observações novas. Com
+`settings.GESTAO_CALCULO_PONTO_FIXO`, os acumulados são inteiros escalados
+(ver `services/ponto_fixo.py`); os fatores consultados continuam Decimal.
+
+Cada tabela mantém também o mapa de cobertura da série: a contagem acumulada
+de ordinais com observação, P[i] = #{j < i : v_j observado}. Assim, saber se
+uma faixa está completa também custa O(1): P[m1 + 1] - P[m0] == m1 - m0 + 1.
+"""
+
+import threading
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from .. import ponto_fixo as _pf
+from ..calendario import get_calendario
+
+UM = Decimal("1")
+CEM = Decimal("100")
+
+
+def ordinal_mes(d: date) -> int:
+    """Número sequencial da competência (ano * 12 + mês - 1)."""
+    return d.year * 12 + d.month - 1
+
+
+def ordinal_chave_mes(chave: str) -> int:
+    """Ordinal de uma chave 'YYYY-MM'."""
+    return int(chave[:4]) * 12 + int(chave[5:7]) - 1
+
+
+class _ProdutoAcumulado:
+    """
+    Produto acumulado de (1 + v/100) indexado por ordinal inteiro.
+
+    O estado (ordinal inicial, acumulados, valores, cobertura) é imutável e trocado
+    atomicamente a cada atualização, então as leituras não precisam de trava.
+    """
+
+    def _ordinal(self, chave: str) -> int:
+        raise NotImplementedError
+
+    def _chave(self, ordinal: int) -> str:
+        raise NotImplementedError
+
+    @staticmethod
+    def ordinal_data(d: date) -> int:
+        raise NotImplementedError
+
+    def __init__(self, ponto_fixo: bool = False) -> None:
+        self._lock = threading.Lock()
+        self.ponto_fixo = ponto_fixo
+        # Em ponto fixo, os acumulados são inteiros escalados; cada valor distinto da série
+        # (taxas diárias se repetem entre reuniões do Copom) é convertido uma única vez.
+        self._um = _pf.ESCALA if ponto_fixo else UM
+        self._convertidos: Dict[Decimal, int] = {}
+        self._estado: Tuple[int, List[Any], List[Optional[Decimal]], List[int]] = (0, [self._um], [], [0])
+
+    # ------------------------------------------------------------------
+
+    @property
+    def inicio(self) -> Optional[int]:
+        base, _, valores, _ = self._estado
+        return base if valores else None
+
+    @property
+    def fim(self) -> Optional[int]:
+        base, _, valores, _ = self._estado
+        return base + len(valores) - 1 if valores else None
+
+    def valor(self, ordinal: int) -> Optional[Decimal]:
+        """Variação (%) observada no ordinal, ou None se ausente."""
+        base, _, valores, _ = self._estado
+        i = ordinal - base
+        return valores[i] if 0 <= i < len(valores) else None
+
+    def fator(self, o0: int, o1: int) -> Decimal:
+        """Π (1 + v/100) para os ordinais o0..o1 (inclusive). Fora da tabela, fator 1."""
+        base, acumulado, valores, _ = self._estado
+        i0 = max(o0 - base, 0)
+        i1 = min(o1 - base, len(valores) - 1)
+        if i1 < i0:
+            return UM
+        if self.ponto_fixo:
+            # A escala se cancela na razão: uma divisão Decimal, único arredondamento da saída.
+            return Decimal(acumulado[i1 + 1]) / Decimal(acumulado[i0])
+        return acumulado[i1 + 1] / acumulado[i0]
+
+    def observados(self, o0: int, o1: int) -> int:
+        """Quantidade de ordinais com observação em o0..o1 (inclusive), em O(1)."""
+        base, _, valores, cobertura = self._estado
+        i0 = max(o0 - base, 0)
+        i1 = min(o1 - base, len(valores) - 1)
+        return cobertura[i1 + 1] - cobertura[i0] if i1 >= i0 else 0
+
+    def completa(self, o0: int, o1: int) -> bool:
+        """True se todos os ordinais de o0..o1 têm observação."""
+        return o1 < o0 or self.observados(o0, o1) == o1 - o0 + 1
+
+    def ausentes(self, o0: int, o1: int) -> List[int]:
+        """Ordinais sem observação em o0..o1; percorre a faixa apenas se ela estiver incompleta."""
+        if self.completa(o0, o1):
+            return []
+        return [o for o in range(o0, o1 + 1) if self.valor(o) is None]
+
+    # ------------------------------------------------------------------
+
+    def atualizar(self, valores: Mapping[str, Decimal], o0: int, o1: int) -> None:
+        """
+        Incorpora o conteúdo autoritativo dos ordinais o0..o1 (ordinais sem valor
+        em `valores` passam a ser ausências). Competências novas após o fim da
+        tabela são apenas anexadas; revisões ou períodos anteriores reconstroem-na.
+        """
+        novos: Dict[int, Decimal] = {self._ordinal(k): v for k, v in valores.items()}
+        with self._lock:
+            base, acumulado, atuais, _ = self._estado
+            fim_atual = base + len(atuais) - 1
+            if atuais and o0 >= base:
+                # Confere a parte já conhecida; se igual, só anexa o que vier depois do fim.
+                ate = min(o1, fim_atual)
+                if all(atuais[o - base] == novos.get(o) for o in range(o0, ate + 1)):
+                    if o1 <= fim_atual:
+                        return
+                    self._anexar(novos, fim_atual + 1, o1)
+                    return
+            self._reconstruir(novos, o0, o1)
+
+    def _anexar(self, novos: Dict[int, Decimal], o0: int, o1: int) -> None:
+        base, acumulado, atuais, cobertura = self._estado
+        acumulado, atuais, cobertura = list(acumulado), list(atuais), list(cobertura)
+        # Ordinais entre o fim atual e o0 não foram informados: ficam como ausências.
+        for o in range(base + len(atuais), o1 + 1):
+            v = novos.get(o) if o >= o0 else None
+            atuais.append(v)
+            acumulado.append(self._acumular(acumulado[-1], v))
+            cobertura.append(cobertura[-1] + (v is not None))
+        self._estado = (base, acumulado, atuais, cobertura)
+
+    def _reconstruir(self, novos: Dict[int, Decimal], o0: int, o1: int) -> None:
+        base, _, atuais, _ = self._estado
+        mesclado: Dict[int, Decimal] = {
+            base + i: v for i, v in enumerate(atuais) if v is not None and not (o0 <= base + i <= o1)
+        }
+        mesclado.update({o: v for o, v in novos.items() if o0 <= o <= o1})
+        nova_base = min([o0] + list(mesclado))
+        novo_fim = max([o1] + list(mesclado))
+        acumulado, valores, cobertura = [self._um], [], [0]
+        for o in range(nova_base, novo_fim + 1):
+            v = mesclado.get(o)
+            valores.append(v)
+            acumulado.append(self._acumular(acumulado[-1], v))
+            cobertura.append(cobertura[-1] + (v is not None))
+        self._estado = (nova_base, acumulado, valores, cobertura)
+
+    def _acumular(self, acumulado, v: Optional[Decimal]):
+        """acumulado * (1 + v/100); ausências valem fator 1."""
+        if v is None:
+            return acumulado
+        if not self.ponto_fixo:
+            return acumulado * (UM + v / CEM)
+        fator = self._convertidos.get(v)
+        if fator is None:
+            fator = self._convertidos[v] = _pf.fator_percentual(v)
+        return _pf.multiplicar(acumulado, fator)
+
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def de_valores(cls, valores: Mapping[str, Decimal], inicio: date, fim: date):
+        """Tabela avulsa (não compartilhada) para o conteúdo de [inicio, fim]."""
+        tabela = cls(ponto_fixo=_pf.ativo())
+        tabela.atualizar(valores, cls.ordinal_data(inicio), cls.ordinal_data(fim))
+        return tabela
+
+    def fator_periodo(self, inicio: date, fim: date) -> Decimal:
+        """Fator acumulado de `inicio` a `fim` (inclusive), sem pró-rata."""
+        return self.fator(self.ordinal_data(inicio), self.ordinal_data(fim))
+
+    def lacunas_periodo(self, inicio: date, fim: date) -> List[str]:
+        """Chaves sem observação no período (vazia, em O(1), se a faixa estiver completa)."""
+        return [self._chave(o) for o in self.ausentes(self.ordinal_data(inicio), self.ordinal_data(fim))]
+
+
+class NumeroIndiceMensal(_ProdutoAcumulado):
+    """Número-índice de uma série 'monthly_variation' (chaves 'YYYY-MM')."""
+
+    ordinal_data = staticmethod(ordinal_mes)
+
+    def _ordinal(self, chave: str) -> int:
+        return ordinal_chave_mes(chave)
+
+    def _chave(self, ordinal: int) -> str:
+        ano, mes = divmod(ordinal, 12)
+        return f"{ano:04d}-{mes + 1:02d}"
+
+    @classmethod
+    def de_variacoes(cls, variacoes: Mapping[str, Decimal], inicio: date, fim: date) -> "NumeroIndiceMensal":
+        return cls.de_valores(variacoes, inicio, fim)
+
+
+class FatorDiarioAcumulado(_ProdutoAcumulado):
+    """
+    Fator acumulado de uma série 'daily_rate' (chaves 'YYYY-MM-DD'), indexado pelo
+    ordinal do dia: o fator de qualquer faixa é uma consulta O(1), em vez de um
+    laço sobre todos os dias corridos.
+    """
+
+    ordinal_data = staticmethod(date.toordinal)
+
+    # Maior sequência de dias corridos sem taxa esperada (fim de semana + feriados emendados).
+    TOLERANCIA_DIAS = 7
+
+    def _ordinal(self, chave: str) -> int:
+        return date.fromisoformat(chave).toordinal()
+
+    def _chave(self, ordinal: int) -> str:
+        return date.fromordinal(ordinal).isoformat()
+
+    def lacunas_periodo(self, inicio: date, fim: date) -> List[str]:
+        """
+        Em séries diárias, dias sem taxa são normais (fins de semana, feriados). Uma
+        janela de TOLERANCIA_DIAS sem observação no início ou no fim da faixa indica
+        série incompleta (ex.: dados ainda não publicados). Fora da janela final, que
+        tolera a defasagem de publicação, a quantidade de observações é comparada, em
+        O(1), com a de dias úteis do calendário NACIONAL; só havendo falta os dias
+        úteis sem taxa são procurados.
+        """
+        o0, o1 = inicio.toordinal(), fim.toordinal()
+        if o1 - o0 + 1 < self.TOLERANCIA_DIAS:
+            return []
+        lacunas = []
+        if not self.observados(o0, o0 + self.TOLERANCIA_DIAS - 1):
+            lacunas.append(f"{self._chave(o0)}..{self._chave(o0 + self.TOLERANCIA_DIAS - 1)}")
+        if not self.observados(o1 - self.TOLERANCIA_DIAS + 1, o1):
+            lacunas.append(f"{self._chave(o1 - self.TOLERANCIA_DIAS + 1)}..{self._chave(o1)}")
+        if lacunas:
+            return lacunas
+
+        calendario = get_calendario("NACIONAL")
+        ate = date.fromordinal(o1 - self.TOLERANCIA_DIAS)
+        if not calendario.cobre(inicio, ate) or self.observados(o0, ate.toordinal()) >= calendario.contar_dias_uteis(inicio, ate):
+            return []
+        return [self._chave(o) for o in calendario.ordinais_uteis(inicio, ate) if self.valor(o) is None]
+
+
+class MemoFatores:
+    """
+    Fatores de faixa já calculados em uma execução de um motor de cálculo, por
+    (índice, início, fim, pró-rata). Parcelas que repetem uma faixa (mesmo índice e
+    mesmas datas) reaproveitam o fator em vez de refazê-lo. Vive só durante a
+    execução: não precisa de trava nem de invalidação.
+    """
+
+    __slots__ = ("_fatores", "acertos", "falhas")
+
+    def __init__(self) -> None:
+        self._fatores: Dict[Hashable, Any] = {}
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """Fator guardado em `chave`, ou o resultado de `calcular()` (que passa a ser guardado)."""
+        if chave in self._fatores:
+            self.acertos += 1
+            return self._fatores[chave]
+        self.falhas += 1
+        valor = self._fatores[chave] = calcular()
+        return valor
+
+    def como_dict(self) -> Dict[str, int]:
+        return {"faixas": len(self._fatores), "acertos": self.acertos, "falhas": self.falhas}
+
+    # --- Cálculo em paralelo: cada processo filho parte de uma cópia desta memória ---
+
+    def marca(self) -> Tuple[int, int, int]:
+        return len(self._fatores), self.acertos, self.falhas
+
+    def desde(self, marca: Tuple[int, int, int]) -> Tuple[Dict[Hashable, Any], int, int]:
+        """Fatores guardados, acertos e falhas desde `marca`."""
+        guardados, acertos, falhas = marca
+        novos = dict(list(self._fatores.items())[guardados:])
+        return novos, self.acertos - acertos, self.falhas - falhas
+
+    def incorporar(self, novos: Dict[Hashable, Any], acertos: int, falhas: int) -> None:
+        """
+        Soma o trabalho de uma cópia desta memória (`desde`). Um fator que outra cópia
+        já tinha calculado conta como acerto, como teria contado em uma execução só.
+        """
+        repetidos = sum(1 for chave in novos if chave in self._fatores)
+        self._fatores.update(novos)
+        self.acertos += acertos + repetidos
+        self.falhas += falhas - repetidos
+
+
+# --- Tabelas compartilhadas pelo processo ---
+_tabelas: Dict[Tuple[type, str, bool], _ProdutoAcumulado] = {}
+_tabelas_lock = threading.Lock()
+
+
+def tabela_compartilhada(classe: type, chave: str) -> _ProdutoAcumulado:
+    """Tabela acumulada compartilhada (por processo) do índice `chave`, na aritmética configurada."""
+    ponto_fixo = _pf.ativo()
+    with _tabelas_lock:
+        tabela = _tabelas.get((classe, chave, ponto_fixo))
+        if tabela is None:
+            tabela = _tabelas[(classe, chave, ponto_fixo)] = classe(ponto_fixo=ponto_fixo)
+        return tabela
+
+
+def numero_indice(chave: str) -> NumeroIndiceMensal:
+    """Tabela de número-índice compartilhada de um índice mensal do catálogo."""
+    return tabela_compartilhada(NumeroIndiceMensal, chave)
+
+
+def fator_diario(chave: str) -> FatorDiarioAcumulado:
+    """Tabela de fator diário acumulado compartilhada de um índice diário do catálogo."""
+    return tabela_compartilhada(FatorDiarioAcumulado, chave)
+
+
+def limpar_tabelas() -> None:
+    """Descarta todas as tabelas acumuladas (útil em testes)."""
+    with _tabelas_lock:
+        _tabelas.clear()
@@ -0,0 +1,155 @@
+# gestao/services/indices/metricas.py
+
+"""
+Instrumentação dos provedores de índices (contadores e histogramas por processo).
+
+Cada componente registra os próprios eventos sob o seu nome:
+
+  - BacenSGSProvider: buscas na API, falhas, latência, bytes recebidos, linhas lidas;
+  - armazenamento: acertos da cópia em memória, cargas do banco, cópias desatualizadas
+    servidas (revalidação em segundo plano), sincronizações feitas na hora;
+  - StaticTableProvider: consultas, latência, leituras do CSV sem a tabela compilada;
+  - SerieDerivadaProvider: séries derivadas reaproveitadas ou recalculadas.
+
+Por série do SGS (serie_id) ficam a última observação, a quantidade de observações
+carregadas e o volume recebido da API. As métricas vivem na memória de cada worker:
+o endpoint `api/indices/metricas/` mostra as do worker que atendeu a requisição; o
+comando `metricas_indices` mostra as do próprio processo e o estado das séries no banco.
+"""
+
+import bisect
+import threading
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from django.db.models import Count
+from django.utils import timezone
+
+from ...models import SerieIndice
+
+# Limites superiores (segundos) dos baldes dos histogramas de latência.
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histograma:
+    """Histograma de baldes fixos (contagem por limite superior, soma e máximo)."""
+
+    __slots__ = ("limites", "baldes", "contagem", "soma", "maximo")
+
+    def __init__(self, limites: Sequence[float] = LIMITES_LATENCIA) -> None:
+        self.limites = tuple(limites)
+        self.baldes = [0] * (len(self.limites) + 1)
+        self.contagem = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor: float) -> None:
+        self.baldes[bisect.bisect_left(self.limites, valor)] += 1
+        self.contagem += 1
+        self.soma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def quantil(self, q: float) -> Optional[float]:
+        """Limite superior do balde que contém o quantil `q` (None sem observações)."""
+        if not self.contagem:
+            return None
+        alvo, acumulado = q * self.contagem, 0
+        for limite, n in zip(self.limites + (self.maximo,), self.baldes):
+            acumulado += n
+            if acumulado >= alvo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+    def como_dict(self) -> Dict[str, Any]:
+        rotulos = [f"<={l:g}" for l in self.limites] + [f">{self.limites[-1]:g}"]
+        return {
+            "contagem": self.contagem,
+            "soma": round(self.soma, 6),
+            "media": round(self.soma / self.contagem, 6) if self.contagem else None,
+            "p50": self.quantil(0.5),
+            "p95": self.quantil(0.95),
+            "maximo": round(self.maximo, 6),
+            "baldes": dict(zip(rotulos, self.baldes)),
+        }
+
+
+_lock = threading.Lock()
+_contadores: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_histogramas: Dict[Tuple[str, str], Histograma] = {}
+_series: Dict[int, Dict[str, Any]] = {}
+_desde = timezone.now()
+
+
+def incrementar(provider: str, nome: str, n: int = 1) -> None:
+    with _lock:
+        _contadores[provider][nome] += n
+
+
+def observar(provider: str, nome: str, valor: float) -> None:
+    with _lock:
+        histograma = _histogramas.get((provider, nome))
+        if histograma is None:
+            histograma = _histogramas[(provider, nome)] = Histograma()
+        histograma.observar(valor)
+
+
+def registrar_carga(serie_id: int, observacoes: int, ultima_observacao: Optional[str]) -> None:
+    """Série carregada do banco para a memória."""
+    with _lock:
+        serie = _series.setdefault(serie_id, {})
+        serie["observacoes"] = observacoes
+        serie["ultima_observacao"] = ultima_observacao
+        serie["carregada_em"] = timezone.now().isoformat()
+
+
+def registrar_busca(serie_id: int, bytes_recebidos: int, linhas: int) -> None:
+    """Resposta da API do SGS recebida e lida para a série."""
+    with _lock:
+        serie = _series.setdefault(serie_id, {})
+        serie["buscas"] = serie.get("buscas", 0) + 1
+        serie["bytes_recebidos"] = serie.get("bytes_recebidos", 0) + bytes_recebidos
+        serie["linhas_lidas"] = serie.get("linhas_lidas", 0) + linhas
+        serie["ultima_busca"] = timezone.now().isoformat()
+
+
+def snapshot(hoje: Optional[date] = None) -> Dict[str, Any]:
+    """Retrato das métricas do processo, serializável em JSON."""
+    hoje = hoje or timezone.localdate()
+    with _lock:
+        providers: Dict[str, Dict[str, Any]] = {
+            nome: {"contadores": dict(contadores), "histogramas": {}} for nome, contadores in _contadores.items()
+        }
+        for (nome, metrica), histograma in _histogramas.items():
+            providers.setdefault(nome, {"contadores": {}, "histogramas": {}})["histogramas"][metrica] = \
+                histograma.como_dict()
+        series = {sid: dict(dados) for sid, dados in _series.items()}
+    for dados in series.values():
+        ultima = dados.get("ultima_observacao")
+        dados["idade_dias"] = (hoje - date.fromisoformat(ultima)).days if ultima else None
+    return {"desde": _desde.isoformat(), "providers": providers, "series": series}
+
+
+def estado_armazenamento(hoje: Optional[date] = None) -> Dict[int, Dict[str, Any]]:
+    """Estado de cada série no armazenamento local (compartilhado por todos os workers), em uma consulta."""
+    hoje = hoje or timezone.localdate()
+    estado = {}
+    for serie in SerieIndice.objects.annotate(n=Count("observacoes")).order_by("serie_id"):
+        ultima = serie.ultima_observacao
+        estado[serie.serie_id] = {
+            "observacoes": serie.n,
+            "ultima_observacao": ultima.isoformat() if ultima else None,
+            "idade_dias": (hoje - ultima).days if ultima else None,
+            "sincronizado_em": serie.sincronizado_em.isoformat() if serie.sincronizado_em else None,
+        }
+    return estado
+
+
+def limpar() -> None:
+    """Zera as métricas (útil em testes)."""
+    global _desde
+    with _lock:
+        _contadores.clear()
+        _histogramas.clear()
+        _series.clear()
+        _desde = timezone.now()
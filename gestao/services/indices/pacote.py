@@ -0,0 +1,267 @@
+# gestao/services/indices/pacote.py
+
+"""
+Pacotes offline das séries de índices.
+
+Um pacote é um retrato das séries do armazenamento local (`ObservacaoIndice`) que
+pode ser levado para servidores sem acesso à API do Banco Central. Três formatos:
+
+  - json: colunar ({serie_id: {datas: [...], valores: [...]}}), legível;
+  - csv:  uma linha por observação (serie_id,data,valor), fácil de auditar;
+  - bin:  ordinais de data (int32) e valores em ponto fixo (int64, 8 casas),
+          comprimido com zlib — o menor e o mais rápido de ler.
+
+Todos os formatos levam o SHA-256 do conteúdo, conferido na leitura. A leitura é
+feita de uma vez (arquivo inteiro, colunas inteiras), sem processar linha a linha
+com consultas ao banco, e a gravação usa `bulk_create` por série.
+
+Se `settings.GESTAO_INDICES_PACOTE` apontar para um pacote, ele serve de reserva
+quando a série não está no banco e a API não responde (ver `store.obter_serie`).
+"""
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from ...models import ObservacaoIndice, SerieIndice
+from . import store  # store também importa este módulo; usado só dentro das funções
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("json", "csv", "bin")
+VERSAO = 1
+MAGICA = b"GIDX\x01"
+CABECALHO_CSV = "#gestao-indices"
+CASAS = 8  # mesmas casas decimais de ObservacaoIndice.valor
+ESCALA = Decimal(10) ** CASAS
+_BIG_ENDIAN = sys.byteorder == "big"  # o formato binário é sempre little-endian
+
+# {serie_id: [('YYYY-MM-DD', Decimal), ...]} em ordem de data
+Series = Dict[int, List[Tuple[str, Decimal]]]
+
+
+class PacoteInvalido(ValueError):
+    """Pacote corrompido, de formato desconhecido ou com checksum divergente."""
+
+
+def formato_do_caminho(caminho: Path, formato: Optional[str] = None) -> str:
+    formato = (formato or Path(caminho).suffix.lstrip(".")).lower()
+    if formato not in FORMATOS:
+        raise PacoteInvalido(f"Formato de pacote desconhecido: '{formato}' (use {', '.join(FORMATOS)}).")
+    return formato
+
+
+def _sha256(dados: bytes) -> str:
+    return hashlib.sha256(dados).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Serialização
+# ----------------------------------------------------------------------
+
+def _json_canonico(colunas: dict) -> bytes:
+    return json.dumps(colunas, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _serializar_json(series: Series) -> bytes:
+    colunas = {
+        str(sid): {"datas": [d for d, _ in pares], "valores": [str(v) for _, v in pares]}
+        for sid, pares in sorted(series.items())
+    }
+    envelope = {"formato": "gestao-indices", "versao": VERSAO, "sha256": _sha256(_json_canonico(colunas)),
+                "series": colunas}
+    return json.dumps(envelope, separators=(",", ":")).encode("utf-8")
+
+
+def _ler_json(dados: bytes) -> Series:
+    try:
+        envelope = json.loads(dados)
+        colunas = envelope["series"]
+        esperado = envelope["sha256"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise PacoteInvalido(f"Pacote JSON ilegível: {e}")
+    if _sha256(_json_canonico(colunas)) != esperado:
+        raise PacoteInvalido("Checksum do pacote JSON não confere.")
+    return {int(sid): list(zip(c["datas"], map(Decimal, c["valores"]))) for sid, c in colunas.items()}
+
+
+def _serializar_csv(series: Series) -> bytes:
+    corpo = io.StringIO()
+    escritor = csv.writer(corpo, lineterminator="\n")
+    escritor.writerow(["serie_id", "data", "valor"])
+    for sid, pares in sorted(series.items()):
+        escritor.writerows((sid, d, v) for d, v in pares)
+    corpo_bytes = corpo.getvalue().encode("utf-8")
+    cabecalho = f"{CABECALHO_CSV};versao={VERSAO};sha256={_sha256(corpo_bytes)}\n".encode("utf-8")
+    return cabecalho + corpo_bytes
+
+
+def _ler_csv(dados: bytes) -> Series:
+    cabecalho, _, corpo = dados.partition(b"\n")
+    campos = dict(p.split("=", 1) for p in cabecalho.decode("utf-8", "replace").split(";")[1:] if "=" in p)
+    if not cabecalho.startswith(CABECALHO_CSV.encode()) or "sha256" not in campos:
+        raise PacoteInvalido("Pacote CSV sem cabeçalho de checksum.")
+    if _sha256(corpo) != campos["sha256"]:
+        raise PacoteInvalido("Checksum do pacote CSV não confere.")
+    series: Series = {}
+    linhas = csv.reader(io.StringIO(corpo.decode("utf-8")))
+    next(linhas, None)
+    for sid, d, v in linhas:
+        series.setdefault(int(sid), []).append((d, Decimal(v)))
+    return series
+
+
+def _serializar_bin(series: Series) -> bytes:
+    corpo = bytearray()
+    for sid, pares in sorted(series.items()):
+        datas = array("i", (date.fromisoformat(d).toordinal() for d, _ in pares))
+        valores = array("q", (int((v * ESCALA).to_integral_value()) for _, v in pares))
+        if _BIG_ENDIAN:
+            datas.byteswap()
+            valores.byteswap()
+        corpo += struct.pack("<II", sid, len(pares)) + datas.tobytes() + valores.tobytes()
+    corpo = bytes(corpo)
+    return MAGICA + hashlib.sha256(corpo).digest() + zlib.compress(corpo, 6)
+
+
+def _ler_bin(dados: bytes) -> Series:
+    if not dados.startswith(MAGICA):
+        raise PacoteInvalido("Arquivo não é um pacote binário de índices.")
+    digest, comprimido = dados[len(MAGICA):len(MAGICA) + 32], dados[len(MAGICA) + 32:]
+    try:
+        corpo = zlib.decompress(comprimido)
+    except zlib.error as e:
+        raise PacoteInvalido(f"Pacote binário corrompido: {e}")
+    if hashlib.sha256(corpo).digest() != digest:
+        raise PacoteInvalido("Checksum do pacote binário não confere.")
+
+    series: Series = {}
+    pos = 0
+    while pos < len(corpo):
+        sid, n = struct.unpack_from("<II", corpo, pos)
+        pos += 8
+        datas, valores = array("i"), array("q")
+        datas.frombytes(corpo[pos:pos + 4 * n])
+        pos += 4 * n
+        valores.frombytes(corpo[pos:pos + 8 * n])
+        pos += 8 * n
+        if _BIG_ENDIAN:
+            datas.byteswap()
+            valores.byteswap()
+        series[sid] = [
+            (date.fromordinal(o).isoformat(), Decimal(q).scaleb(-CASAS)) for o, q in zip(datas, valores)
+        ]
+    return series
+
+
+_SERIALIZADORES = {"json": _serializar_json, "csv": _serializar_csv, "bin": _serializar_bin}
+_LEITORES = {"json": _ler_json, "csv": _ler_csv, "bin": _ler_bin}
+
+
+def escrever_pacote(caminho: Path, series: Series, formato: Optional[str] = None) -> int:
+    """Grava o pacote em `caminho`. Retorna o tamanho em bytes."""
+    dados = _SERIALIZADORES[formato_do_caminho(caminho, formato)](series)
+    Path(caminho).write_bytes(dados)
+    return len(dados)
+
+
+def ler_pacote(caminho: Path, formato: Optional[str] = None) -> Series:
+    """Lê e valida (checksum) o pacote em `caminho`."""
+    return _LEITORES[formato_do_caminho(caminho, formato)](Path(caminho).read_bytes())
+
+
+# ----------------------------------------------------------------------
+# Banco de dados
+# ----------------------------------------------------------------------
+
+def series_armazenadas(serie_ids: Optional[Iterable[int]] = None) -> Series:
+    """Todas as observações armazenadas (opcionalmente só de `serie_ids`), em uma única consulta."""
+    qs = ObservacaoIndice.objects.all()
+    if serie_ids is not None:
+        qs = qs.filter(serie__serie_id__in=list(serie_ids))
+    series: Series = {}
+    for sid, d, v in qs.order_by("serie__serie_id", "data").values_list("serie__serie_id", "data", "valor").iterator():
+        series.setdefault(sid, []).append((d.isoformat(), v))
+    return series
+
+
+def gravar_series(series: Series) -> int:
+    """
+    Grava as observações do pacote no armazenamento local. Valores que diferem dos
+    armazenados seguem o caminho das revisões da sincronização (`store.registrar_revisoes`):
+    nova versão da série, `RevisaoIndice` e `serie_revisada`, que marca os rascunhos
+    afetados. Não marca as séries como sincronizadas: havendo rede, a sincronização
+    diária continua a partir da última observação importada.
+
+    Returns:
+        int: quantidade de observações gravadas.
+    """
+    total = 0
+    with transaction.atomic():
+        for sid, pares in series.items():
+            if not pares:
+                continue
+            SerieIndice.objects.get_or_create(serie_id=sid)
+            serie = SerieIndice.objects.select_for_update().get(serie_id=sid)
+            recebidas = dict(pares)
+            revisadas = store.registrar_revisoes(serie, recebidas, date.fromisoformat(min(recebidas)))
+            ObservacaoIndice.objects.bulk_create(
+                [ObservacaoIndice(serie=serie, data=date.fromisoformat(d), valor=v) for d, v in recebidas.items()],
+                batch_size=2000, ignore_conflicts=True,
+            )
+            ultima = date.fromisoformat(max(d for d, _ in pares))
+            if not serie.ultima_observacao or ultima > serie.ultima_observacao:
+                serie.ultima_observacao = ultima
+                serie.save(update_fields=["ultima_observacao"])
+            total += len(recebidas) + len(revisadas)
+    return total
+
+
+# ----------------------------------------------------------------------
+# Pacote de reserva configurado
+# ----------------------------------------------------------------------
+
+_snapshot: Tuple[Optional[Tuple[str, float]], Series] = (None, {})
+_snapshot_lock = threading.Lock()
+
+
+def snapshot() -> Series:
+    """
+    Conteúdo do pacote de reserva (`settings.GESTAO_INDICES_PACOTE`), lido uma vez
+    por processo e relido se o arquivo mudar. Sem pacote configurado ou legível, {}.
+    """
+    global _snapshot
+    caminho = getattr(settings, "GESTAO_INDICES_PACOTE", None)
+    if not caminho:
+        return {}
+    try:
+        chave = (str(caminho), Path(caminho).stat().st_mtime)
+    except OSError:
+        return {}
+    with _snapshot_lock:
+        if _snapshot[0] != chave:
+            try:
+                _snapshot = (chave, ler_pacote(Path(caminho)))
+            except (OSError, PacoteInvalido) as e:
+                logger.error(f"Pacote de índices de reserva '{caminho}' inválido: {e}")
+                _snapshot = (chave, {})
+        return _snapshot[1]
+
+
+def serie_do_snapshot(serie_id: int) -> List[Tuple[str, Decimal]]:
+    """Observações de uma série no pacote de reserva (lista vazia se ausente)."""
+    return snapshot().get(serie_id, [])
@@ -0,0 +1,186 @@
+# gestao/services/indices/planner.py
+
+"""
+Planejamento das buscas de índices de um cálculo.
+
+Um payload com dezenas de parcelas costuma pedir a mesma série (IPCA, SELIC...)
+em períodos levemente diferentes. Em vez de uma busca por faixa, o plano coleta
+todos os pedidos (indice, inicio, fim), une-os em um único período de cobertura
+por série, busca cada série uma vez e atende cada faixa recortando em memória.
+As séries distintas são buscadas em paralelo (pool de threads limitado), de modo
+que um cálculo com IPCA + SELIC + TR paga uma latência de rede, e não três.
+"""
+
+import bisect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.db import connections
+
+from . import fatores
+
+logger = logging.getLogger(__name__)
+
+# Função que busca uma série: (chave, inicio, fim) -> {'YYYY-MM' | 'YYYY-MM-DD': Decimal}
+BuscadorIndices = Callable[[str, date, date], Dict[str, Decimal]]
+
+# Máximo de séries buscadas ao mesmo tempo por plano.
+MAX_BUSCAS_PARALELAS = 4
+
+
+class _SerieRecortavel:
+    """Série já buscada, com chaves ordenadas para recorte por busca binária."""
+
+    __slots__ = ("inicio", "fim", "chaves", "valores", "tabela")
+
+    def __init__(self, inicio: date, fim: date, tabela: Dict[str, Decimal]):
+        self.inicio = inicio
+        self.fim = fim
+        self.tabela = tabela
+        pares = sorted(tabela.items())
+        self.chaves = [k for k, _ in pares]
+        self.valores = [v for _, v in pares]
+
+    def cobre(self, inicio: date, fim: date) -> bool:
+        return self.inicio <= inicio and fim <= self.fim
+
+    def recortar(self, inicio: date, fim: date) -> Dict[str, Decimal]:
+        if not self.chaves:
+            return {}
+        # Séries mensais usam chaves 'YYYY-MM'; diárias, 'YYYY-MM-DD'.
+        if len(self.chaves[0]) == 7:
+            k0, k1 = f"{inicio.year:04d}-{inicio.month:02d}", f"{fim.year:04d}-{fim.month:02d}"
+        else:
+            k0, k1 = inicio.isoformat(), fim.isoformat()
+        i = bisect.bisect_left(self.chaves, k0)
+        j = bisect.bisect_right(self.chaves, k1)
+        return dict(zip(self.chaves[i:j], self.valores[i:j]))
+
+
+class IndicesPlanejados:
+    """
+    Resultado de um plano executado. Expõe a mesma interface de consulta do
+    `ServicoIndices` (`get_indices_por_periodo`), servida a partir da memória.
+    """
+
+    def __init__(self, buscar: BuscadorIndices, series: Dict[str, _SerieRecortavel],
+                 erros: Dict[str, Exception]) -> None:
+        self._buscar = buscar
+        self._series = series
+        self._erros = erros
+        self._tabelas: Dict[Tuple[type, str], object] = {}
+
+    @property
+    def chaves(self) -> List[str]:
+        """Índices do plano (buscados com sucesso ou não)."""
+        return list(self._series) + [k for k in self._erros if k not in self._series]
+
+    def get_indices_por_periodo(self, chave: str, inicio: date, fim: date) -> Dict[str, Decimal]:
+        if chave in self._erros:
+            raise self._erros[chave]
+        serie = self._series.get(chave)
+        if serie is not None and serie.cobre(inicio, fim):
+            return serie.recortar(inicio, fim)
+        # Período fora do plano: busca diretamente, sem prejuízo do resultado.
+        return self._buscar(chave, inicio, fim)
+
+    def _tabela_acumulada(self, classe: type, chave: str, inicio: date, fim: date):
+        """
+        Tabela acumulada de `chave`, garantidamente atualizada para [inicio, fim].
+        Dentro do plano, usa a tabela compartilhada do processo (atualizada uma vez
+        por plano); fora dele, monta uma tabela avulsa.
+        """
+        serie = self._series.get(chave)
+        if serie is None or not serie.cobre(inicio, fim):
+            return classe.de_valores(self.get_indices_por_periodo(chave, inicio, fim), inicio, fim)
+        tabela = self._tabelas.get((classe, chave))
+        if tabela is None:
+            tabela = fatores.tabela_compartilhada(classe, chave)
+            tabela.atualizar(serie.tabela, classe.ordinal_data(serie.inicio), classe.ordinal_data(serie.fim))
+            self._tabelas[(classe, chave)] = tabela
+        return tabela
+
+    def numero_indice(self, chave: str, inicio: date, fim: date) -> fatores.NumeroIndiceMensal:
+        """Número-índice do índice mensal `chave` válido para [inicio, fim]."""
+        return self._tabela_acumulada(fatores.NumeroIndiceMensal, chave, inicio, fim)
+
+    def fator_diario(self, chave: str, inicio: date, fim: date) -> fatores.FatorDiarioAcumulado:
+        """Fator diário acumulado do índice diário `chave` válido para [inicio, fim]."""
+        return self._tabela_acumulada(fatores.FatorDiarioAcumulado, chave, inicio, fim)
+
+
+class PlanoIndices:
+    """
+    Coleta os períodos de cada índice necessários a um cálculo.
+
+    Uso:
+        plano = PlanoIndices(servico.get_indices_por_periodo)
+        plano.adicionar("IPCA", date(2020, 3, 13), date(2023, 11, 3))
+        indices = plano.executar()
+        indices.get_indices_por_periodo("IPCA", date(2021, 1, 1), date(2021, 12, 31))
+    """
+
+    def __init__(self, buscar: BuscadorIndices) -> None:
+        self._buscar = buscar
+        self._periodos: Dict[str, Tuple[date, date]] = {}
+
+    def adicionar(self, chave: Optional[str], inicio: Optional[date], fim: Optional[date]) -> None:
+        """Registra um pedido. Pedidos incompletos são ignorados (a faixa falhará no cálculo)."""
+        if not chave or not isinstance(inicio, date) or not isinstance(fim, date) or inicio > fim:
+            return
+        atual = self._periodos.get(chave)
+        self._periodos[chave] = (min(atual[0], inicio), max(atual[1], fim)) if atual else (inicio, fim)
+
+    @property
+    def periodos(self) -> Dict[str, Tuple[date, date]]:
+        """Período de cobertura (inicio, fim) de cada índice do plano."""
+        return dict(self._periodos)
+
+    def _buscar_serie(self, chave: str, inicio: date, fim: date):
+        try:
+            return _SerieRecortavel(inicio, fim, self._buscar(chave, inicio, fim)), None
+        except Exception as e:
+            # O erro é entregue a cada faixa que usar o índice, como na busca individual.
+            logger.warning(f"Falha ao buscar o índice '{chave}' para o plano do cálculo: {e}")
+            return None, e
+
+    def _buscar_serie_em_thread(self, item):
+        chave, (inicio, fim) = item
+        try:
+            return self._buscar_serie(chave, inicio, fim)
+        finally:
+            # Cada thread do pool abre as próprias conexões de banco (armazenamento local).
+            connections.close_all()
+
+    def executar(self, max_paralelas: int = MAX_BUSCAS_PARALELAS) -> IndicesPlanejados:
+        """
+        Busca cada índice uma única vez no seu período de cobertura. Com mais de um
+        índice, as buscas correm em paralelo; as contas só começam com tudo carregado.
+        """
+        itens = list(self._periodos.items())
+        if len(itens) > 1 and max_paralelas > 1:
+            with ThreadPoolExecutor(max_workers=min(max_paralelas, len(itens)),
+                                    thread_name_prefix="indices") as pool:
+                resultados = list(pool.map(self._buscar_serie_em_thread, itens))
+        else:
+            resultados = [self._buscar_serie(chave, inicio, fim) for chave, (inicio, fim) in itens]
+
+        series: Dict[str, _SerieRecortavel] = {}
+        erros: Dict[str, Exception] = {}
+        for (chave, _), (serie, erro) in zip(itens, resultados):
+            if erro is not None:
+                erros[chave] = erro
+            else:
+                series[chave] = serie
+        return IndicesPlanejados(self._buscar, series, erros)
+
+
+def planejar(buscar: BuscadorIndices, pedidos: List[Tuple[Optional[str], Optional[date], Optional[date]]]) -> IndicesPlanejados:
+    """Atalho: monta e executa o plano para uma lista de pedidos (indice, inicio, fim)."""
+    plano = PlanoIndices(buscar)
+    for chave, inicio, fim in pedidos:
+        plano.adicionar(chave, inicio, fim)
+    return plano.executar()
@@ -3,17 +3,21 @@
 import csv
 import json
 import logging
+import threading
+import time
 from datetime import date, datetime, timedelta
 from decimal import Decimal, InvalidOperation
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Mapping
+from typing import Any, Dict, Mapping, Optional
 
 import requests
 from dateutil.relativedelta import relativedelta
+from django.db import DatabaseError
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from . import derivadas, fatores, metricas, pacote, store, tabela_compilada
 from .catalog import INDICE_CATALOG
 
 logger = logging.getLogger(__name__)
@@ -47,22 +51,34 @@ def _between_months(table: Mapping[str, Decimal], inicio: date, fim: date) -> Di
 
 def _project_data_dir() -> Path: return Path(__file__).resolve().parent / "data"
 
-@lru_cache(maxsize=32)
-def _load_table_from_file(filename: str) -> Dict[str, Decimal]:
+def _read_csv_table(path: Path) -> Dict[str, Decimal]:
+    """Lê um CSV de tabela estática; as colunas de data e valor são identificadas uma vez, pelo cabeçalho."""
+    table: Dict[str, Decimal] = {}
+    with path.open("r", encoding="utf-8-sig") as f:
+        delimiter = ';' if ';' in f.readline() else ','
+        f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
+        header = [h.strip().lower() for h in next(reader, [])]
+        data_idx = next((i for i, h in enumerate(header) if h in ['data', 'competencia', 'mes']), None)
+        valor_idx = next((i for i, h in enumerate(header) if h in ['valor', 'indice', 'fator', 'numero_indice']), None)
+        if data_idx is None or valor_idx is None: return table
+        for row in reader:
+            if len(row) > max(data_idx, valor_idx) and row[data_idx] and row[valor_idx]:
+                table[_month_key(row[data_idx])] = _safe_decimal(row[valor_idx])
+    return dict(sorted(table.items()))
+
+def _static_path(filename: str) -> Path:
     path = _project_data_dir() / filename
     if not path.exists(): raise FileNotFoundError(f"Arquivo de dados estáticos não encontrado: '{filename}'")
+    return path
+
+@lru_cache(maxsize=32)
+def _load_table_from_file(filename: str) -> Dict[str, Decimal]:
+    path = _static_path(filename)
     table: Dict[str, Decimal] = {}
     try:
         if path.suffix.lower() == ".csv":
-            with path.open("r", encoding="utf-8-sig") as f:
-                delimiter = ';' if ';' in f.readline() else ','
-                f.seek(0)
-                reader = csv.DictReader(f, delimiter=delimiter)
-                for row in reader:
-                    data_col = next((k for k in row if k.lower() in ['data', 'competencia', 'mes']), None)
-                    valor_col = next((k for k in row if k.lower() in ['valor', 'indice', 'fator', 'numero_indice']), None)
-                    if data_col and valor_col and row[data_col] and row[valor_col]:
-                        table[_month_key(row[data_col])] = _safe_decimal(row[valor_col])
+            table = _read_csv_table(path)
         elif path.suffix.lower() == ".json":
             data = json.loads(path.read_text(encoding="utf-8"))
             for k, v in data.items():
@@ -70,41 +86,135 @@ def _load_table_from_file(filename: str) -> Dict[str, Decimal]:
     except Exception as e: raise IOError(f"Erro ao ler ou processar o arquivo {filename}: {e}") from e
     return dict(sorted(table.items()))
 
+# --- Disjuntor (circuit breaker) ---
+class CircuitoAberto(requests.exceptions.ConnectionError):
+    """Chamada recusada sem acessar a rede: o disjuntor do serviço está aberto."""
+
+class Disjuntor:
+    """
+    Após `limite_falhas` falhas seguidas, recusa chamadas por `espera` segundos
+    (aberto). Passado esse tempo, deixa passar uma única tentativa (meio-aberto):
+    sucesso fecha o circuito, falha o reabre; resposta inconclusiva não muda o estado.
+    """
+    FECHADO, ABERTO, MEIO_ABERTO = "fechado", "aberto", "meio-aberto"
+
+    def __init__(self, nome: str, limite_falhas: int = 3, espera: float = 60.0, relogio=time.monotonic) -> None:
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.espera = espera
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._falhas = 0
+        self._aberto_em: Optional[float] = None
+        self._em_teste = False
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._aberto_em is None: return self.FECHADO
+            return self.MEIO_ABERTO if self._relogio() - self._aberto_em >= self.espera else self.ABERTO
+
+    def permite(self) -> bool:
+        with self._lock:
+            if self._aberto_em is None: return True
+            if self._em_teste or self._relogio() - self._aberto_em < self.espera: return False
+            self._em_teste = True
+            return True
+
+    def sucesso(self) -> None:
+        with self._lock:
+            self._falhas, self._aberto_em, self._em_teste = 0, None, False
+
+    def inconclusivo(self) -> None:
+        """A chamada não diz nada sobre a saúde do serviço: só libera a tentativa em andamento."""
+        with self._lock:
+            self._em_teste = False
+
+    def falha(self) -> None:
+        with self._lock:
+            self._falhas += 1
+            if self._em_teste or self._falhas >= self.limite_falhas:
+                if self._aberto_em is None or self._em_teste:
+                    logger.error(f"Disjuntor '{self.nome}' aberto após {self._falhas} falha(s) seguida(s).")
+                self._aberto_em = self._relogio()
+            self._em_teste = False
+
 # --- Classes de Provedores ---
 class BaseProvider:
     def get_indices(self, inicio: date, fim: date, **kwargs: Any) -> Dict[str, Decimal]:
         raise NotImplementedError
 
+    def frescor(self, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        """Metadados de atualização da série (última observação, idade...), se conhecidos."""
+        return None
+
 class BacenSGSProvider(BaseProvider):
     BASE_URL = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{serie_id}/dados"
 
-    def __init__(self):
-        self.session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
-        self.session.headers.update({"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"})
+    def __init__(self, session: Optional[requests.Session] = None):
+        # Por padrão usa a sessão keep-alive compartilhada pelo processo (ver ProviderRegistry)
+        self.session = session or registry.session()
 
-    @lru_cache(maxsize=64)
     def _fetch_from_api(self, serie_id: int, inicio: date, fim: date) -> Dict[str, Decimal]:
+        """Consulta a API do SGS. Falhas de comunicação são propagadas ao chamador."""
         url = self.BASE_URL.format(serie_id=serie_id)
         params = {'formato': 'json', 'dataInicial': inicio.strftime('%d/%m/%Y'), 'dataFinal': fim.strftime('%d/%m/%Y')}
+        disjuntor = registry.disjuntor("bacen_sgs")
+        if not disjuntor.permite():
+            metricas.incrementar("BacenSGSProvider", "bloqueadas_disjuntor")
+            raise CircuitoAberto(f"API do Bacen indisponível (disjuntor aberto); série {serie_id} não consultada.")
         logger.info(f"Buscando série SGS {serie_id} de {params['dataInicial']} a {params['dataFinal']}")
+        metricas.incrementar("BacenSGSProvider", "buscas")
+        inicio_relogio = time.perf_counter()
         try:
             response = self.session.get(url, params=params, timeout=15, verify=True)
             response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            # Erros do cliente (4xx) não indicam nem indisponibilidade nem recuperação do serviço.
+            if e.response is None or e.response.status_code >= 500: disjuntor.falha()
+            else: disjuntor.inconclusivo()
+            metricas.incrementar("BacenSGSProvider", "falhas")
+            raise
+        except requests.exceptions.RequestException:
+            disjuntor.falha()
+            metricas.incrementar("BacenSGSProvider", "falhas")
+            raise
+        finally:
+            metricas.observar("BacenSGSProvider", "latencia_busca", time.perf_counter() - inicio_relogio)
+        disjuntor.sucesso()
+        try:
             data = response.json()
             table = {}
             for item in data:
                 if item and 'data' in item and 'valor' in item and item['valor']:
                     data_item = datetime.strptime(item['data'], '%d/%m/%Y').date()
                     table[data_item.isoformat()] = _safe_decimal(item['valor'])
+            metricas.incrementar("BacenSGSProvider", "bytes_recebidos", len(response.content))
+            metricas.incrementar("BacenSGSProvider", "linhas_lidas", len(table))
+            metricas.registrar_busca(serie_id, len(response.content), len(table))
             return table
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro de comunicação com a API do Bacen para a série {serie_id}: {e}")
-            return {}
         except (json.JSONDecodeError, KeyError, TypeError) as e:
             raise ValueError(f"Resposta inválida da API do Bacen para a série {serie_id}: {e}")
 
+    def _get_from_store(self, serie_id: int, api_inicio: date, api_fim: date) -> Dict[str, Decimal]:
+        """Lê o período do armazenamento local; sem banco disponível, consulta a API diretamente."""
+        try:
+            serie = store.obter_serie(serie_id, self._fetch_from_api, desde=api_inicio)
+        except DatabaseError as e:
+            logger.warning(f"Armazenamento local indisponível para a série {serie_id} ({e}); consultando a API.")
+            try:
+                return self._fetch_from_api(serie_id, api_inicio, api_fim)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Erro de comunicação com a API do Bacen para a série {serie_id}: {e}")
+                # Último recurso: o pacote offline de reserva, lido direto do arquivo.
+                ini_iso, fim_iso = api_inicio.isoformat(), api_fim.isoformat()
+                return {d: v for d, v in pacote.serie_do_snapshot(serie_id) if ini_iso <= d <= fim_iso}
+        return dict(serie.intervalo(api_inicio.isoformat(), api_fim.isoformat()))
+
+    def frescor(self, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        serie_id = kwargs.get('params', {}).get('serie_id')
+        return store.frescor_serie(serie_id) if serie_id else None
+
     def get_indices(self, inicio: date, fim: date, **kwargs: Any) -> Dict[str, Decimal]:
         params = kwargs.get('params', {})
         serie_id = params.get('serie_id')
@@ -113,13 +223,13 @@ class BacenSGSProvider(BaseProvider):
 
         api_inicio = inicio.replace(day=1) if index_type == 'monthly_variation' else inicio
         api_fim = (fim + relativedelta(months=1, day=1) - timedelta(days=1)) if index_type == 'monthly_variation' else fim
-        api_data = self._fetch_from_api(serie_id, api_inicio, api_fim)
+        api_data = self._get_from_store(serie_id, api_inicio, api_fim)
         if not api_data:
-            logger.warning(f"Nenhum dado retornado pela API do Bacen para a série {serie_id}.")
+            logger.warning(f"Nenhum dado disponível para a série {serie_id} no período solicitado.")
             return {}
 
         if index_type == 'daily_rate':
-            return {k: v for k, v in api_data.items() if inicio.isoformat() <= k <= fim.isoformat()}
+            return api_data
         else:
             monthly_table = {}
             for iso_date, value in api_data.items():
@@ -131,15 +241,58 @@ class StaticTableProvider(BaseProvider):
         params = kwargs.get('params', {})
         filename = params.get('filename')
         if not filename: raise ValueError("StaticTableProvider requer o 'filename'.")
-        return _between_months(_load_table_from_file(filename), inicio, fim)
+        metricas.incrementar("StaticTableProvider", "consultas")
+        inicio_relogio = time.perf_counter()
+        try:
+            if Path(filename).suffix.lower() == ".csv":
+                # CSVs são servidos da tabela compilada e mapeada em memória (recompilada se o CSV mudar)
+                path = _static_path(filename)
+                try: return tabela_compilada.tabela_compilada(path, _read_csv_table).intervalo(inicio, fim)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Tabela compilada indisponível para '{filename}' ({e}); lendo o CSV.")
+                    metricas.incrementar("StaticTableProvider", "leituras_sem_compilacao")
+            return _between_months(_load_table_from_file(filename), inicio, fim)
+        finally:
+            metricas.observar("StaticTableProvider", "latencia_consulta", time.perf_counter() - inicio_relogio)
+
+class SerieDerivadaProvider(BaseProvider):
+    """
+    Série derivada de uma série do SGS do catálogo (params: 'origem', 'derivacao'),
+    materializada uma vez a cada nova carga da origem (ver derivadas.py).
+    """
+    def _origem(self, params: Mapping[str, Any]) -> int:
+        origem, derivacao = params.get('origem'), params.get('derivacao')
+        meta = INDICE_CATALOG.get(origem) or {}
+        if meta.get('provider') != 'BacenSGSProvider': raise ValueError(f"Série de origem inválida: '{origem}'.")
+        if derivacao not in derivadas.DERIVACOES: raise ValueError(f"Derivação desconhecida: '{derivacao}'.")
+        return meta['params']['serie_id']
+
+    def get_indices(self, inicio: date, fim: date, **kwargs: Any) -> Dict[str, Decimal]:
+        params = kwargs.get('params', {})
+        serie_id = self._origem(params)
+        # O acumulado em 12 meses precisa das 11 observações anteriores ao início
+        desde = inicio.replace(day=1)
+        if params['derivacao'] == 'acumulado_12m': desde = (desde - timedelta(days=335)).replace(day=1)
+        try: serie = store.obter_serie(serie_id, registry.get('BacenSGSProvider')._fetch_from_api, desde=desde)
+        except DatabaseError as e:
+            logger.error(f"Armazenamento local indisponível para a série {serie_id} ({e}); série derivada vazia.")
+            return {}
+        return _between_months(derivadas.materializar(serie, params['derivacao']), inicio, fim)
+
+    def frescor(self, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        try: return store.frescor_serie(self._origem(kwargs.get('params', {})))
+        except ValueError: return None
 
 # --- Serviço de Alto Nível ---
-PROVIDERS_MAP = {"BacenSGSProvider": BacenSGSProvider, "StaticTableProvider": StaticTableProvider}
+PROVIDERS_MAP = {
+    "BacenSGSProvider": BacenSGSProvider,
+    "StaticTableProvider": StaticTableProvider,
+    "SerieDerivadaProvider": SerieDerivadaProvider,
+}
 
 class ServicoIndices:
     def __init__(self) -> None:
         self._catalog = INDICE_CATALOG
-        self._providers = {name: ProviderClass() for name, ProviderClass in PROVIDERS_MAP.items()}
 
     def get_meta(self, chave: str) -> Dict[str, Any]:
         if not (meta := self._catalog.get(chave)): raise KeyError(f"Índice '{chave}' não encontrado.")
@@ -148,8 +301,98 @@ class ServicoIndices:
     def get_indices_por_periodo(self, chave: str, inicio: date, fim: date) -> Dict[str, Decimal]:
         meta = self.get_meta(chave)
         provider_name = meta.get("provider")
-        if not (provider_instance := self._providers.get(provider_name)):
-            raise ValueError(f"Provider '{provider_name}' não mapeado.")
+        try: provider_instance = registry.get(provider_name)
+        except KeyError: raise ValueError(f"Provider '{provider_name}' não mapeado.")
         return provider_instance.get_indices(
             inicio=inicio, fim=fim, params=meta.get("params", {}), index_type=meta.get("type")
-        )
\ No newline at end of file
+        )
+
+    def frescor(self, chaves) -> Dict[str, Dict[str, Any]]:
+        """Metadados de atualização das séries `chaves` que os tiverem (para anexar aos resultados)."""
+        saida = {}
+        for chave in chaves:
+            try:
+                meta = self.get_meta(chave)
+                info = registry.get(meta.get("provider")).frescor(params=meta.get("params", {}))
+            except Exception:
+                continue
+            if info: saida[chave] = info
+        return saida
+
+# --- Registro de Providers (um por processo) ---
+class ProviderRegistry:
+    """
+    Registro thread-safe das instâncias de providers, do serviço de índices e da
+    sessão HTTP keep-alive, compartilhados por todas as requisições do processo.
+    Assim, conexões e caches são aquecidos uma vez por worker, e não por faixa.
+    """
+    POOL_CONNECTIONS = 4
+    POOL_MAXSIZE = 16
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+    def __init__(self, providers_map: Mapping[str, type]) -> None:
+        self._map = providers_map
+        self._lock = threading.RLock()
+        self._instances: Dict[str, BaseProvider] = {}
+        self._servico: Optional[ServicoIndices] = None
+        self._session: Optional[requests.Session] = None
+        self._disjuntores: Dict[str, Disjuntor] = {}
+
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+                session.mount("https://", HTTPAdapter(
+                    max_retries=retries, pool_connections=self.POOL_CONNECTIONS, pool_maxsize=self.POOL_MAXSIZE
+                ))
+                session.headers.update({"User-Agent": self.USER_AGENT})
+                self._session = session
+            return self._session
+
+    def disjuntor(self, nome: str) -> Disjuntor:
+        with self._lock:
+            if nome not in self._disjuntores: self._disjuntores[nome] = Disjuntor(nome)
+            return self._disjuntores[nome]
+
+    def get(self, name: str) -> BaseProvider:
+        provider_class = self._map[name]
+        with self._lock:
+            instance = self._instances.get(name)
+            if type(instance) is not provider_class:
+                instance = self._instances[name] = provider_class()
+            return instance
+
+    def servico(self) -> ServicoIndices:
+        with self._lock:
+            if self._servico is None: self._servico = ServicoIndices()
+            return self._servico
+
+    def reset(self) -> None:
+        """Descarta instâncias, sessão e caches compartilhados (gancho para testes)."""
+        with self._lock:
+            if self._session is not None: self._session.close()
+            self._session = None
+            self._instances.clear()
+            self._disjuntores.clear()
+            self._servico = None
+        store.limpar_cache()
+        fatores.limpar_tabelas()
+        _load_table_from_file.cache_clear()
+        tabela_compilada.fechar_tabelas()
+        derivadas.limpar_materializadas()
+        metricas.limpar()
+
+registry = ProviderRegistry(PROVIDERS_MAP)
+
+def get_provider(name: str) -> BaseProvider:
+    """Instância compartilhada do provider `name`."""
+    return registry.get(name)
+
+def get_servico_indices() -> ServicoIndices:
+    """Serviço de índices compartilhado pelo processo."""
+    return registry.servico()
+
+def reset_providers() -> None:
+    """Limpa o registro de providers e todos os caches de índices do processo."""
+    registry.reset()
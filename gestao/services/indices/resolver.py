@@ -6,7 +6,9 @@ from datetime import date, datetime
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from typing import Any, Dict, List, Mapping, Optional, Tuple
 
-from .providers import ServicoIndices
+from ..nucleo_calculo import NucleoCalculo
+from ..periodos import meses_periodo
+from .providers import ServicoIndices, get_servico_indices
 
 # =============================================================================
 # Utilidades
@@ -100,22 +102,6 @@ def _month_key(d: date | str | datetime) -> str:
     return f"{dd.year:04d}-{dd.month:02d}"
 
 
-def _months_between(inicio: date, fim: date) -> List[str]:
-    """
-    Lista de chaves 'YYYY-MM' do período (inclusive).
-    """
-    y, m = inicio.year, inicio.month
-    yf, mf = fim.year, fim.month
-    out: List[str] = []
-    while (y < yf) or (y == yf and m <= mf):
-        out.append(f"{y:04d}-{m:02d}")
-        m += 1
-        if m > 12:
-            m = 1
-            y += 1
-    return out
-
-
 # =============================================================================
 # Núcleo do cálculo
 # =============================================================================
@@ -153,10 +139,27 @@ class IndiceResolver:
     """
 
     def __init__(self, service: Optional[ServicoIndices] = None) -> None:
-        self.service = service or ServicoIndices()
+        self.service = service or get_servico_indices()
+        self._nucleo = NucleoCalculo(servico=self.service)
 
     # ------------------------------------------------------------------
 
+    def _fator_faixa(
+        self, indice_key: str, dt_inicio: date, dt_fim: date
+    ) -> Tuple[Decimal, List[Tuple[str, Decimal]], List[str]]:
+        """Fator da faixa e meses usados/ausentes (o resolver não aplica pró-rata)."""
+        # Lista de meses usados para a memória de cálculo
+        variacoes = self._nucleo.variacoes_mensais(indice_key, dt_inicio, dt_fim)
+        meses_usados = [(mes.chave, var) for mes, var in variacoes if var is not None]
+
+        # Fator do período: Π (1 + var/100), obtido do número-índice da série (uma divisão);
+        # os meses ausentes saem do mapa de cobertura, sem percorrer a faixa se ela estiver completa.
+        if self.service.get_meta(indice_key).get("type") == "monthly_variation":
+            fator, ausentes, _ = self._nucleo.fator(indice_key, "monthly_variation", dt_inicio, dt_fim)
+        else:
+            fator, ausentes, _ = self._nucleo.fator_competencias(indice_key, dt_inicio, dt_fim)
+        return fator, meses_usados, ausentes
+
     def _corrigir_faixa(
         self,
         valor_base: Decimal,
@@ -164,22 +167,8 @@ class IndiceResolver:
         dt_inicio: date,
         dt_fim: date,
     ) -> FaixaResultado:
-        meta = self.service.get_meta(indice_key)
-        tabela = self.service.get_indices_por_periodo(indice_key, dt_inicio, dt_fim)
-
-        # Constrói a lista de meses e aplica produto
-        meses = _months_between(dt_inicio, dt_fim)
-        fator = Decimal("1.0")
-        meses_usados: List[Tuple[str, Decimal]] = []
-        ausentes: List[str] = []
-
-        for k in meses:
-            if k in tabela:
-                var = tabela[k]  # já é Decimal
-                meses_usados.append((k, var))
-                fator *= (Decimal("1.0") + (var / Decimal("100")))
-            else:
-                ausentes.append(k)
+        # Fator e meses ausentes só dependem da faixa: o núcleo os calcula uma vez por execução
+        fator, meses_usados, ausentes = self._fator_faixa(indice_key, dt_inicio, dt_fim)
 
         valor_corrigido = (valor_base * fator).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
@@ -205,7 +194,7 @@ class IndiceResolver:
         """
         Juros simples: valor * (i * n_meses)
         """
-        n_meses = Decimal(str(len(_months_between(dt_inicio, dt_fim))))
+        n_meses = Decimal(len(meses_periodo(dt_inicio, dt_fim)))
         juros = (valor_base * (perc_ao_mes / Decimal("100")) * n_meses).quantize(
             Decimal("0.01"), rounding=ROUND_HALF_UP
         )
@@ -213,6 +202,27 @@ class IndiceResolver:
 
     # ------------------------------------------------------------------
 
+    def _planejar_indices(self, parcelas: List[Mapping[str, Any]]) -> None:
+        """
+        Une os períodos de todas as faixas por índice e busca cada série uma única vez.
+        Faixas com dados inválidos são ignoradas aqui e reportadas no cálculo da parcela.
+        """
+        self._nucleo = NucleoCalculo(servico=self.service)
+        for p in parcelas:
+            try:
+                dt_valor = _parse_date_any(p.get("data_valor"))
+                for fx in p.get("faixas") or []:
+                    self._nucleo.adicionar(
+                        (fx.get("indice") or "").strip(),
+                        _parse_date_any(fx.get("inicio") or dt_valor),
+                        _parse_date_any(fx.get("fim") or dt_valor),
+                    )
+            except Exception:
+                continue
+        self._nucleo.preparar()
+
+    # ------------------------------------------------------------------
+
     def corrigir_parcelas(self, payload: Mapping[str, Any]) -> Dict[str, Any]:
         """
         Espera o mesmo *shape* que vem do wizard no frontend:
@@ -241,6 +251,8 @@ class IndiceResolver:
         if not parcelas:
             return {"ok": False, "erro": "Nenhuma parcela informada."}
 
+        self._planejar_indices(parcelas)
+
         for i, p in enumerate(parcelas, start=1):
             try:
                 desc = (p.get("descricao") or f"Parcela {i}").strip()
@@ -349,6 +361,8 @@ class IndiceResolver:
             "ok": len(erros) == 0,
             "erros": erros,
             "parcelas": [_parcela_to_dict(p) for p in resultado_parcelas],
+            "frescor_indices": self._nucleo.frescor(),
+            "memo_fatores": self._nucleo.memo.como_dict(),
             "totais": {
                 "subtotal_corrigido": _fmt_money(total),
                 "multa_valor": _fmt_money(multa_val),
@@ -369,6 +383,6 @@ def calcular(payload: Mapping[str, Any]) -> Dict[str, Any]:
     Atalho simples para uso na view:
         return JsonResponse(calcular(request_json))
     """
-    srv = ServicoIndices()
+    srv = get_servico_indices()
     resolver = IndiceResolver(srv)
     return resolver.corrigir_parcelas(payload)
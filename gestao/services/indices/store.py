@@ -0,0 +1,415 @@
+# gestao/services/indices/store.py
+
+"""
+Armazenamento local e durável das séries do SGS (Banco Central).
+
+As observações ficam no banco de dados (modelos `SerieIndice`/`ObservacaoIndice`),
+compartilhadas por todos os workers. A sincronização é incremental: busca apenas
+as observações posteriores à última armazenada e roda no máximo uma vez por dia
+para cada série. Os cálculos leem sempre da cópia local, mantida em memória por
+processo. Uma cópia desatualizada (não sincronizada hoje) continua sendo servida
+imediatamente enquanto a sincronização roda em segundo plano (stale-while-revalidate);
+só a primeira carga de uma série que ainda não existe no banco espera pela API.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from ...models import ObservacaoIndice, RevisaoIndice, SerieIndice
+from . import metricas, pacote
+
+logger = logging.getLogger(__name__)
+
+# Início da carga histórica quando a série ainda não existe localmente (Plano Real).
+# Cálculos com faixas anteriores estendem o histórico local sob demanda (`obter_serie(desde=...)`).
+INICIO_HISTORICO = date(1994, 7, 1)
+
+# O SGS recusa consultas de séries diárias com janela superior a 10 anos.
+JANELA_MAXIMA_ANOS = 10
+
+# Quantidade máxima de séries mantidas em memória por processo.
+CACHE_MAX_SERIES = 32
+
+# Após uma falha de sincronização, a cópia local é servida por este intervalo (segundos)
+# antes de nova tentativa em segundo plano.
+ESPERA_APOS_FALHA = 300
+
+# Janela final reconferida a cada sincronização: IBGE e FGV às vezes revisam meses já publicados.
+JANELA_REVISAO = relativedelta(months=12)
+
+# Enviado (após o commit) quando observações já armazenadas mudam de valor.
+# Argumentos: serie_id, versao, inicio, fim (datas da primeira e da última observação revisada).
+serie_revisada = Signal()
+
+# Função que busca observações remotas: (serie_id, inicio, fim) -> {'YYYY-MM-DD': Decimal}
+Buscador = Callable[[int, date, date], Dict[str, Decimal]]
+
+
+class SerieArmazenada:
+    """
+    Cópia em memória (somente leitura) de uma série local, ordenada por data ISO.
+    Permite recortar qualquer período por busca binária, sem percorrer a série.
+    """
+
+    __slots__ = ("serie_id", "datas", "valores", "carregada_em", "sincronizada_em", "falha_em", "inicio_historico")
+
+    def __init__(self, serie_id: int, pares: List[Tuple[str, Decimal]], carregada_em: date,
+                 sincronizada_em: Optional[date] = None, falha_em: Optional[float] = None,
+                 inicio_historico: date = INICIO_HISTORICO):
+        self.serie_id = serie_id
+        self.datas = [d for d, _ in pares]
+        self.valores = [v for _, v in pares]
+        self.carregada_em = carregada_em
+        self.sincronizada_em = sincronizada_em  # data (local) da última sincronização bem-sucedida
+        self.falha_em = falha_em  # time.monotonic() da última sincronização que falhou
+        self.inicio_historico = inicio_historico  # antes desta data, a API ainda não foi consultada
+
+    def __len__(self) -> int:
+        return len(self.datas)
+
+    @property
+    def ultima_data(self) -> Optional[str]:
+        return self.datas[-1] if self.datas else None
+
+    def fresca(self, hoje: date) -> bool:
+        """Sincronizada hoje, ou com falha recente demais para tentar de novo."""
+        if self.sincronizada_em and self.sincronizada_em >= hoje:
+            return True
+        return self.falha_em is not None and time.monotonic() - self.falha_em < ESPERA_APOS_FALHA
+
+    def frescor(self, hoje: date) -> Dict[str, object]:
+        """Metadados de atualização, anexados aos resultados dos cálculos."""
+        ultima = self.ultima_data
+        return {
+            "ultima_observacao": ultima,
+            "idade_dias": (hoje - date.fromisoformat(ultima)).days if ultima else None,
+            "sincronizada_em": self.sincronizada_em.isoformat() if self.sincronizada_em else None,
+            "desatualizada": not (self.sincronizada_em and self.sincronizada_em >= hoje),
+        }
+
+    def intervalo(self, inicio_iso: str, fim_iso: str) -> Iterator[Tuple[str, Decimal]]:
+        """Itera os pares (data ISO, valor) com inicio_iso <= data <= fim_iso."""
+        i = bisect.bisect_left(self.datas, inicio_iso)
+        j = bisect.bisect_right(self.datas, fim_iso)
+        return zip(self.datas[i:j], self.valores[i:j])
+
+
+def _janelas(inicio: date, fim: date) -> Iterator[Tuple[date, date]]:
+    """Divide [inicio, fim] em janelas aceitas pela API do SGS."""
+    while inicio <= fim:
+        fim_janela = min(inicio + relativedelta(years=JANELA_MAXIMA_ANOS) - timedelta(days=1), fim)
+        yield inicio, fim_janela
+        inicio = fim_janela + timedelta(days=1)
+
+
+def sincronizar_serie(serie_id: int, buscar: Buscador, hoje: Optional[date] = None, forcar: bool = False) -> int:
+    """
+    Traz para o armazenamento local as observações posteriores à última data gravada
+    e reconfere as da JANELA_REVISAO final: valores revisados na fonte são atualizados,
+    a versão da série é incrementada, a revisão é registrada e `serie_revisada` é enviado.
+
+    A API é consultada fora de transação; a linha da série só fica bloqueada enquanto as
+    observações recebidas são comparadas e gravadas. Se outro worker sincronizou a série
+    no dia nesse meio-tempo, o que foi buscado é descartado.
+    Falhas de comunicação são propagadas e a série não é marcada como sincronizada.
+
+    Returns:
+        int: quantidade de observações novas gravadas.
+    """
+    hoje = hoje or timezone.localdate()
+    serie, _ = SerieIndice.objects.get_or_create(serie_id=serie_id)
+    if not forcar and serie.sincronizado_em and timezone.localdate(serie.sincronizado_em) >= hoje:
+        return 0
+
+    inicio = serie.ultima_observacao - JANELA_REVISAO if serie.ultima_observacao else INICIO_HISTORICO
+    novas: Dict[str, Decimal] = {}
+    for ini, fim in _janelas(inicio, hoje):
+        novas.update(buscar(serie_id, ini, fim))
+
+    with transaction.atomic():
+        serie = SerieIndice.objects.select_for_update().get(serie_id=serie_id)
+        if not forcar and serie.sincronizado_em and timezone.localdate(serie.sincronizado_em) >= hoje:
+            return 0
+
+        if not serie.inicio_historico:
+            serie.inicio_historico = inicio
+        if serie.ultima_observacao:
+            registrar_revisoes(serie, novas, inicio)
+
+        if novas:
+            ObservacaoIndice.objects.bulk_create(
+                [ObservacaoIndice(serie=serie, data=date.fromisoformat(k), valor=v) for k, v in novas.items()],
+                ignore_conflicts=True,
+            )
+            ultima = date.fromisoformat(max(novas))
+            if not serie.ultima_observacao or ultima > serie.ultima_observacao:
+                serie.ultima_observacao = ultima
+
+        serie.sincronizado_em = timezone.now()
+        serie.save(update_fields=['ultima_observacao', 'sincronizado_em', 'versao', 'inicio_historico'])
+
+    if novas:
+        logger.info(f"Série SGS {serie_id}: {len(novas)} observação(ões) nova(s) até {serie.ultima_observacao}.")
+    return len(novas)
+
+
+def estender_historico(serie_id: int, buscar: Buscador, desde: date) -> int:
+    """
+    Traz para o armazenamento local as observações de `desde` até o início do histórico
+    já buscado (ex.: faixas anteriores ao Plano Real). Como na sincronização, a API é
+    consultada fora de transação e a linha da série só é bloqueada para gravar.
+
+    Returns:
+        int: quantidade de observações gravadas.
+    """
+    serie, _ = SerieIndice.objects.get_or_create(serie_id=serie_id)
+    inicio_local = serie.inicio_historico or INICIO_HISTORICO
+    if desde >= inicio_local:
+        return 0
+    anteriores: Dict[str, Decimal] = {}
+    for ini, fim in _janelas(desde, inicio_local - timedelta(days=1)):
+        anteriores.update(buscar(serie_id, ini, fim))
+
+    with transaction.atomic():
+        serie = SerieIndice.objects.select_for_update().get(serie_id=serie_id)
+        if serie.inicio_historico and serie.inicio_historico <= desde:
+            return 0  # estendido por outro worker nesse meio-tempo
+        ObservacaoIndice.objects.bulk_create(
+            [ObservacaoIndice(serie=serie, data=date.fromisoformat(k), valor=v) for k, v in anteriores.items()],
+            ignore_conflicts=True,
+        )
+        serie.inicio_historico = desde
+        if anteriores and not serie.ultima_observacao:
+            serie.ultima_observacao = date.fromisoformat(max(anteriores))
+        serie.save(update_fields=['inicio_historico', 'ultima_observacao'])
+    logger.info(f"Série SGS {serie_id}: histórico local estendido até {desde} "
+                f"({len(anteriores)} observação(ões) anterior(es) a {inicio_local}).")
+    return len(anteriores)
+
+
+def versoes(serie_ids: Iterable[int]) -> Dict[int, int]:
+    """Versão armazenada de cada série (incrementada a cada revisão); séries ausentes ficam de fora."""
+    return dict(SerieIndice.objects.filter(serie_id__in=list(serie_ids)).values_list('serie_id', 'versao'))
+
+
+def registrar_revisoes(serie: SerieIndice, recebidas: Dict[str, Decimal], inicio: date) -> List[date]:
+    """
+    Grava as observações recebidas a partir de `inicio` que mudaram de valor e as retira
+    de `recebidas` (que fica só com as novas). Havendo revisões, incrementa a versão da
+    série, registra a `RevisaoIndice` e envia `serie_revisada` após o commit. Deve rodar
+    em transação, com a linha da série bloqueada. Retorna as datas revisadas, em ordem.
+    """
+    revisadas = _aplicar_revisoes(serie, recebidas, inicio)
+    if revisadas:
+        serie.versao += 1
+        serie.save(update_fields=['versao'])
+        RevisaoIndice.objects.create(serie=serie, versao=serie.versao, data_inicio=revisadas[0],
+                                     data_fim=revisadas[-1], observacoes=len(revisadas))
+        logger.warning(f"Série SGS {serie.serie_id}: {len(revisadas)} observação(ões) revisada(s) entre "
+                       f"{revisadas[0]} e {revisadas[-1]} (versão {serie.versao}).")
+        serie_id, versao = serie.serie_id, serie.versao
+        transaction.on_commit(lambda: serie_revisada.send(
+            sender=SerieIndice, serie_id=serie_id, versao=versao, inicio=revisadas[0], fim=revisadas[-1]))
+    return revisadas
+
+
+def _aplicar_revisoes(serie: SerieIndice, recebidas: Dict[str, Decimal], inicio: date) -> List[date]:
+    """
+    Compara as observações recebidas a partir de `inicio` com as armazenadas, grava as
+    que mudaram de valor e as retira de `recebidas` (que fica só com as novas).
+    Retorna as datas revisadas, em ordem.
+    """
+    armazenadas = {
+        o.data.isoformat(): o for o in ObservacaoIndice.objects.filter(serie=serie, data__gte=inicio)
+    }
+    revisadas = []
+    for chave, observacao in armazenadas.items():
+        valor = recebidas.pop(chave, None)
+        if valor is not None and valor != observacao.valor:
+            observacao.valor = valor
+            revisadas.append(observacao)
+    ObservacaoIndice.objects.bulk_update(revisadas, ['valor'], batch_size=2000)
+    return sorted(o.data for o in revisadas)
+
+
+def carregar_serie(serie_id: int, hoje: Optional[date] = None) -> SerieArmazenada:
+    """Lê do banco todas as observações armazenadas de uma série."""
+    pares = [
+        (d.isoformat(), v)
+        for d, v in ObservacaoIndice.objects.filter(serie__serie_id=serie_id)
+        .order_by('data').values_list('data', 'valor')
+    ]
+    sincronizado_em, inicio_historico = SerieIndice.objects.filter(serie_id=serie_id).values_list(
+        'sincronizado_em', 'inicio_historico').first() or (None, None)
+    inicio_historico = inicio_historico or INICIO_HISTORICO
+    if pares:
+        # Observações anteriores importadas por pacote também contam como histórico local
+        inicio_historico = min(inicio_historico, date.fromisoformat(pares[0][0]))
+    metricas.registrar_carga(serie_id, len(pares), pares[-1][0] if pares else None)
+    return SerieArmazenada(serie_id, pares, hoje or timezone.localdate(),
+                           timezone.localdate(sincronizado_em) if sincronizado_em else None,
+                           inicio_historico=inicio_historico)
+
+
+# --- Cópia em memória por processo (LRU limitado a CACHE_MAX_SERIES) ---
+_cache: "OrderedDict[int, SerieArmazenada]" = OrderedDict()
+_cache_lock = threading.Lock()
+_revalidando: set = set()
+# Muda sempre que uma cópia em memória é trocada ou descartada (dados novos ou revisados).
+# A primeira carga de uma série não muda a geração: nenhum resultado anterior a usou.
+_geracao = 0
+_ja_carregadas: set = set()
+
+
+def geracao() -> int:
+    """Versão dos dados que este processo serve: identifica resultados calculados com eles."""
+    return _geracao
+
+
+def _guardar(serie: SerieArmazenada) -> None:
+    global _geracao
+    with _cache_lock:
+        if serie.serie_id in _ja_carregadas:
+            _geracao += 1
+        _ja_carregadas.add(serie.serie_id)
+        _cache[serie.serie_id] = serie
+        _cache.move_to_end(serie.serie_id)
+        while len(_cache) > CACHE_MAX_SERIES:
+            _cache.popitem(last=False)
+
+
+def _sincronizar_e_carregar(serie_id: int, buscar: Buscador, hoje: date) -> SerieArmazenada:
+    """Sincroniza a série e guarda em memória a cópia resultante (mesmo se a API falhar)."""
+    falha_em = None
+    try:
+        sincronizar_serie(serie_id, buscar, hoje)
+    except Exception as e:
+        logger.warning(f"Não foi possível sincronizar a série SGS {serie_id}; usando dados locais. Motivo: {e}")
+        metricas.incrementar("armazenamento", "falhas_sincronizacao")
+        falha_em = time.monotonic()
+
+    serie = carregar_serie(serie_id, hoje)
+    if falha_em is not None and not len(serie) and (pares := pacote.serie_do_snapshot(serie_id)):
+        logger.warning(f"Série SGS {serie_id} ausente do banco; importando-a do pacote offline.")
+        pacote.gravar_series({serie_id: pares})
+        serie = carregar_serie(serie_id, hoje)
+    serie.falha_em = falha_em
+    _guardar(serie)
+    return serie
+
+
+def executar_em_segundo_plano(tarefa: Callable[[], None]) -> None:
+    """Roda `tarefa` em uma thread própria, com conexão de banco própria (fechada ao final)."""
+    def _executar():
+        try:
+            tarefa()
+        finally:
+            connection.close()
+    threading.Thread(target=_executar, daemon=True, name="revalidacao-indices").start()
+
+
+def _revalidar(serie_id: int, buscar: Buscador, hoje: date) -> None:
+    """Agenda a sincronização da série em segundo plano (no máximo uma por série)."""
+    with _cache_lock:
+        if serie_id in _revalidando:
+            return
+        _revalidando.add(serie_id)
+    metricas.incrementar("armazenamento", "revalidacoes")
+
+    def tarefa():
+        try:
+            _sincronizar_e_carregar(serie_id, buscar, hoje)
+        except Exception as e:
+            logger.error(f"Falha ao revalidar a série SGS {serie_id} em segundo plano: {e}")
+        finally:
+            with _cache_lock:
+                _revalidando.discard(serie_id)
+
+    executar_em_segundo_plano(tarefa)
+
+
+def obter_serie(serie_id: int, buscar: Buscador, hoje: Optional[date] = None,
+                desde: Optional[date] = None) -> SerieArmazenada:
+    """
+    Retorna a série local sem esperar pela API sempre que houver dados para servir.
+
+    Cópias desatualizadas são devolvidas imediatamente e revalidadas em segundo plano.
+    Só quando a série ainda não existe no banco a sincronização é feita na hora; se a
+    API estiver indisponível, a série é carregada do pacote offline de reserva, se houver.
+    Com `desde` anterior ao histórico local, ele é estendido na hora (`estender_historico`);
+    se a API falhar, a série é servida como está e o período fica sem dados.
+    """
+    serie = _obter_serie(serie_id, buscar, hoje or timezone.localdate())
+    if desde is None or desde >= serie.inicio_historico:
+        return serie
+    try:
+        estender_historico(serie_id, buscar, desde)
+    except Exception as e:
+        logger.warning(f"Não foi possível estender a série SGS {serie_id} até {desde}; "
+                       f"o período anterior a {serie.inicio_historico} fica sem dados. Motivo: {e}")
+        metricas.incrementar("armazenamento", "falhas_sincronizacao")
+        return serie
+    estendida = carregar_serie(serie_id, serie.carregada_em)
+    estendida.sincronizada_em, estendida.falha_em = serie.sincronizada_em, serie.falha_em
+    _guardar(estendida)
+    return estendida
+
+
+def _obter_serie(serie_id: int, buscar: Buscador, hoje: date) -> SerieArmazenada:
+    with _cache_lock:
+        em_memoria = _cache.get(serie_id)
+        if em_memoria is not None:
+            _cache.move_to_end(serie_id)
+
+    if em_memoria is None:
+        metricas.incrementar("armazenamento", "cargas_banco")
+        em_memoria = carregar_serie(serie_id, hoje)
+        if len(em_memoria):
+            _guardar(em_memoria)
+    else:
+        metricas.incrementar("armazenamento", "acertos_memoria")
+
+    if em_memoria.fresca(hoje):
+        return em_memoria
+    if not len(em_memoria):
+        # Nada a servir enquanto revalida: sincroniza na hora.
+        metricas.incrementar("armazenamento", "sincronizacoes_imediatas")
+        return _sincronizar_e_carregar(serie_id, buscar, hoje)
+    metricas.incrementar("armazenamento", "desatualizadas_servidas")
+    _revalidar(serie_id, buscar, hoje)
+    return em_memoria
+
+
+def frescor_serie(serie_id: int, hoje: Optional[date] = None) -> Optional[Dict[str, object]]:
+    """Metadados de atualização da cópia em memória da série (None se ainda não carregada)."""
+    with _cache_lock:
+        serie = _cache.get(serie_id)
+    return serie.frescor(hoje or timezone.localdate()) if serie is not None else None
+
+
+def descartar_da_memoria(serie_id: int) -> None:
+    """Esquece a cópia em memória da série; a próxima consulta a relê do banco."""
+    global _geracao
+    with _cache_lock:
+        _geracao += 1
+        _cache.pop(serie_id, None)
+
+
+def limpar_cache() -> None:
+    """Descarta as cópias em memória (útil em testes e após importações manuais)."""
+    global _geracao
+    with _cache_lock:
+        _geracao += 1
+        _ja_carregadas.clear()
+        _cache.clear()
@@ -0,0 +1,224 @@
+# gestao/services/indices/tabela_compilada.py
+
+"""
+Formato binário compilado das tabelas estáticas (StaticTableProvider).
+
+Cada CSV (ex.: 'tabela_tjsp.csv') é compilado uma vez em um arquivo irmão
+'<nome>.gtab' com o layout:
+
+    cabeçalho (64 bytes): mágica, n, casas decimais, mtime_ns e tamanho do CSV, SHA-256 do CSV
+    n × int32: ordinais de competência (ano * 12 + mês - 1), em ordem crescente
+    n × int64: valores em ponto fixo (valor × 10^casas), alinhados em 8 bytes
+
+O arquivo é mapeado em memória (mmap), de modo que todos os workers do gunicorn
+compartilham as mesmas páginas, e as consultas são buscas binárias sobre os
+ordinais, sem dicionários de Decimal por processo. Se o CSV mudar (mtime,
+tamanho ou conteúdo), a tabela é recompilada automaticamente.
+"""
+
+import bisect
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from .fatores import ordinal_chave_mes, ordinal_mes
+
+logger = logging.getLogger(__name__)
+
+MAGICA = b"GTAB\x01\x00\x00\x00"
+CABECALHO = struct.Struct("<8sIIqq32s")  # 64 bytes
+MAX_CASAS = 18
+SUFIXO = ".gtab"
+_BIG_ENDIAN = sys.byteorder == "big"  # o arquivo é sempre little-endian
+
+# Lê a tabela-fonte: Path -> {'YYYY-MM': Decimal}
+LeitorFonte = Callable[[Path], Dict[str, Decimal]]
+
+
+def _offset_valores(n: int) -> int:
+    fim_ordinais = CABECALHO.size + 4 * n
+    return fim_ordinais + (-fim_ordinais % 8)
+
+
+def _chave_mes(ordinal: int) -> str:
+    ano, mes = divmod(ordinal, 12)
+    return f"{ano:04d}-{mes + 1:02d}"
+
+
+class TabelaCompilada:
+    """Tabela mensal compilada, mapeada em memória (somente leitura)."""
+
+    __slots__ = ("caminho", "casas", "origem", "sha256", "ordinais", "valores", "_mmap")
+
+    def __init__(self, caminho: Path) -> None:
+        self.caminho = caminho
+        with open(caminho, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magica, n, casas, mtime_ns, tamanho, sha256 = CABECALHO.unpack_from(self._mmap, 0)
+            if magica != MAGICA:
+                raise ValueError(f"Arquivo '{caminho}' não é uma tabela compilada.")
+            inicio_valores = _offset_valores(n)
+            if len(self._mmap) != inicio_valores + 8 * n:
+                raise ValueError(f"Tabela compilada '{caminho}' truncada.")
+        except (struct.error, ValueError):
+            self._mmap.close()
+            raise
+        self.casas = casas
+        self.origem = (mtime_ns, tamanho)
+        self.sha256 = sha256
+        if _BIG_ENDIAN:
+            self.ordinais = array("i", self._mmap[CABECALHO.size:CABECALHO.size + 4 * n])
+            self.valores = array("q", self._mmap[inicio_valores:inicio_valores + 8 * n])
+            self.ordinais.byteswap()
+            self.valores.byteswap()
+        else:
+            visao = memoryview(self._mmap)
+            self.ordinais = visao[CABECALHO.size:CABECALHO.size + 4 * n].cast("i")
+            self.valores = visao[inicio_valores:inicio_valores + 8 * n].cast("q")
+
+    def __len__(self) -> int:
+        return len(self.ordinais)
+
+    def _decimal(self, i: int) -> Decimal:
+        return Decimal(self.valores[i]).scaleb(-self.casas)
+
+    def valor(self, competencia: date) -> Optional[Decimal]:
+        o = ordinal_mes(competencia)
+        i = bisect.bisect_left(self.ordinais, o)
+        return self._decimal(i) if i < len(self.ordinais) and self.ordinais[i] == o else None
+
+    def intervalo(self, inicio: date, fim: date) -> Dict[str, Decimal]:
+        """Valores das competências de `inicio` a `fim` (inclusive), chaves 'YYYY-MM'."""
+        i = bisect.bisect_left(self.ordinais, ordinal_mes(inicio))
+        j = bisect.bisect_right(self.ordinais, ordinal_mes(fim))
+        return {_chave_mes(self.ordinais[k]): self._decimal(k) for k in range(i, j)}
+
+    def fechar(self) -> None:
+        if isinstance(self.ordinais, memoryview):
+            self.ordinais.release()
+            self.valores.release()
+        self._mmap.close()
+
+
+def compilar(fonte: Path, destino: Path, ler_fonte: LeitorFonte) -> None:
+    """Compila `fonte` em `destino` (escrita atômica: arquivo temporário + os.replace)."""
+    conteudo = fonte.read_bytes()
+    st = fonte.stat()
+    itens = sorted((ordinal_chave_mes(k), v) for k, v in ler_fonte(fonte).items())
+
+    casas = max((-v.as_tuple().exponent for _, v in itens if v.as_tuple().exponent < 0), default=0)
+    if casas > MAX_CASAS:
+        raise ValueError(f"Tabela '{fonte.name}' com precisão acima de {MAX_CASAS} casas decimais.")
+    escalados = [int(v.scaleb(casas)) for _, v in itens]
+    if any(not -2 ** 63 <= q < 2 ** 63 for q in escalados):
+        raise ValueError(f"Tabela '{fonte.name}' com valores fora do alcance de int64 em {casas} casas.")
+
+    ordinais, valores = array("i", (o for o, _ in itens)), array("q", escalados)
+    if _BIG_ENDIAN:
+        ordinais.byteswap()
+        valores.byteswap()
+    n = len(itens)
+    cabecalho = CABECALHO.pack(MAGICA, n, casas, st.st_mtime_ns, st.st_size, hashlib.sha256(conteudo).digest())
+    enchimento = b"\0" * (_offset_valores(n) - CABECALHO.size - 4 * n)
+
+    fd, temporario = tempfile.mkstemp(dir=destino.parent, prefix=destino.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(cabecalho + ordinais.tobytes() + enchimento + valores.tobytes())
+        os.replace(temporario, destino)
+    except BaseException:
+        Path(temporario).unlink(missing_ok=True)
+        raise
+    logger.info(f"Tabela estática '{fonte.name}' compilada ({n} competências, {casas} casas).")
+
+
+def _destino(fonte: Path) -> Path:
+    """Arquivo irmão do CSV; se a pasta não aceitar escrita, uma pasta temporária."""
+    if os.access(fonte.parent, os.W_OK):
+        return fonte.with_name(fonte.name + SUFIXO)
+    pasta = Path(tempfile.gettempdir()) / "gestao_tabelas"
+    pasta.mkdir(exist_ok=True)
+    return pasta / (hashlib.sha256(str(fonte).encode()).hexdigest()[:16] + "_" + fonte.name + SUFIXO)
+
+
+# --- Tabelas abertas pelo processo ---
+_abertas: Dict[Path, Tuple[Tuple[int, int], TabelaCompilada]] = {}
+_abertas_lock = threading.Lock()
+# Muda sempre que uma tabela já aberta é trocada por outra versão do CSV
+_geracao = 0
+
+
+def _origem(fonte: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = fonte.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def geracao() -> int:
+    """
+    Versão das tabelas estáticas que este processo serve: identifica resultados calculados
+    com elas. Confere o `stat` dos CSVs já abertos; se algum mudou, a tabela é esquecida
+    (recompilada na próxima consulta) e a geração avança.
+    """
+    global _geracao
+    with _abertas_lock:
+        alteradas = [fonte for fonte, (origem, _) in _abertas.items() if _origem(fonte) != origem]
+        for fonte in alteradas:
+            del _abertas[fonte]
+        if alteradas:
+            _geracao += 1
+        return _geracao
+
+
+def tabela_compilada(fonte: Path, ler_fonte: LeitorFonte) -> TabelaCompilada:
+    """
+    Tabela compilada (e mapeada) de `fonte`, recompilando-a se o CSV mudou.
+    A cada consulta só o `stat` do CSV é conferido; o SHA-256 é conferido quando
+    o processo abre a tabela pela primeira vez ou quando mtime/tamanho mudam.
+    """
+    global _geracao
+    st = fonte.stat()
+    origem = (st.st_mtime_ns, st.st_size)
+    with _abertas_lock:
+        aberta = _abertas.get(fonte)
+        if aberta is not None and aberta[0] == origem:
+            return aberta[1]
+
+        destino = _destino(fonte)
+        tabela = None
+        try:
+            tabela = TabelaCompilada(destino)
+        except (OSError, ValueError, struct.error):
+            pass
+        if tabela is None or tabela.origem != origem or tabela.sha256 != hashlib.sha256(fonte.read_bytes()).digest():
+            if tabela is not None:
+                tabela.fechar()
+            compilar(fonte, destino, ler_fonte)
+            tabela = TabelaCompilada(destino)
+
+        # A tabela antiga não é fechada: pode haver leitores em andamento; o mmap é liberado pelo GC.
+        if aberta is not None:
+            _geracao += 1
+        _abertas[fonte] = (origem, tabela)
+        return tabela
+
+
+def fechar_tabelas() -> None:
+    """Esquece as tabelas abertas (útil em testes)."""
+    global _geracao
+    with _abertas_lock:
+        _abertas.clear()
+        _geracao += 1
@@ -0,0 +1,175 @@
+# gestao/services/nucleo_calculo.py
+
+"""
+Núcleo comum dos motores de cálculo.
+
+Os quatro pontos de entrada (`CalculoEngine`, `IndiceResolver`,
+`CalculadoraMonetaria` e a view `calculo_wizard_calcular`) mantêm as próprias
+regras de apresentação, arredondamento e juros, mas obtêm séries e fatores daqui:
+
+    nucleo = NucleoCalculo()
+    nucleo.adicionar("IPCA", inicio, fim)          # um pedido por faixa
+    nucleo.preparar()                              # busca cada série uma vez
+    nucleo.fator("IPCA", "monthly_variation", inicio, fim, pro_rata=True)
+
+O núcleo reúne o plano de buscas (`PlanoIndices`), as tabelas acumuladas
+(número-índice e fator diário, O(1) por faixa), o calendário de competências
+(`periodos.meses_periodo`) e a memória de fatores da execução (`MemoFatores`).
+Uma instância vale para uma execução: os fatores guardados pressupõem que as
+séries não mudam enquanto ela existir.
+"""
+
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .indices.fatores import CEM, UM, MemoFatores, ordinal_mes
+from .indices.planner import MAX_BUSCAS_PARALELAS, BuscadorIndices, IndicesPlanejados, PlanoIndices
+from .indices.providers import ServicoIndices, get_servico_indices
+from .periodos import MesPeriodo, mes_periodo, meses_periodo
+
+TIPOS_TABELA = ('monthly_variation', 'daily_rate')
+
+
+class FatorFaixa(NamedTuple):
+    fator: Decimal
+    lacunas: List[str]  # competências ('YYYY-MM') ou trechos de dias sem dados
+    sem_dados: bool  # a série não trouxe nenhuma observação no período
+
+
+class NucleoCalculo:
+    """Séries e fatores de correção de uma execução de cálculo."""
+
+    def __init__(self, buscar: Optional[BuscadorIndices] = None,
+                 servico: Optional[ServicoIndices] = None) -> None:
+        self._servico = servico
+        self._buscar = buscar or self.servico.get_indices_por_periodo
+        self._plano = PlanoIndices(self._buscar)
+        self.indices: Optional[IndicesPlanejados] = None
+        self.memo = MemoFatores()
+
+    @property
+    def servico(self) -> ServicoIndices:
+        if self._servico is None:
+            self._servico = get_servico_indices()
+        return self._servico
+
+    # --- Planejamento das buscas ---
+
+    def adicionar(self, indice: Optional[str], inicio: Optional[date], fim: Optional[date]) -> None:
+        """Registra o período de uma faixa (pedidos incompletos são ignorados)."""
+        self._plano.adicionar(indice, inicio, fim)
+
+    def preparar(self, max_paralelas: int = MAX_BUSCAS_PARALELAS) -> IndicesPlanejados:
+        """
+        Busca, uma vez, cada série pedida desde o último `preparar`. Os fatores já
+        guardados continuam valendo: chamadas sucessivas reaproveitam a memória.
+        """
+        self.indices = self._plano.executar(max_paralelas)
+        self._plano = PlanoIndices(self._buscar)
+        return self.indices
+
+    @property
+    def periodos(self) -> Dict[str, Tuple[date, date]]:
+        """Período de cobertura de cada índice pedido desde o último `preparar`."""
+        return self._plano.periodos
+
+    @property
+    def chaves(self) -> List[str]:
+        return self.indices.chaves if self.indices is not None else []
+
+    def frescor(self) -> Dict:
+        """Atualização das séries usadas (ver `ServicoIndices.frescor`)."""
+        return self.servico.frescor(self.chaves)
+
+    def _planejados(self) -> IndicesPlanejados:
+        if self.indices is None:
+            self.preparar()
+        return self.indices
+
+    # --- Consultas ---
+
+    def serie(self, indice: str, inicio: date, fim: date) -> Dict[str, Decimal]:
+        """Observações do índice no período ('YYYY-MM' ou 'YYYY-MM-DD' -> valor)."""
+        return self._planejados().get_indices_por_periodo(indice, inicio, fim)
+
+    def fator(self, indice: str, tipo: Optional[str], inicio: date, fim: date,
+              pro_rata: bool = False) -> FatorFaixa:
+        """
+        Fator de correção de [inicio, fim] pelo índice do catálogo, calculado uma vez
+        por (índice, início, fim, pró-rata) na execução:
+
+          - monthly_variation: Π (1 + v/100) das competências, pelo número-índice; com
+            pró-rata, os meses de borda entram proporcionalmente aos dias;
+          - daily_rate: Π (1 + taxa/100) dos dias com taxa, pelo fator diário acumulado;
+          - demais tipos (tabelas de fatores): 1.
+        """
+        return self.memo.obter(('fator', indice, inicio, fim, pro_rata),
+                               lambda: self._calcular_fator(indice, tipo, inicio, fim, pro_rata))
+
+    def _calcular_fator(self, indice, tipo, inicio, fim, pro_rata) -> FatorFaixa:
+        indices = self._planejados()
+        if tipo not in TIPOS_TABELA:
+            return FatorFaixa(Decimal('1.0'), [], not indices.get_indices_por_periodo(indice, inicio, fim))
+        # Nas tabelas, "sem dados" vem da contagem acumulada de observações, em O(1)
+        if tipo == 'daily_rate':
+            # Dias sem taxa (fins de semana e feriados) valem fator 1
+            tabela = indices.fator_diario(indice, inicio, fim)
+            sem_dados = not tabela.observados(inicio.toordinal(), fim.toordinal())
+            return FatorFaixa(tabela.fator_periodo(inicio, fim), tabela.lacunas_periodo(inicio, fim), sem_dados)
+
+        tabela = indices.numero_indice(indice, inicio, fim)
+        lacunas = tabela.lacunas_periodo(inicio, fim)
+        m0, m1 = ordinal_mes(inicio), ordinal_mes(fim)
+        sem_dados = not tabela.observados(m0, m1)
+        if m1 < m0:
+            return FatorFaixa(Decimal('1.0'), lacunas, sem_dados)
+        if not pro_rata:
+            return FatorFaixa(tabela.fator(m0, m1), lacunas, sem_dados)
+
+        # Os meses internos custam uma divisão; o pró-rata ajusta apenas os meses de borda.
+        fator = self._fator_mes_pro_rata(tabela, mes_periodo(m0, inicio, fim))
+        if m1 > m0:
+            fator *= tabela.fator(m0 + 1, m1 - 1)
+            fator *= self._fator_mes_pro_rata(tabela, mes_periodo(m1, inicio, fim))
+        return FatorFaixa(fator, lacunas, sem_dados)
+
+    @staticmethod
+    def _fator_mes_pro_rata(tabela, mes: MesPeriodo) -> Decimal:
+        variacao = (tabela.valor(mes.ordinal) or Decimal('0.0')) / 100
+        return 1 + (variacao / Decimal(mes.dias_no_mes) * Decimal(mes.dias_aplicados))
+
+    def variacoes_mensais(self, indice: str, inicio: date, fim: date) -> List[Tuple[MesPeriodo, Optional[Decimal]]]:
+        """Cada competência do período com o valor publicado da série (None se ausente)."""
+        def calcular():
+            serie = self.serie(indice, inicio, fim)
+            return [(mes, serie.get(mes.chave)) for mes in meses_periodo(inicio, fim)]
+        return self.memo.obter(('variacoes', indice, inicio, fim, False), calcular)
+
+    def fator_competencias(self, indice: str, inicio: date, fim: date) -> FatorFaixa:
+        """
+        Π (1 + v/100) das competências ('YYYY-MM') presentes na série, percorrendo os
+        meses do período; as ausentes valem fator 1 e são devolvidas como lacunas.
+        """
+        def calcular():
+            fator, lacunas = Decimal('1.0'), []
+            for mes, valor in self.variacoes_mensais(indice, inicio, fim):
+                if valor is None:
+                    lacunas.append(mes.chave)
+                else:
+                    fator *= Decimal('1.0') + valor / CEM
+            return FatorFaixa(fator, lacunas, len(lacunas) == len(meses_periodo(inicio, fim)))
+        return self.memo.obter(('competencias', indice, inicio, fim, False), calcular)
+
+    def fator_taxas_anuais(self, indice: str, inicio: date, fim: date, dias_ano: int = 252) -> Decimal:
+        """Π (1 + taxa/100/dias_ano) das observações do período, para séries de taxa anual."""
+        def calcular():
+            serie = self.serie(indice, inicio, fim)
+            fator = UM
+            for chave in sorted(serie):
+                try:
+                    fator *= UM + (serie[chave] or Decimal('0')) / CEM / Decimal(dias_ano)
+                except Exception:
+                    continue
+            return fator
+        return self.memo.obter(('taxas_anuais', indice, inicio, fim, False), calcular)
@@ -0,0 +1,72 @@
+# gestao/services/periodos.py
+
+"""
+Meses de um período, pré-computados para os laços mensais dos motores de cálculo.
+
+Um período [inicio, fim] vira uma tupla de `MesPeriodo`, um por competência, com o
+ordinal do mês (ano * 12 + mês - 1, o mesmo de `fatores.ordinal_mes`), a chave
+'YYYY-MM' das séries, os dias do mês aplicados no pró-rata e os dias do mês:
+
+    meses_periodo(date(2024, 1, 15), date(2024, 3, 10))
+    -> (MesPeriodo(24288, '2024-01', 17, 31),
+        MesPeriodo(24289, '2024-02', 29, 29),
+        MesPeriodo(24290, '2024-03', 10, 31))
+
+O cálculo é feito uma vez por período (cache do processo) e só com aritmética
+inteira: os motores percorrem a tupla, sem `relativedelta`, `calendar.monthrange`
+ou `strftime` a cada mês.
+"""
+
+from datetime import date
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+_DIAS_NO_MES = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+class MesPeriodo(NamedTuple):
+    ordinal: int  # ano * 12 + mês - 1
+    chave: str  # 'YYYY-MM'
+    dias_aplicados: int  # dias do mês dentro do período (pró-rata)
+    dias_no_mes: int
+
+
+def bissexto(ano: int) -> bool:
+    return ano % 4 == 0 and (ano % 100 != 0 or ano % 400 == 0)
+
+
+def dias_no_mes(ordinal: int) -> int:
+    """Quantidade de dias da competência de ordinal `ordinal`."""
+    ano, mes0 = divmod(ordinal, 12)
+    return 29 if mes0 == 1 and bissexto(ano) else _DIAS_NO_MES[mes0]
+
+
+def ano_mes(ordinal: int) -> Tuple[int, int]:
+    """(ano, mês) da competência de ordinal `ordinal`."""
+    ano, mes0 = divmod(ordinal, 12)
+    return ano, mes0 + 1
+
+
+def mes_periodo(ordinal: int, inicio: date, fim: date) -> MesPeriodo:
+    """A competência `ordinal` do período [inicio, fim] (útil quando só as bordas importam)."""
+    m0 = inicio.year * 12 + inicio.month - 1
+    m1 = fim.year * 12 + fim.month - 1
+    ano, mes0 = divmod(ordinal, 12)
+    total = dias_no_mes(ordinal)
+    if m0 == m1:
+        aplicados = (fim - inicio).days + 1
+    elif ordinal == m0:
+        aplicados = total - inicio.day + 1
+    elif ordinal == m1:
+        aplicados = fim.day
+    else:
+        aplicados = total
+    return MesPeriodo(ordinal, f"{ano:04d}-{mes0 + 1:02d}", aplicados, total)
+
+
+@lru_cache(maxsize=4096)
+def meses_periodo(inicio: date, fim: date) -> Tuple[MesPeriodo, ...]:
+    """Competências de `inicio` a `fim` (inclusive), com os dias aplicados em cada uma."""
+    m0 = inicio.year * 12 + inicio.month - 1
+    m1 = fim.year * 12 + fim.month - 1
+    return tuple(mes_periodo(o, inicio, fim) for o in range(m0, m1 + 1))
@@ -0,0 +1,134 @@
+# gestao/services/revisoes.py
+
+"""
+Invalidação dos resultados salvos quando uma série de índice é revisada.
+
+Cada rascunho guarda as séries e os períodos de que o seu último resultado depende
+(`CalculoDependenciaIndice`, gravado a partir de `resultados['dependencias_indices']`).
+Quando a sincronização detecta que observações já publicadas mudaram (sinal
+`store.serie_revisada`), apenas os rascunhos cujo período cruza o trecho revisado
+são marcados como desatualizados e recalculados em lote, em segundo plano. Dentro de
+`recalculo_no_chamador()` (comando de sincronização), o recálculo fica com quem chama.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterable, List, Sequence
+
+from django.db import transaction
+from dateutil.relativedelta import relativedelta
+
+from ..models import CalculoDependenciaIndice, CalculoRascunho
+from .calculo import executar_calculo
+from .indices import store
+from .indices.catalog import INDICE_CATALOG
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def chaves_afetadas(serie_id: int, inicio: date, fim: date) -> Dict[str, tuple]:
+    """
+    Chaves do catálogo alimentadas pela série SGS `serie_id` e o período afetado em
+    cada uma: a própria série e as séries derivadas dela (o acumulado em 12 meses
+    carrega a revisão para os 11 meses seguintes). Em séries mensais, a revisão de
+    uma competência afeta o mês inteiro.
+    """
+    diretas = [k for k, meta in INDICE_CATALOG.items()
+               if meta.get('provider') == 'BacenSGSProvider' and meta['params'].get('serie_id') == serie_id]
+    afetadas = {}
+    for chave, meta in INDICE_CATALOG.items():
+        params = meta.get('params', {})
+        if chave in diretas:
+            ini, ate = inicio, fim
+        elif meta.get('provider') == 'SerieDerivadaProvider' and params.get('origem') in diretas:
+            ini, ate = inicio, fim + relativedelta(months=11) if params.get('derivacao') == 'acumulado_12m' else fim
+        else:
+            continue
+        if meta.get('type') != 'daily_rate':
+            ini, ate = ini.replace(day=1), ate + relativedelta(day=31)
+        afetadas[chave] = (ini, ate)
+    return afetadas
+
+
+def registrar_dependencias(rascunho: CalculoRascunho, dependencias: Dict[str, Sequence[str]]) -> None:
+    """Substitui as dependências do rascunho por {indice: [inicio ISO, fim ISO]}."""
+    with transaction.atomic():
+        rascunho.dependencias_indices.all().delete()
+        CalculoDependenciaIndice.objects.bulk_create([
+            CalculoDependenciaIndice(rascunho=rascunho, indice=indice, data_inicio=date.fromisoformat(inicio),
+                                     data_fim=date.fromisoformat(fim))
+            for indice, (inicio, fim) in dependencias.items()
+        ])
+
+
+def marcar_desatualizados(serie_id: int, inicio: date, fim: date) -> List[int]:
+    """Marca como desatualizados os rascunhos que usam a série no trecho revisado. Retorna seus ids."""
+    ids = set()
+    for chave, (ini, ate) in chaves_afetadas(serie_id, inicio, fim).items():
+        ids.update(CalculoDependenciaIndice.objects.filter(
+            indice=chave, data_inicio__lte=ate, data_fim__gte=ini
+        ).values_list('rascunho_id', flat=True))
+    ids = sorted(ids)
+    if ids:
+        CalculoRascunho.objects.filter(pk__in=ids).update(resultado_desatualizado=True)
+    return ids
+
+
+def recalcular_rascunhos(ids: Iterable[int]) -> int:
+    """
+    Refaz, a partir do `form_data` salvo, o resultado de cada rascunho desatualizado.
+    Rascunhos que falharem continuam marcados. Retorna quantos foram recalculados.
+    """
+    recalculados = 0
+    for rascunho in CalculoRascunho.objects.filter(pk__in=list(ids), resultado_desatualizado=True):
+        form_data = (rascunho.ultimo_resultado_json or {}).get('form_data')
+        if not form_data:
+            continue
+        try:
+            resultados = executar_calculo(form_data)
+        except Exception as e:
+            logger.error(f"Falha ao recalcular o rascunho {rascunho.pk} após revisão de índice: {e}")
+            continue
+        with transaction.atomic():
+            rascunho.ultimo_resultado_json = resultados
+            rascunho.resultado_desatualizado = False
+            rascunho.save(update_fields=['ultimo_resultado_json', 'resultado_desatualizado', 'data_modificacao'])
+            registrar_dependencias(rascunho, resultados['dependencias_indices'])
+        recalculados += 1
+    logger.info(f"{recalculados} rascunho(s) recalculado(s) após revisão de índice.")
+    return recalculados
+
+
+def recalcular_pendentes() -> int:
+    """Recalcula todos os rascunhos ainda marcados como desatualizados (ex.: falhas anteriores)."""
+    return recalcular_rascunhos(CalculoRascunho.objects.filter(resultado_desatualizado=True)
+                                .values_list('pk', flat=True))
+
+
+@contextmanager
+def recalculo_no_chamador():
+    """
+    Dentro do bloco (nesta thread), as revisões só marcam os rascunhos afetados e nada é
+    agendado em segundo plano: quem chama os recalcula depois, com `recalcular_pendentes`.
+    Para processos que terminam logo em seguida, como o comando `sincronizar_indices`.
+    """
+    anterior = getattr(_local, 'no_chamador', False)
+    _local.no_chamador = True
+    try:
+        yield
+    finally:
+        _local.no_chamador = anterior
+
+
+def ao_revisar_serie(sender, serie_id: int, versao: int, inicio: date, fim: date, **kwargs) -> None:
+    """Receptor de `store.serie_revisada`: marca os afetados e agenda o recálculo em lote."""
+    # A cópia em memória ainda tem os valores antigos: o recálculo deve reler a série do banco.
+    store.descartar_da_memoria(serie_id)
+    ids = marcar_desatualizados(serie_id, inicio, fim)
+    logger.info(f"Série SGS {serie_id} v{versao} revisada de {inicio} a {fim}: {len(ids)} rascunho(s) afetado(s).")
+    if ids and not getattr(_local, 'no_chamador', False):
+        store.executar_em_segundo_plano(lambda: recalcular_rascunhos(ids))
@@ -12,3 +12,10 @@ def create_user_profile(sender, instance, created, **kwargs):
     """Cria um UsuarioPerfil toda vez que um novo User é criado."""
     if created:
         UsuarioPerfil.objects.get_or_create(user=instance)
+
+
+# Revisões de séries de índices invalidam (e recalculam em lote) os rascunhos afetados.
+from .services.indices.store import serie_revisada
+from .services.revisoes import ao_revisar_serie
+
+serie_revisada.connect(ao_revisar_serie, dispatch_uid="gestao_invalidar_calculos_revisados")
@@ -0,0 +1,126 @@
+# gestao/tests/test_atualizacao_calculo.py
+
+import json
+from decimal import Decimal
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, TestCase
+
+from gestao import views
+from gestao.encoders import DecimalEncoder
+from gestao.models import CalculoRascunho
+from gestao.services.calculo import CalculoEngine, atualizar_calculo, executar_calculo
+from gestao.tests.utils import IndicesIsoladosMixin
+
+IPCA = {"2023-11-01": Decimal("0.28"), "2023-12-01": Decimal("0.56"), "2024-01-01": Decimal("0.42"),
+        "2024-02-01": Decimal("0.83"), "2024-03-01": Decimal("0.16"), "2024-04-01": Decimal("0.38"),
+        "2024-05-01": Decimal("0.46"), "2024-06-01": Decimal("0.21")}
+
+
+def payload(data_final):
+    return {
+        "global": {}, "extras": {},
+        "parcelas": [
+            {"descricao": "Parcela 1", "valor_original": "1000.00", "data_evento": "2023-11-10",
+             "faixas": [
+                 {"indice": "IPCA", "data_inicio": "2023-11-10", "data_fim": "2023-12-31", "juros_tipo": "NENHUM",
+                  "juros_taxa_mensal": "0", "pro_rata": True},
+                 {"indice": "IPCA", "data_inicio": "2024-01-01", "data_fim": data_final, "juros_tipo": "SIMPLES",
+                  "juros_taxa_mensal": "1", "pro_rata": True},
+             ]},
+            {"descricao": "Parcela 2", "valor_original": "2500.50", "data_evento": "2024-01-20",
+             "faixas": [{"indice": "IPCA", "data_inicio": "2024-01-20", "data_fim": data_final,
+                         "juros_tipo": "COMPOSTO", "juros_taxa_mensal": "0.5", "pro_rata": False}]},
+        ],
+    }
+
+
+def salvo(resultados):
+    """O resultado como volta do JSONField do rascunho."""
+    return json.loads(json.dumps(resultados, cls=DecimalEncoder))
+
+
+class AtualizacaoCalculoTest(IndicesIsoladosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.semear_serie(dict(IPCA))
+
+    def test_atualizar_ate_hoje_aplica_so_os_meses_novos(self):
+        anterior = salvo(executar_calculo(payload("2024-02-15")))
+        self.assertEqual([c["corte"] for c in anterior["checkpoints"]], ["2024-01-31", "2024-01-31"])
+
+        with patch.object(CalculoEngine, "_aplicar_faixas", autospec=True,
+                          side_effect=CalculoEngine._aplicar_faixas) as aplicar:
+            atualizado = atualizar_calculo(anterior, date(2024, 6, 20))
+        aplicar.assert_not_called()
+
+        completo = executar_calculo(payload("2024-06-20"))
+        self.assertGreater(completo["resumo"]["total_geral"], Decimal("3600"))
+        centavos = Decimal("0.01")
+        for parcela, esperada in zip(atualizado["parcelas"], completo["parcelas"]):
+            for campo in ("correcao_total", "juros_total", "valor_final"):
+                self.assertEqual(parcela[campo].quantize(centavos), esperada[campo].quantize(centavos))
+        self.assertEqual(atualizado["resumo"]["total_geral"], completo["resumo"]["total_geral"])
+        self.assertEqual(atualizado["form_data"]["parcelas"][0]["faixas"][1]["data_fim"], "2024-06-20")
+        self.assertEqual([c["corte"] for c in atualizado["checkpoints"]], ["2024-05-31", "2024-05-31"])
+
+    def test_checkpoint_incompativel_recalcula_a_parcela(self):
+        anterior = salvo(executar_calculo(payload("2024-02-15")))
+        anterior["form_data"]["parcelas"][1]["valor_original"] = "3000.00"
+
+        with patch.object(CalculoEngine, "_aplicar_faixas", autospec=True,
+                          side_effect=CalculoEngine._aplicar_faixas) as aplicar:
+            atualizado = atualizar_calculo(anterior, date(2024, 6, 20))
+        self.assertEqual(aplicar.call_count, 1)
+
+        completo = payload("2024-06-20")
+        completo["parcelas"][1]["valor_original"] = "3000.00"
+        self.assertEqual(atualizado["resumo"]["total_geral"], executar_calculo(completo)["resumo"]["total_geral"])
+
+    def test_serie_revisada_invalida_o_checkpoint(self):
+        anterior = salvo(executar_calculo(payload("2024-02-15")))
+        self.assertEqual([c["versoes"] for c in anterior["checkpoints"]], [{"IPCA": 0}, {"IPCA": 0}])
+
+        # Revisão de um mês da primeira faixa, já embutido no valor base do checkpoint
+        self.buscar.dados["2023-12-01"] = Decimal("0.66")
+        self.sincronizar_no_dia_seguinte()
+
+        with patch.object(CalculoEngine, "_aplicar_faixas", autospec=True,
+                          side_effect=CalculoEngine._aplicar_faixas) as aplicar:
+            atualizado = atualizar_calculo(anterior, date(2024, 6, 20))
+        self.assertEqual(aplicar.call_count, 2)
+        self.assertEqual([c["versoes"] for c in atualizado["checkpoints"]], [{"IPCA": 1}, {"IPCA": 1}])
+        self.assertEqual(atualizado["resumo"]["total_geral"],
+                         executar_calculo(payload("2024-06-20"))["resumo"]["total_geral"])
+
+    def test_resultado_desatualizado_e_recalculado_por_inteiro(self):
+        anterior = salvo(executar_calculo(payload("2024-02-15")))
+        with patch.object(CalculoEngine, "_aplicar_faixas", autospec=True,
+                          side_effect=CalculoEngine._aplicar_faixas) as aplicar:
+            atualizar_calculo(anterior, date(2024, 6, 20), reaproveitar=False)
+        self.assertEqual(aplicar.call_count, 2)
+
+    def test_api_atualiza_ate_a_data_local_fora_de_transacao(self):
+        rascunho = CalculoRascunho.objects.create(descricao="Rascunho",
+                                                  ultimo_resultado_json=executar_calculo(payload("2024-02-15")))
+        request = RequestFactory().post("/", b"", content_type="application/json")
+        request.user = User(username="calculista")
+        transacoes_abertas, durante = len(connection.atomic_blocks), []
+
+        def atualizar(*args, **kwargs):
+            durante.append(len(connection.atomic_blocks))
+            return atualizar_calculo(*args, **kwargs)
+
+        with patch.object(views, "atualizar_calculo", atualizar), \
+                patch.object(views.timezone, "localdate", return_value=date(2024, 6, 20)):
+            resposta = views.atualizar_rascunho_api(request, rascunho.pk)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(durante, [transacoes_abertas])
+        rascunho.refresh_from_db()
+        self.assertEqual(rascunho.ultimo_resultado_json["form_data"]["parcelas"][0]["faixas"][1]["data_fim"],
+                         "2024-06-20")
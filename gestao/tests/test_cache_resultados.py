@@ -0,0 +1,93 @@
+# gestao/tests/test_cache_resultados.py
+
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from gestao.services import cache_resultados
+from gestao.services.calculo import executar_calculo
+from gestao.tests.utils import IndicesIsoladosMixin, payload_ipca
+
+IPCA = {"2024-01-01": Decimal("0.42"), "2024-02-01": Decimal("0.83"), "2024-03-01": Decimal("0.16")}
+
+
+def payload():
+    return payload_ipca("2024-01-01", "2024-03-31")
+
+
+class CacheResultadosTest(IndicesIsoladosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache_resultados.limpar()
+        self.addCleanup(cache_resultados.limpar)
+        self.semear_serie(dict(IPCA))
+        self.calculos = 0
+
+    def _calcular(self, dados):
+        self.calculos += 1
+        return executar_calculo(dados)
+
+    def test_payload_igual_reaproveita_o_resultado(self):
+        primeiro = cache_resultados.resultado_em_cache("simular", payload(), self._calcular)
+        reordenado = {chave: valor for chave, valor in reversed(list(payload().items()))}
+        segundo = cache_resultados.resultado_em_cache("simular", reordenado, self._calcular)
+
+        self.assertEqual(self.calculos, 1)
+        self.assertEqual(segundo["resumo"]["total_geral"], primeiro["resumo"]["total_geral"])
+        # Cada chamada recebe a própria cópia
+        segundo["resumo"]["total_geral"] = Decimal("0")
+        terceiro = cache_resultados.resultado_em_cache("simular", payload(), self._calcular)
+        self.assertEqual(terceiro["resumo"]["total_geral"], primeiro["resumo"]["total_geral"])
+
+        alterado = payload()
+        alterado["parcelas"][0]["valor_original"] = "2000.00"
+        cache_resultados.resultado_em_cache("simular", alterado, self._calcular)
+        cache_resultados.resultado_em_cache("resolver", payload(), self._calcular)
+        self.assertEqual(self.calculos, 3)
+
+    def test_dados_novos_de_indice_invalidam_o_resultado(self):
+        antes = cache_resultados.resultado_em_cache("simular", payload(), self._calcular)
+        cache_resultados.resultado_em_cache("simular", payload(), self._calcular)
+        self.assertEqual(self.calculos, 1)
+
+        self.buscar.dados["2024-02-01"] = Decimal("1.83")
+        self.sincronizar_no_dia_seguinte()
+
+        depois = cache_resultados.resultado_em_cache("simular", payload(), self._calcular)
+        self.assertEqual(self.calculos, 2)
+        self.assertGreater(Decimal(depois["resumo"]["total_geral"]), Decimal(antes["resumo"]["total_geral"]))
+
+    def test_resultado_nao_atravessa_a_virada_do_dia(self):
+        def calcular(dados):  # sem consultar as séries, que também dependem do dia
+            self.calculos += 1
+            return {}
+
+        cache_resultados.resultado_em_cache("simular", payload(), calcular)
+        amanha = timezone.localdate() + timedelta(days=1)
+        with patch.object(cache_resultados.timezone, "localdate", return_value=amanha):
+            cache_resultados.resultado_em_cache("simular", payload(), calcular)
+        self.assertEqual(self.calculos, 2)
+
+    def test_cache_limitado(self):
+        with patch.object(cache_resultados, "CACHE_MAX_RESULTADOS", 2):
+            for valor in ("1", "2", "3"):
+                cache_resultados.resultado_em_cache("teste", {"v": valor}, lambda dados: dict(dados))
+            self.assertEqual(len(cache_resultados._cache), 2)
+
+    def test_tabela_estatica_alterada_invalida_o_resultado(self):
+        tabela = "data;fator\n01/01/2024;70,0\n01/02/2024;70,5\n01/03/2024;{}\n"
+        pasta = self.usar_pasta_de_dados({"tabela_tjsp.csv": tabela.format("71,0")})
+        tjsp = payload_ipca("2024-01-01", "2024-03-01")
+        tjsp["parcelas"][0]["faixas"][0]["indice"] = "TJSP"
+        antes = cache_resultados.resultado_em_cache("simular", tjsp, self._calcular)
+        cache_resultados.resultado_em_cache("simular", tjsp, self._calcular)
+        self.assertEqual(self.calculos, 1)
+
+        (pasta / "tabela_tjsp.csv").write_text(tabela.format("77,25"), encoding="utf-8")
+        depois = cache_resultados.resultado_em_cache("simular", tjsp, self._calcular)
+        self.assertEqual(self.calculos, 2)
+        self.assertGreater(Decimal(depois["resumo"]["total_geral"]), Decimal(antes["resumo"]["total_geral"]))
@@ -4,6 +4,7 @@ from unittest.mock import patch, MagicMock
 from decimal import Decimal, ROUND_HALF_UP, getcontext
 from datetime import date, datetime
 from gestao.services.calculo import CalculoEngine
+from gestao.tests.utils import provider_falso
 
 # Usaremos 6 casas internas p/ reduzir ruído de arredondamento e só quantizar ao final
 getcontext().prec = 28
@@ -172,3 +173,113 @@ class CalculoEngineTest(TestCase):
         # Esperado: correção *depois* juros simples a 1% a.m. com pro rata.
         V0 = Decimal("5000.00")
         # Corre
+
+    @patch("gestao.services.calculo.get_provider")
+    @patch("gestao.services.calculo.get_indice_info")
+    def test_parcelas_com_mesmo_layout_calculadas_em_lote(self, mock_get_indice_info, mock_get_provider):
+        """
+        Parcelas com as mesmas faixas são calculadas em lote (fatores uma vez por layout)
+        e chegam ao mesmo resultado, ao centavo, do cálculo parcela a parcela.
+        """
+        from gestao.services import calculo
+
+        mock_get_provider.return_value = provider_falso({
+            "2023-11": Decimal("0.28"), "2023-12": Decimal("0.56"),
+            "2024-01": Decimal("0.42"), "2024-02": Decimal("0.83"), "2024-03": Decimal("0.16"),
+        })
+        mock_get_indice_info.return_value = {"provider": "IpcaProvider", "type": "monthly_variation", "params": {}}
+
+        def payload():
+            faixas = [
+                {"indice": "IPCA", "data_inicio": "2023-11-10", "data_fim": "2023-12-31", "juros_tipo": "SIMPLES",
+                 "juros_taxa_mensal": "1.0", "pro_rata": True},
+                {"indice": "IPCA", "data_inicio": "2024-01-01", "data_fim": "2024-03-20", "juros_tipo": "COMPOSTO",
+                 "juros_taxa_mensal": "0.5", "pro_rata": True},
+            ]
+            return calculo.validar_payload({
+                "parcelas": [{"descricao": f"Salário {i}", "valor_original": f"{1234.57 * i:.2f}",
+                              "data_evento": "2023-11-10", "faixas": [dict(f) for f in faixas]}
+                             for i in range(1, 31)],
+                "extras": {"multa_percentual": "10", "honorarios_percentual": "20"},
+            })
+
+        engine = CalculoEngine(payload())
+        em_lote = engine.run()
+        self.assertEqual(len(engine._lotes), 1)
+        self.assertFalse([p for p in em_lote["parcelas"] if p["descricao"].startswith("ERRO")])
+
+        with patch.object(calculo, "MIN_PARCELAS_LOTE", 10 ** 6):
+            engine = CalculoEngine(payload())
+            individual = engine.run()
+        self.assertEqual(engine._lotes, {})
+
+        for a, b in zip(em_lote["parcelas"], individual["parcelas"]):
+            for campo in ("correcao_total", "juros_total", "valor_final"):
+                self.assertEqual(q2(a[campo]), q2(b[campo]), f"{a['descricao']}: {campo}")
+        self.assertEqual(em_lote["memoria_calculo"], individual["memoria_calculo"])
+
+    @patch("gestao.services.calculo.get_provider")
+    @patch("gestao.services.calculo.get_indice_info")
+    def test_calculo_em_processos_identico_ao_sequencial(self, mock_get_indice_info, mock_get_provider):
+        """
+        Acima do limite configurado, blocos de parcelas são avaliados em processos filhos;
+        o resultado serializado é idêntico, byte a byte, ao do cálculo sequencial. Com
+        outras threads ativas, o motor não faz fork.
+        """
+        import copy
+        import json
+        import threading
+        from concurrent.futures import ProcessPoolExecutor
+        from django.test import override_settings
+        from gestao.encoders import DecimalEncoder
+        from gestao.services import calculo
+
+        mock_get_provider.return_value = provider_falso({
+            "2023-11": Decimal("0.28"), "2023-12": Decimal("0.56"), "2024-01": Decimal("0.42"),
+            "2024-02": Decimal("0.83"),
+        })
+        def indice_info(indice):
+            if indice != "IPCA":
+                raise KeyError(indice)
+            return {"provider": "IpcaProvider", "type": "monthly_variation", "params": {}}
+        mock_get_indice_info.side_effect = indice_info
+
+        def payload():
+            parcelas = []
+            for i in range(1, 41):
+                inicio = f"2023-{11 + i % 2}-{1 + i % 27:02d}"
+                parcelas.append({"descricao": f"Salário {i}", "valor_original": f"{1234.57 * i:.2f}",
+                                 "data_evento": inicio, "faixas": [
+                                     {"indice": "IPCA", "data_inicio": inicio, "data_fim": "2024-03-20",
+                                      "juros_tipo": "SIMPLES" if i % 3 else "COMPOSTO",
+                                      "juros_taxa_mensal": "1.0", "pro_rata": bool(i % 4)}]})
+            # Layout repetido (lote) e uma parcela inválida
+            parcelas[5:15] = [dict(copy.deepcopy(parcelas[4]), descricao=f"Repetida {i}") for i in range(10)]
+            parcelas[20]["faixas"][0]["indice"] = "INEXISTENTE"
+            return calculo.validar_payload({"parcelas": parcelas, "extras": {"multa_percentual": "10"}})
+
+        def serializado(**config):
+            with override_settings(**config):
+                resultado = CalculoEngine(payload(), gerar_checkpoints=True).run()
+            return json.dumps(resultado, cls=DecimalEncoder, sort_keys=True, ensure_ascii=False)
+
+        sequencial = serializado(GESTAO_CALCULO_PARCELAS_PROCESSOS=None)
+        with patch.object(calculo, "ProcessPoolExecutor", wraps=ProcessPoolExecutor) as pool, \
+                self.assertLogs("gestao.services.calculo", "INFO") as logs:
+            em_processos = serializado(GESTAO_CALCULO_PARCELAS_PROCESSOS=4, GESTAO_CALCULO_PROCESSOS=3)
+        pool.assert_called_once()
+        self.assertIn("40 parcela(s) calculada(s) em 10 bloco(s) por 3 processo(s).", "\n".join(logs.output))
+        self.assertIn("ERRO: Salário 21", sequencial)
+        self.assertIn("sem dados em 2024-03", sequencial)
+        self.assertIn('"corte": "2024-02-29"', sequencial)
+        self.assertEqual(em_processos, sequencial)
+
+        # Com outra thread viva (ex.: revalidação em segundo plano), não há fork
+        liberar = threading.Event()
+        outra = threading.Thread(target=liberar.wait, daemon=True)
+        outra.start()
+        self.addCleanup(liberar.set)
+        with patch.object(calculo, "ProcessPoolExecutor", wraps=ProcessPoolExecutor) as pool:
+            com_threads = serializado(GESTAO_CALCULO_PARCELAS_PROCESSOS=4, GESTAO_CALCULO_PROCESSOS=3)
+        pool.assert_not_called()
+        self.assertEqual(com_threads, sequencial)
@@ -0,0 +1,59 @@
+# gestao/tests/test_calendario.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from gestao.services import calendario
+from gestao.services.indices import fatores
+
+
+class CalendarioDiasUteisTest(SimpleTestCase):
+
+    def test_pascoa_e_feriados_moveis(self):
+        self.assertEqual(calendario.pascoa(2024), date(2024, 3, 31))
+        self.assertEqual(calendario.pascoa(2025), date(2025, 4, 20))
+        feriados = calendario.feriados_nacionais(2024)
+        for dia in (date(2024, 2, 12), date(2024, 2, 13), date(2024, 3, 29), date(2024, 5, 30), date(2024, 11, 20)):
+            self.assertIn(dia, feriados)
+        self.assertNotIn(date(2023, 11, 20), calendario.feriados_nacionais(2023))
+
+    def test_consultas_equivalem_ao_laco_dia_a_dia(self):
+        cal = calendario.get_calendario("FORENSE")
+        inicio = date(2023, 11, 1)
+        uteis = [inicio + timedelta(days=k) for k in range(200)]
+        uteis = [d for d in uteis if d.weekday() < 5 and d not in calendario.feriados_forenses(d.year)]
+
+        self.assertEqual(cal.contar_dias_uteis(inicio, date(2024, 5, 18)), len(uteis))
+        for n in (1, 5, 30, 90):
+            # 01/11 (Todos os Santos) não é dia útil forense: o 1º dia útil seguinte é uteis[0].
+            self.assertEqual(cal.somar_dias_uteis(inicio, n), uteis[n - 1])
+        self.assertEqual(cal.somar_dias_uteis(uteis[10], -3), uteis[7])
+        self.assertEqual(cal.proximo_dia_util(date(2023, 12, 22)), date(2024, 1, 22))
+
+    def test_calculo_de_prazo(self):
+        # Intimação na sexta antes da Semana Santa: quarta, quinta e sexta-feira santas não contam.
+        self.assertEqual(calendario.calcular_prazo(date(2024, 3, 22), 15), (date(2024, 3, 25), date(2024, 4, 17)))
+        # Suspensão de 20/12 a 20/01 (CPC, art. 220).
+        self.assertEqual(calendario.calcular_prazo(date(2024, 1, 10), 5), (date(2024, 1, 22), date(2024, 1, 26)))
+        # Dias corridos terminando no fim de semana são prorrogados para o dia útil seguinte.
+        self.assertEqual(calendario.calcular_prazo(date(2024, 3, 4), 5, "CORRIDOS"),
+                         (date(2024, 3, 5), date(2024, 3, 11)))
+
+    def test_fora_do_calendario(self):
+        with self.assertRaises(ValueError):
+            calendario.get_calendario("NACIONAL").contar_dias_uteis(date(1980, 1, 1), date(2024, 1, 1))
+        with self.assertRaises(ValueError):
+            calendario.get_calendario("ESTADUAL")
+
+    def test_serie_diaria_com_dia_util_sem_taxa(self):
+        cal = calendario.get_calendario("NACIONAL")
+        taxas = {date.fromordinal(o).isoformat(): Decimal("0.04")
+                 for o in cal.ordinais_uteis(date(2024, 1, 1), date(2024, 3, 31))}
+        tabela = fatores.FatorDiarioAcumulado.de_valores(taxas, date(2024, 1, 1), date(2024, 3, 31))
+        self.assertEqual(tabela.lacunas_periodo(date(2024, 1, 1), date(2024, 3, 31)), [])
+
+        del taxas["2024-02-07"]
+        tabela = fatores.FatorDiarioAcumulado.de_valores(taxas, date(2024, 1, 1), date(2024, 3, 31))
+        self.assertEqual(tabela.lacunas_periodo(date(2024, 1, 1), date(2024, 3, 31)), ["2024-02-07"])
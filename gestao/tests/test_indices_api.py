@@ -0,0 +1,43 @@
+# gestao/tests/test_indices_api.py
+
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase
+
+from gestao import views
+
+
+class ServicoFalso:
+    def get_indices_por_periodo(self, chave, inicio, fim):
+        return {"2024-02": Decimal("0.83"), "2024-01": Decimal("0.42")}
+
+
+class IndicesApiTest(SimpleTestCase):
+
+    def get(self, view, params=None, **headers):
+        request = RequestFactory().get("/", params or {}, **headers)
+        request.user = User(username="calculista")
+        return view(request)
+
+    def test_catalogo_responde_304_quando_etag_confere(self):
+        resposta = self.get(views.api_indices_catalogo)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("private", resposta["Cache-Control"])
+        self.assertTrue(resposta.has_header("Last-Modified"))
+        self.assertIn(b'"indices"', resposta.content)
+
+        revalidacao = self.get(views.api_indices_catalogo, HTTP_IF_NONE_MATCH=resposta["ETag"])
+        self.assertEqual(revalidacao.status_code, 304)
+        self.assertEqual(revalidacao.content, b"")
+
+    @patch("gestao.views.get_servico_indices", return_value=ServicoFalso())
+    def test_valores_em_colunas(self, _):
+        params = {"indice": "IPCA", "inicio": "2024-01-01", "fim": "2024-02-29", "formato": "colunas"}
+        resposta = self.get(views.api_indices_valores, params)
+        self.assertEqual(json.loads(resposta.content), {
+            "indice": "IPCA", "formato": "colunas", "datas": ["2024-01", "2024-02"], "valores": ["0.42", "0.83"],
+        })
+        self.assertEqual(self.get(views.api_indices_valores, params, HTTP_IF_NONE_MATCH=resposta["ETag"]).status_code, 304)
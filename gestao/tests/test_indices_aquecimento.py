@@ -0,0 +1,51 @@
+# gestao/tests/test_indices_aquecimento.py
+
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from gestao.services.indices import aquecimento, fatores, store
+from gestao.tests.utils import IndicesIsoladosMixin
+
+SERIES = {
+    433: [("2024-01-01", Decimal("0.42000000")), ("2024-02-01", Decimal("0.83000000"))],
+    1178: [("2024-01-02", Decimal("0.04348800")), ("2024-01-03", Decimal("0.04348800"))],
+}
+
+
+class AquecimentoIndicesTest(IndicesIsoladosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.gravar_series_sincronizadas(SERIES)
+        self.usar_pasta_de_dados({"tabela_tjsp.csv": "data;fator\n01/01/2024;70,98\n01/02/2024;71,12\n"})
+
+    def test_carrega_series_e_tabelas_acumuladas_sem_consultar_a_api(self):
+        with patch("gestao.services.indices.providers.BacenSGSProvider._fetch_from_api") as api:
+            resultado = aquecimento.aquecer(["IPCA", "SELIC_DIARIA", "TJSP", "NAO_EXISTE"],
+                                            hoje=date(2024, 3, 1), max_paralelas=1)
+
+        api.assert_not_called()
+        self.assertEqual(resultado.observacoes["IPCA"], 2)
+        self.assertEqual(resultado.observacoes["SELIC_DIARIA"], 2)
+        self.assertEqual(resultado.observacoes["TJSP"], 2)
+        self.assertEqual(list(resultado.erros), ["NAO_EXISTE"])
+        self.assertGreaterEqual(resultado.segundos, 0)
+        self.assertIsNotNone(store.frescor_serie(433))
+        self.assertIsNotNone(fatores.numero_indice("IPCA").fim)
+        self.assertIsNotNone(fatores.fator_diario("SELIC_DIARIA").fim)
+
+    def test_comando_informa_o_tempo_de_aquecimento(self):
+        saida = StringIO()
+        call_command("aquecer_indices", "IPCA", stdout=saida)
+        self.assertIn("IPCA: 2 observação(ões) em memória.", saida.getvalue())
+        self.assertIn("Aquecimento concluído em", saida.getvalue())
+
+    def test_padrao_inclui_series_quentes_e_tabelas_estaticas(self):
+        chaves = aquecimento.indices_para_aquecer()
+        self.assertEqual(chaves[:5], list(aquecimento.INDICES_QUENTES))
+        self.assertIn("TJSP", chaves)
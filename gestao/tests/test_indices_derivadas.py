@@ -0,0 +1,72 @@
+# gestao/tests/test_indices_derivadas.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from django.test import TestCase
+
+from gestao.services.indices import derivadas
+from gestao.services.indices.catalog import public_catalog_for_api
+from gestao.services.indices.providers import SerieDerivadaProvider
+from gestao.tests.utils import IndicesIsoladosMixin
+
+
+def taxas_diarias(inicio: date, fim: date):
+    pares, d = [], inicio
+    while d <= fim:
+        if d.weekday() < 5:
+            pares.append((d.isoformat(), Decimal("0.04") + Decimal(d.day) / Decimal("10000")))
+        d += timedelta(days=1)
+    return pares
+
+
+class DerivacoesTest(IndicesIsoladosMixin, TestCase):
+
+    def test_selic_mensal_composta_apenas_meses_encerrados(self):
+        pares = taxas_diarias(date(2024, 1, 1), date(2024, 3, 12))
+        mensal = derivadas.mensal_composta(pares, hoje=date(2024, 3, 13))
+        self.assertEqual(sorted(mensal), ["2024-01", "2024-02"])
+
+        fator = Decimal("1")
+        for d, taxa in pares:
+            if d.startswith("2024-02"):
+                fator *= 1 + taxa / 100
+        self.assertEqual(mensal["2024-02"], (fator - 1) * 100)
+
+    def test_inicio_do_mes_usa_a_primeira_observacao_do_mes(self):
+        pares = [("2024-01-01", Decimal("0.09")), ("2024-01-02", Decimal("0.08")),
+                 ("2024-02-02", Decimal("0.07")), ("2024-02-05", Decimal("0.06")),
+                 ("2024-03-01", Decimal("0.05"))]
+        self.assertEqual(derivadas.inicio_do_mes(pares, hoje=date(2024, 3, 13)),
+                         {"2024-01": Decimal("0.09"), "2024-02": Decimal("0.07"), "2024-03": Decimal("0.05")})
+
+    def test_acumulado_12m_exige_doze_competencias(self):
+        pares = [(f"{2023 + (m // 12)}-{m % 12 + 1:02d}-01", Decimal("0.5")) for m in range(14)]
+        del pares[5]  # 2023-06 não publicado
+        acumulado = derivadas.acumulado_12m(pares, hoje=date(2024, 3, 1))
+        self.assertEqual(acumulado, {})
+
+        pares = [(f"{2023 + (m // 12)}-{m % 12 + 1:02d}-01", Decimal("0.5")) for m in range(14)]
+        acumulado = derivadas.acumulado_12m(pares, hoje=date(2024, 3, 1))
+        self.assertEqual(sorted(acumulado), ["2023-12", "2024-01", "2024-02"])
+        self.assertAlmostEqual(acumulado["2024-02"], (Decimal("1.005") ** 12 - 1) * 100, places=20)
+
+    def test_provider_materializa_uma_vez_por_carga_da_origem(self):
+        hoje = date.today()
+        inicio = (hoje.replace(day=1) - timedelta(days=70)).replace(day=1)
+        pares = taxas_diarias(inicio, hoje - timedelta(days=1))
+        self.semear_serie(dict(pares), serie_id=1178)
+
+        params = {"origem": "SELIC_DIARIA", "derivacao": "mensal_composta"}
+        derivacao = Mock(wraps=derivadas.mensal_composta)
+        with patch.dict(derivadas.DERIVACOES, {"mensal_composta": derivacao}):
+            primeira = SerieDerivadaProvider().get_indices(inicio, hoje, params=params)
+            SerieDerivadaProvider().get_indices(inicio, hoje, params=params)
+        self.assertEqual(derivacao.call_count, 1)
+        self.assertEqual(len(primeira), 3)  # três meses encerrados; o corrente fica de fora
+
+    def test_series_informativas_fora_do_catalogo_dos_calculos(self):
+        chaves = {i["key"] for i in public_catalog_for_api()}
+        self.assertIn("SELIC_MENSAL", chaves)
+        self.assertNotIn("IPCA_12M", chaves)
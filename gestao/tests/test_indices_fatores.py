@@ -0,0 +1,215 @@
+# gestao/tests/test_indices_fatores.py
+
+import calendar
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from unittest.mock import patch
+
+from dateutil.relativedelta import relativedelta
+from django.test import SimpleTestCase
+
+from gestao.services.calculo import CalculoEngine
+from gestao.services.indices import fatores
+from gestao.services.indices.fatores import NumeroIndiceMensal, ordinal_mes
+
+
+def q2(x: Decimal) -> Decimal:
+    return x.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def variacoes_sinteticas(inicio: date, meses: int):
+    """Série mensal determinística com variações positivas e negativas."""
+    out, d = {}, inicio
+    for i in range(meses):
+        out[f"{d:%Y-%m}"] = Decimal((i * 37) % 120 - 20) / Decimal("100")
+        d += relativedelta(months=1)
+    return out
+
+
+def produto_direto(variacoes, inicio: date, fim: date) -> Decimal:
+    fator, d = Decimal("1"), inicio.replace(day=1)
+    while d <= fim:
+        fator *= 1 + variacoes.get(f"{d:%Y-%m}", Decimal("0")) / 100
+        d += relativedelta(months=1)
+    return fator
+
+
+class NumeroIndiceMensalTest(SimpleTestCase):
+
+    def setUp(self):
+        fatores.limpar_tabelas()
+
+    def test_fator_por_divisao_equivale_ao_produto(self):
+        variacoes = variacoes_sinteticas(date(2010, 1, 1), 180)
+        tabela = NumeroIndiceMensal.de_variacoes(variacoes, date(2010, 1, 1), date(2024, 12, 1))
+        for inicio, fim in [(date(2010, 1, 1), date(2024, 12, 31)), (date(2015, 7, 9), date(2016, 2, 3)),
+                            (date(2020, 3, 1), date(2020, 3, 31)), (date(2008, 1, 1), date(2011, 1, 1))]:
+            self.assertAlmostEqual(tabela.fator_periodo(inicio, fim), produto_direto(variacoes, inicio, fim), places=20)
+
+    def test_atualizacao_incremental_e_revisao(self):
+        tabela = fatores.numero_indice("IPCA")
+        tabela.atualizar({"2024-01": Decimal("0.42"), "2024-02": Decimal("0.83")},
+                         ordinal_mes(date(2024, 1, 1)), ordinal_mes(date(2024, 2, 1)))
+        estado_anterior = tabela._estado
+
+        # Competência nova: apenas anexa, preservando os acumulados já calculados
+        tabela.atualizar({"2024-02": Decimal("0.83"), "2024-03": Decimal("0.16")},
+                         ordinal_mes(date(2024, 2, 1)), ordinal_mes(date(2024, 3, 1)))
+        self.assertIs(tabela._estado[1][1], estado_anterior[1][1])
+        self.assertEqual(tabela.fim, ordinal_mes(date(2024, 3, 1)))
+
+        # Revisão de um mês publicado: a tabela é reconstruída com o valor novo
+        tabela.atualizar({"2024-01": Decimal("0.50")}, ordinal_mes(date(2024, 1, 1)), ordinal_mes(date(2024, 1, 1)))
+        esperado = (1 + Decimal("0.0050")) * (1 + Decimal("0.0083")) * (1 + Decimal("0.0016"))
+        self.assertAlmostEqual(tabela.fator(tabela.inicio, tabela.fim), esperado, places=20)
+
+
+class CalculoEngineNumeroIndiceTest(SimpleTestCase):
+
+    def setUp(self):
+        fatores.limpar_tabelas()
+
+    def _fator_legado(self, variacoes, data_inicio, data_fim, pro_rata):
+        """Laço mês a mês original do CalculoEngine, usado como referência."""
+        fator, data_loop = Decimal("1.0"), data_inicio.replace(day=1)
+        while data_loop <= data_fim:
+            variacao = variacoes.get(data_loop.strftime("%Y-%m"), Decimal("0.0")) / 100
+            if pro_rata:
+                dias = CalculoEngine({})._get_dias_pro_rata(data_loop, data_inicio, data_fim)
+                dias_no_mes = calendar.monthrange(data_loop.year, data_loop.month)[1]
+                fator *= 1 + (variacao / Decimal(dias_no_mes) * Decimal(dias))
+            else:
+                fator *= 1 + variacao
+            data_loop += relativedelta(months=1)
+        return fator
+
+    @patch("gestao.services.calculo.get_indice_info")
+    def test_paridade_ao_centavo_com_laco_mensal(self, mock_get_indice_info):
+        variacoes = variacoes_sinteticas(date(2012, 1, 1), 160)
+        mock_get_indice_info.return_value = {"provider": "Falso", "type": "monthly_variation", "params": {}}
+        data_fim = date(2025, 3, 17)
+        parcelas = [
+            {
+                "descricao": f"Parcela {i}", "valor_original": Decimal("1234.56"),
+                "data_evento": date(2012, 1, 1) + relativedelta(months=i, days=i % 27),
+                "faixas": [{
+                    "indice": "IPCA", "data_inicio": date(2012, 1, 1) + relativedelta(months=i, days=i % 27),
+                    "data_fim": data_fim, "juros_tipo": "NENHUM", "juros_taxa_mensal": Decimal("0"),
+                    "pro_rata": i % 2 == 0,
+                }],
+            }
+            for i in range(60)
+        ]
+
+        with patch.object(CalculoEngine, "_buscar_indices",
+                          lambda self, indice, ini, fim: {k: v for k, v in variacoes.items() if f"{ini:%Y-%m}" <= k <= f"{fim:%Y-%m}"}):
+            resultado = CalculoEngine({"parcelas": parcelas, "extras": {}}).run()
+
+        for p_data, p_res in zip(parcelas, resultado["parcelas"]):
+            faixa = p_data["faixas"][0]
+            fator = self._fator_legado(variacoes, faixa["data_inicio"], data_fim, faixa["pro_rata"])
+            self.assertEqual(q2(p_res["valor_final"]), q2(p_data["valor_original"] * fator))
+
+
+class FatorDiarioAcumuladoTest(SimpleTestCase):
+
+    def setUp(self):
+        fatores.limpar_tabelas()
+
+    @patch("gestao.services.calculo.get_indice_info")
+    def test_selic_diaria_equivale_ao_laco_dia_a_dia(self, mock_get_indice_info):
+        # Taxas apenas em dias úteis, como na série SGS 1178
+        taxas, d = {}, date(2015, 1, 1)
+        while d <= date(2024, 12, 31):
+            if d.weekday() < 5:
+                taxas[d.isoformat()] = Decimal("0.03") + Decimal(d.toordinal() % 11) / Decimal("1000")
+            d += relativedelta(days=1)
+        mock_get_indice_info.return_value = {"provider": "Falso", "type": "daily_rate", "params": {}}
+        parcelas = [
+            {
+                "descricao": f"Parcela {i}", "valor_original": Decimal("5000.00"),
+                "data_evento": date(2015, 1, 1) + relativedelta(months=i),
+                "faixas": [{
+                    "indice": "SELIC_DIARIA", "data_inicio": date(2015, 1, 1) + relativedelta(months=i, days=3),
+                    "data_fim": date(2024, 12, 20), "juros_tipo": "NENHUM", "juros_taxa_mensal": Decimal("0"),
+                    "modo_selic_exclusiva": True,
+                }],
+            }
+            for i in range(24)
+        ]
+
+        with patch.object(CalculoEngine, "_buscar_indices",
+                          lambda self, indice, ini, fim: {k: v for k, v in taxas.items() if ini.isoformat() <= k <= fim.isoformat()}):
+            resultado = CalculoEngine({"parcelas": parcelas, "extras": {}}).run()
+
+        for p_data, p_res in zip(parcelas, resultado["parcelas"]):
+            faixa = p_data["faixas"][0]
+            fator, d = Decimal("1.0"), faixa["data_inicio"]
+            while d <= faixa["data_fim"]:
+                fator *= 1 + taxas.get(d.isoformat(), Decimal("0.0")) / 100
+                d += relativedelta(days=1)
+            self.assertEqual(q2(p_res["valor_final"]), q2(p_data["valor_original"] * fator))
+
+
+class CoberturaTest(SimpleTestCase):
+
+    def test_lacunas_mensais_e_bordas_diarias(self):
+        variacoes = variacoes_sinteticas(date(2020, 1, 1), 24)
+        del variacoes["2020-07"], variacoes["2021-02"]
+        tabela = NumeroIndiceMensal.de_variacoes(variacoes, date(2020, 1, 1), date(2022, 6, 1))
+        self.assertEqual(tabela.lacunas_periodo(date(2020, 1, 1), date(2020, 6, 30)), [])
+        self.assertEqual(tabela.lacunas_periodo(date(2020, 5, 1), date(2021, 3, 31)), ["2020-07", "2021-02"])
+        # Meses além da última publicação também são lacunas
+        self.assertEqual(tabela.lacunas_periodo(date(2021, 11, 1), date(2022, 2, 1)), ["2022-01", "2022-02"])
+
+        taxas = {f"2024-01-{d:02d}": Decimal("0.04") for d in range(2, 13) if date(2024, 1, d).weekday() < 5}
+        diaria = fatores.FatorDiarioAcumulado.de_valores(taxas, date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(diaria.lacunas_periodo(date(2024, 1, 1), date(2024, 1, 12)), [])
+        self.assertEqual(diaria.lacunas_periodo(date(2024, 1, 1), date(2024, 1, 31)), ["2024-01-25..2024-01-31"])
+
+    @patch("gestao.services.calculo.get_indice_info")
+    def test_motor_avisa_ou_falha_antes_de_calcular(self, mock_get_indice_info):
+        mock_get_indice_info.return_value = {"provider": "Falso", "type": "monthly_variation", "params": {}}
+        variacoes = {"2024-01": Decimal("0.42"), "2024-03": Decimal("0.16")}
+        parcela = {
+            "descricao": "Parcela 1", "valor_original": Decimal("1000.00"), "data_evento": date(2024, 1, 1),
+            "faixas": [{"indice": "IPCA", "data_inicio": date(2024, 1, 1), "data_fim": date(2024, 3, 31),
+                        "juros_tipo": "NENHUM", "juros_taxa_mensal": Decimal("0"), "pro_rata": False}],
+        }
+        buscar = lambda self, indice, ini, fim: dict(variacoes)
+        with patch.object(CalculoEngine, "_buscar_indices", buscar):
+            resultado = CalculoEngine({"parcelas": [parcela], "extras": {}}).run()
+            self.assertEqual(len(resultado["avisos"]), 1)
+            self.assertIn("2024-02", resultado["avisos"][0])
+
+            resultado = CalculoEngine({"parcelas": [parcela], "extras": {"exigir_indices_completos": True}}).run()
+            self.assertTrue(resultado["parcelas"][0]["descricao"].startswith("ERRO"))
+
+
+class MemoFatoresTest(SimpleTestCase):
+
+    def setUp(self):
+        fatores.limpar_tabelas()
+
+    @patch("gestao.services.calculo.get_indice_info")
+    def test_faixas_repetidas_calculadas_uma_vez(self, mock_get_indice_info):
+        mock_get_indice_info.return_value = {"provider": "Falso", "type": "monthly_variation", "params": {}}
+        variacoes = variacoes_sinteticas(date(2020, 1, 1), 24)
+        inicios = [date(2020, 3, 10), date(2020, 4, 1), date(2020, 5, 20)]
+        parcelas = [
+            {
+                "descricao": f"Parcela {i}", "valor_original": Decimal(1000 + 17 * i), "data_evento": inicios[i % 3],
+                "faixas": [{"indice": "IPCA", "data_inicio": inicios[i % 3], "data_fim": date(2021, 6, 30),
+                            "juros_tipo": "SIMPLES", "juros_taxa_mensal": Decimal("1"), "pro_rata": True}],
+            }
+            for i in range(6)
+        ]
+        buscar = lambda self, indice, ini, fim: {k: v for k, v in variacoes.items()
+                                                 if f"{ini:%Y-%m}" <= k <= f"{fim:%Y-%m}"}
+        with patch.object(CalculoEngine, "_buscar_indices", buscar):
+            resultado = CalculoEngine({"parcelas": parcelas, "extras": {}}).run()
+            isoladas = [CalculoEngine({"parcelas": [p], "extras": {}}).run()["parcelas"][0] for p in parcelas]
+
+        self.assertEqual(resultado["memo_fatores"], {"faixas": 3, "acertos": 3, "falhas": 3})
+        for p_res, p_isolada in zip(resultado["parcelas"], isoladas):
+            self.assertEqual(p_res["valor_final"], p_isolada["valor_final"])
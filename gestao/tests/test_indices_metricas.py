@@ -0,0 +1,73 @@
+# gestao/tests/test_indices_metricas.py
+
+import json
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+
+from gestao import views
+from gestao.services.indices import metricas, pacote, store
+from gestao.services.indices.providers import BacenSGSProvider
+from gestao.tests.utils import IndicesIsoladosMixin
+
+
+class MetricasIndicesTest(IndicesIsoladosMixin, TestCase):
+
+    def test_histograma_por_baldes(self):
+        h = metricas.Histograma(limites=(0.1, 1.0))
+        for valor in (0.05, 0.05, 0.5, 3.0):
+            h.observar(valor)
+        self.assertEqual(h.como_dict()["baldes"], {"<=0.1": 2, "<=1": 1, ">1": 1})
+        self.assertEqual(h.quantil(0.5), 0.1)
+        self.assertEqual(h.quantil(0.95), 3.0)
+
+    def test_acertos_e_cargas_do_armazenamento(self):
+        self.gravar_series_sincronizadas({433: [("2024-01-01", Decimal("0.42")), ("2024-02-01", Decimal("0.83"))]})
+        buscar = Mock()
+        store.obter_serie(433, buscar)
+        store.obter_serie(433, buscar)
+
+        dados = metricas.snapshot(hoje=date(2024, 2, 11))
+        self.assertEqual(dados["providers"]["armazenamento"]["contadores"],
+                         {"cargas_banco": 1, "acertos_memoria": 1})
+        self.assertEqual(dados["series"][433]["observacoes"], 2)
+        self.assertEqual(dados["series"][433]["idade_dias"], 10)
+        buscar.assert_not_called()
+
+    def test_busca_na_api_registra_latencia_bytes_e_linhas(self):
+        corpo = b'[{"data":"01/01/2024","valor":"0.42"},{"data":"01/02/2024","valor":"0.83"}]'
+        resposta = Mock(content=corpo, json=Mock(return_value=json.loads(corpo)))
+        provider = BacenSGSProvider()
+        with patch.object(provider.session, "get", return_value=resposta):
+            provider._fetch_from_api(433, date(2024, 1, 1), date(2024, 2, 29))
+
+        sgs = metricas.snapshot()["providers"]["BacenSGSProvider"]
+        self.assertEqual(sgs["contadores"], {"buscas": 1, "bytes_recebidos": len(corpo), "linhas_lidas": 2})
+        self.assertEqual(sgs["histogramas"]["latencia_busca"]["contagem"], 1)
+        self.assertEqual(metricas.snapshot()["series"][433]["bytes_recebidos"], len(corpo))
+
+    def test_endpoint_apenas_para_a_equipe(self):
+        request = RequestFactory().get("/")
+        request.user = User(username="calculista")
+        self.assertEqual(views.api_indices_metricas(request).status_code, 302)
+
+        request.user = User(username="admin", is_staff=True)
+        resposta = views.api_indices_metricas(request)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("no-store", resposta["Cache-Control"])
+        self.assertEqual(set(json.loads(resposta.content)), {"armazenamento", "desde", "providers", "series"})
+
+    def test_comando(self):
+        pacote.gravar_series({433: [("2024-01-01", Decimal("0.42"))]})
+        saida = StringIO()
+        call_command("metricas_indices", stdout=saida)
+        self.assertIn("IPCA (SGS 433): 1 observação(ões)", saida.getvalue())
+
+        saida = StringIO()
+        call_command("metricas_indices", "--json", stdout=saida)
+        self.assertEqual(json.loads(saida.getvalue())["armazenamento"]["433"]["observacoes"], 1)
@@ -0,0 +1,89 @@
+# gestao/tests/test_indices_pacote.py
+
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+import requests
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from gestao.models import CalculoRascunho, ObservacaoIndice, RevisaoIndice, SerieIndice
+from gestao.services import revisoes
+from gestao.services.calculo import executar_calculo
+from gestao.services.indices import pacote, store
+from gestao.tests.utils import IndicesIsoladosMixin, payload_ipca
+
+SERIES = {
+    433: [("2024-01-01", Decimal("0.42000000")), ("2024-02-01", Decimal("0.83000000")),
+          ("2024-03-01", Decimal("-0.16000000"))],
+    1178: [("2024-01-02", Decimal("0.04348800")), ("2024-01-03", Decimal("0.04348800"))],
+}
+
+
+class PacoteIndicesTest(TestCase):
+
+    def setUp(self):
+        store.limpar_cache()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def test_exportar_e_importar_em_todos_os_formatos(self):
+        pacote.gravar_series(SERIES)
+        for formato in pacote.FORMATOS:
+            caminho = Path(self.dir.name) / f"indices.{formato}"
+            call_command("pacote_indices", "exportar", str(caminho), stdout=StringIO())
+            self.assertEqual(pacote.ler_pacote(caminho), SERIES, formato)
+
+        ObservacaoIndice.objects.all().delete()
+        call_command("pacote_indices", "importar", str(Path(self.dir.name) / "indices.bin"),
+                     stdout=StringIO())
+        self.assertEqual(pacote.series_armazenadas(), SERIES)
+        self.assertEqual(SerieIndice.objects.get(serie_id=433).ultima_observacao, date(2024, 3, 1))
+
+    def test_checksum_divergente_e_rejeitado(self):
+        for formato in pacote.FORMATOS:
+            caminho = Path(self.dir.name) / f"indices.{formato}"
+            pacote.escrever_pacote(caminho, SERIES)
+            dados = bytearray(caminho.read_bytes())
+            dados[-3] ^= 0x01
+            caminho.write_bytes(bytes(dados))
+            with self.assertRaises(pacote.PacoteInvalido, msg=formato):
+                pacote.ler_pacote(caminho)
+
+    def test_sem_rede_usa_o_pacote_de_reserva(self):
+        caminho = Path(self.dir.name) / "reserva.bin"
+        pacote.escrever_pacote(caminho, SERIES)
+
+        def buscar(*args):
+            raise requests.exceptions.ConnectionError("sem rede")
+
+        with override_settings(GESTAO_INDICES_PACOTE=caminho):
+            serie = store.obter_serie(433, buscar, hoje=date(2024, 4, 1))
+        self.assertEqual(list(serie.intervalo("2024-02-01", "2024-03-31")), SERIES[433][1:])
+        self.assertEqual(ObservacaoIndice.objects.filter(serie__serie_id=433).count(), 3)
+
+
+class PacoteRevisaoTest(IndicesIsoladosMixin, TestCase):
+
+    def test_valor_corrigido_no_pacote_marca_os_rascunhos_afetados(self):
+        self.gravar_series_sincronizadas({433: SERIES[433]})
+        resultados = executar_calculo(payload_ipca("2024-01-01", "2024-03-31"))
+        rascunho = CalculoRascunho.objects.create(descricao="IPCA", ultimo_resultado_json=resultados)
+        revisoes.registrar_dependencias(rascunho, resultados["dependencias_indices"])
+
+        corrigida = [("2024-01-01", Decimal("0.42000000")), ("2024-02-01", Decimal("0.86000000")),
+                     ("2024-03-01", Decimal("-0.16000000")), ("2024-04-01", Decimal("0.38000000"))]
+        with patch.object(store, "executar_em_segundo_plano", lambda tarefa: None), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(pacote.gravar_series({433: corrigida}), 2)
+
+        self.assertEqual(pacote.series_armazenadas([433]), {433: corrigida})
+        serie = SerieIndice.objects.get(serie_id=433)
+        self.assertEqual(serie.versao, 1)
+        self.assertEqual(RevisaoIndice.objects.get(serie=serie).data_inicio, date(2024, 2, 1))
+        rascunho.refresh_from_db()
+        self.assertTrue(rascunho.resultado_desatualizado)
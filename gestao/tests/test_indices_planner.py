@@ -0,0 +1,144 @@
+# gestao/tests/test_indices_planner.py
+
+import json
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from gestao.services.calculo import CalculoEngine
+from gestao.services.indices.planner import PlanoIndices
+from gestao.services.indices.providers import BacenSGSProvider
+from gestao.tests.utils import IndicesIsoladosMixin
+
+IPCA_MENSAL = {
+    "2023-01": Decimal("0.53"), "2023-02": Decimal("0.84"), "2023-03": Decimal("0.71"),
+    "2023-04": Decimal("0.61"), "2023-05": Decimal("0.23"), "2023-06": Decimal("-0.08"),
+}
+
+
+class ProviderMensalFalso:
+    chamadas = []
+
+    def get_indices(self, inicio, fim, **kwargs):
+        self.chamadas.append((inicio, fim))
+        m0, m1 = f"{inicio:%Y-%m}", f"{fim:%Y-%m}"
+        return {k: v for k, v in IPCA_MENSAL.items() if m0 <= k <= m1}
+
+
+class PlanoIndicesTest(SimpleTestCase):
+
+    def test_une_periodos_e_busca_cada_indice_uma_vez(self):
+        chamadas = []
+
+        def buscar(chave, inicio, fim):
+            chamadas.append((chave, inicio, fim))
+            return ProviderMensalFalso().get_indices(inicio, fim)
+
+        plano = PlanoIndices(buscar)
+        plano.adicionar("IPCA", date(2023, 2, 10), date(2023, 4, 30))
+        plano.adicionar("IPCA", date(2023, 1, 15), date(2023, 3, 31))
+        plano.adicionar("IPCA", date(2023, 5, 2), date(2023, 6, 30))
+        indices = plano.executar()
+
+        self.assertEqual(chamadas, [("IPCA", date(2023, 1, 15), date(2023, 6, 30))])
+        self.assertEqual(
+            indices.get_indices_por_periodo("IPCA", date(2023, 2, 10), date(2023, 4, 30)),
+            ProviderMensalFalso().get_indices(date(2023, 2, 10), date(2023, 4, 30)),
+        )
+
+    def test_erro_na_busca_e_entregue_a_faixa(self):
+        def buscar(chave, inicio, fim):
+            raise ConnectionError("API indisponível")
+
+        plano = PlanoIndices(buscar)
+        plano.adicionar("IPCA", date(2023, 1, 1), date(2023, 2, 1))
+        with self.assertRaises(ConnectionError):
+            plano.executar().get_indices_por_periodo("IPCA", date(2023, 1, 1), date(2023, 2, 1))
+
+
+class CalculoEnginePlanejamentoTest(SimpleTestCase):
+
+    @patch.dict("gestao.services.indices.providers.PROVIDERS_MAP", {"Falso": ProviderMensalFalso})
+    @patch("gestao.services.calculo.get_indice_info")
+    def test_parcelas_mensais_compartilham_uma_unica_busca(self, mock_get_indice_info):
+        mock_get_indice_info.return_value = {"provider": "Falso", "type": "monthly_variation", "params": {}}
+        ProviderMensalFalso.chamadas = []
+        parcelas = [
+            {
+                "descricao": f"Parcela {mes}",
+                "valor_original": Decimal("1000.00"),
+                "data_evento": date(2023, mes, 5),
+                "faixas": [{
+                    "indice": "IPCA", "data_inicio": date(2023, mes, 5), "data_fim": date(2023, 6, 30),
+                    "juros_tipo": "NENHUM", "juros_taxa_mensal": Decimal("0"), "pro_rata": True,
+                }],
+            }
+            for mes in range(1, 6)
+        ]
+
+        resultado = CalculoEngine({"parcelas": parcelas, "extras": {}}).run()
+
+        self.assertEqual(ProviderMensalFalso.chamadas, [(date(2023, 1, 5), date(2023, 6, 30))])
+        self.assertEqual(len(resultado["parcelas"]), 5)
+        self.assertTrue(all(p["correcao_total"] > 0 for p in resultado["parcelas"]))
+
+
+class _SGSStub(BaseHTTPRequestHandler):
+    """Servidor SGS local: responde cada série após um atraso fixo, contando acessos simultâneos."""
+
+    atraso = 0.3
+    lock = threading.Lock()
+    em_andamento = 0
+    pico = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.em_andamento += 1
+            cls.pico = max(cls.pico, cls.em_andamento)
+        time.sleep(cls.atraso)
+        with cls.lock:
+            cls.em_andamento -= 1
+        corpo = json.dumps([{"data": "01/01/2024", "valor": "0,42"}, {"data": "01/02/2024", "valor": "0,83"}])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(corpo.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class PrefetchConcorrenteTest(IndicesIsoladosMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _SGSStub)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+        _SGSStub.pico = 0
+
+    def test_series_distintas_pagam_uma_latencia(self):
+        provider = BacenSGSProvider()
+        series = {"IPCA": 433, "SELIC_DIARIA": 1178, "TR": 226}
+        url = f"http://127.0.0.1:{self.servidor.server_port}/dados/serie/bcdata.sgs.{{serie_id}}/dados"
+
+        with patch.object(BacenSGSProvider, "BASE_URL", url):
+            plano = PlanoIndices(lambda chave, ini, fim: provider._fetch_from_api(series[chave], ini, fim))
+            for chave in series:
+                plano.adicionar(chave, date(2024, 1, 1), date(2024, 2, 29))
+            inicio = time.monotonic()
+            indices = plano.executar()
+            decorrido = time.monotonic() - inicio
+
+        self.assertEqual(_SGSStub.pico, 3)
+        self.assertLess(decorrido, 2 * _SGSStub.atraso)
+        for chave in series:
+            self.assertEqual(indices.get_indices_por_periodo(chave, date(2024, 1, 1), date(2024, 2, 29)),
+                             {"2024-01-01": Decimal("0.42"), "2024-02-01": Decimal("0.83")})
@@ -0,0 +1,106 @@
+# gestao/tests/test_indices_registry.py
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from unittest.mock import Mock, patch
+
+import requests
+from django.test import SimpleTestCase
+
+from gestao.services.indices import fatores, store
+from gestao.services.indices.providers import (
+    BacenSGSProvider, CircuitoAberto, Disjuntor, get_provider, get_servico_indices, registry, reset_providers,
+)
+from gestao.tests.utils import IndicesIsoladosMixin
+
+
+class ProviderRegistryTest(IndicesIsoladosMixin, SimpleTestCase):
+
+    def test_instancias_compartilhadas_entre_threads(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            providers = list(pool.map(lambda _: get_provider("BacenSGSProvider"), range(32)))
+            servicos = list(pool.map(lambda _: get_servico_indices(), range(32)))
+        self.assertEqual(len({id(p) for p in providers}), 1)
+        self.assertEqual(len({id(s) for s in servicos}), 1)
+
+    def test_providers_usam_a_mesma_sessao_http(self):
+        self.assertIs(BacenSGSProvider().session, BacenSGSProvider().session)
+        self.assertIs(get_provider("BacenSGSProvider").session, registry.session())
+
+    def test_reset_descarta_instancias_e_caches(self):
+        provider = get_provider("BacenSGSProvider")
+        sessao = registry.session()
+        tabela = fatores.numero_indice("IPCA")
+        store._cache[433] = store.SerieArmazenada(433, [], date(2024, 1, 1))
+
+        reset_providers()
+
+        self.assertIsNot(get_provider("BacenSGSProvider"), provider)
+        self.assertIsNot(registry.session(), sessao)
+        self.assertIsNot(fatores.numero_indice("IPCA"), tabela)
+        self.assertEqual(len(store._cache), 0)
+
+    def test_cache_de_series_e_limitado(self):
+        hoje = date(2024, 1, 1)
+        with patch.object(store, "sincronizar_serie", return_value=0), \
+                patch.object(store, "carregar_serie", side_effect=lambda sid, h: store.SerieArmazenada(sid, [], h)):
+            for serie_id in range(store.CACHE_MAX_SERIES + 5):
+                store.obter_serie(serie_id, lambda *a: {}, hoje=hoje)
+            # A série mais recente permanece; as menos usadas foram descartadas
+            self.assertEqual(len(store._cache), store.CACHE_MAX_SERIES)
+            self.assertNotIn(0, store._cache)
+            self.assertIn(store.CACHE_MAX_SERIES + 4, store._cache)
+
+
+class DisjuntorTest(IndicesIsoladosMixin, SimpleTestCase):
+
+    def test_abre_apos_falhas_seguidas_e_testa_uma_vez_apos_a_espera(self):
+        agora = [0.0]
+        disjuntor = Disjuntor("teste", limite_falhas=3, espera=60, relogio=lambda: agora[0])
+        for _ in range(3):
+            self.assertTrue(disjuntor.permite())
+            disjuntor.falha()
+        self.assertEqual(disjuntor.estado, Disjuntor.ABERTO)
+        self.assertFalse(disjuntor.permite())
+
+        agora[0] = 61
+        self.assertTrue(disjuntor.permite())  # tentativa única (meio-aberto)
+        self.assertFalse(disjuntor.permite())
+        disjuntor.falha()
+        self.assertEqual(disjuntor.estado, Disjuntor.ABERTO)
+
+        agora[0] = 122
+        self.assertTrue(disjuntor.permite())
+        disjuntor.sucesso()
+        self.assertEqual(disjuntor.estado, Disjuntor.FECHADO)
+
+    def test_erro_do_cliente_nao_altera_o_circuito(self):
+        agora = [0.0]
+        disjuntor = Disjuntor("bacen_sgs", limite_falhas=3, espera=60, relogio=lambda: agora[0])
+        provider = BacenSGSProvider()
+        erro_404 = requests.exceptions.HTTPError("404", response=Mock(status_code=404))
+        with patch.object(registry, "disjuntor", return_value=disjuntor), \
+                patch.object(provider.session, "get", side_effect=requests.exceptions.ConnectTimeout("timeout")):
+            for _ in range(3):
+                with self.assertRaises(requests.exceptions.ConnectTimeout):
+                    provider._fetch_from_api(433, date(2024, 1, 1), date(2024, 2, 1))
+        self.assertEqual(disjuntor.estado, Disjuntor.ABERTO)
+
+        agora[0] = 61
+        with patch.object(registry, "disjuntor", return_value=disjuntor), \
+                patch.object(provider.session, "get", return_value=Mock(raise_for_status=Mock(side_effect=erro_404))):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                provider._fetch_from_api(433, date(2024, 1, 1), date(2024, 2, 1))
+        # Continua meio-aberto, e a próxima tentativa é liberada
+        self.assertEqual(disjuntor.estado, Disjuntor.MEIO_ABERTO)
+        self.assertTrue(disjuntor.permite())
+
+    def test_provider_falha_rapido_com_circuito_aberto(self):
+        provider = BacenSGSProvider()
+        with patch.object(provider.session, "get", side_effect=requests.exceptions.ConnectTimeout("timeout")) as get:
+            for _ in range(3):
+                with self.assertRaises(requests.exceptions.ConnectTimeout):
+                    provider._fetch_from_api(433, date(2024, 1, 1), date(2024, 2, 1))
+            with self.assertRaises(CircuitoAberto):
+                provider._fetch_from_api(433, date(2024, 1, 1), date(2024, 2, 1))
+        self.assertEqual(get.call_count, 3)
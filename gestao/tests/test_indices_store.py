@@ -0,0 +1,152 @@
+# gestao/tests/test_indices_store.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import requests
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from gestao.models import ObservacaoIndice, SerieIndice
+from gestao.services.indices import store
+from gestao.services.indices.providers import BacenSGSProvider
+from gestao.tests.utils import BuscadorFalso, IndicesIsoladosMixin
+
+
+class SerieStoreTest(IndicesIsoladosMixin, TestCase):
+
+    def test_sincronizacao_incremental_busca_apenas_observacoes_novas(self):
+        buscar = BuscadorFalso({"2024-01-01": Decimal("0.42"), "2024-02-01": Decimal("0.83")})
+        novas = store.sincronizar_serie(433, buscar)
+
+        self.assertEqual(novas, 2)
+        serie = SerieIndice.objects.get(serie_id=433)
+        self.assertEqual(serie.ultima_observacao, date(2024, 2, 1))
+
+        # No mesmo dia a série não volta a consultar a API
+        self.assertEqual(store.sincronizar_serie(433, buscar), 0)
+        n_chamadas = len(buscar.chamadas)
+
+        # No dia seguinte, consulta somente a partir da janela de revisão antes da última observação
+        SerieIndice.objects.filter(pk=serie.pk).update(sincronizado_em=timezone.now() - timedelta(days=1))
+        buscar.dados["2024-03-01"] = Decimal("0.16")
+        self.assertEqual(store.sincronizar_serie(433, buscar), 1)
+        self.assertEqual(buscar.chamadas[n_chamadas:],
+                         [(433, date(2024, 2, 1) - store.JANELA_REVISAO, timezone.localdate())])
+        self.assertEqual(ObservacaoIndice.objects.filter(serie=serie).count(), 3)
+
+    def test_carga_historica_respeita_janela_maxima_do_sgs(self):
+        buscar = BuscadorFalso({})
+        store.sincronizar_serie(1178, buscar, hoje=date(2024, 12, 31))
+        for _, inicio, fim in buscar.chamadas:
+            self.assertLess(fim, inicio + timedelta(days=366 * store.JANELA_MAXIMA_ANOS))
+        self.assertEqual(buscar.chamadas[0][1], store.INICIO_HISTORICO)
+        self.assertEqual(buscar.chamadas[-1][2], date(2024, 12, 31))
+
+    def test_api_consultada_fora_da_transacao(self):
+        transacoes_abertas = len(connection.atomic_blocks)
+        buscar = BuscadorFalso({"2024-01-01": Decimal("0.42")})
+        durante = []
+        store.sincronizar_serie(433, lambda *args: durante.append(len(connection.atomic_blocks)) or buscar(*args))
+        self.assertTrue(durante)
+        self.assertEqual(set(durante), {transacoes_abertas})
+
+    def test_sincronizacao_concorrente_descarta_o_que_foi_buscado(self):
+        def buscar_enquanto_outro_worker_sincroniza(serie_id, inicio, fim):
+            SerieIndice.objects.filter(serie_id=serie_id).update(sincronizado_em=timezone.now())
+            return {"2024-01-01": Decimal("0.42")}
+
+        self.assertEqual(store.sincronizar_serie(433, buscar_enquanto_outro_worker_sincroniza), 0)
+        self.assertFalse(ObservacaoIndice.objects.exists())
+
+    def test_falha_de_rede_nao_marca_serie_como_sincronizada(self):
+        def buscar(*args):
+            raise requests.exceptions.ConnectionError("sem rede")
+
+        serie = store.obter_serie(433, buscar, hoje=date(2024, 2, 15))
+        self.assertEqual(len(serie), 0)
+        self.assertFalse(SerieIndice.objects.filter(serie_id=433, sincronizado_em__isnull=False).exists())
+
+    def test_provider_le_do_armazenamento_local(self):
+        buscar = BuscadorFalso({
+            "2024-01-01": Decimal("0.42"), "2024-02-01": Decimal("0.83"), "2024-03-01": Decimal("0.16"),
+        })
+        store.sincronizar_serie(433, buscar)
+
+        provider = BacenSGSProvider()
+        with patch.object(BacenSGSProvider, "_fetch_from_api", side_effect=AssertionError("sem rede")):
+            valores = provider.get_indices(
+                date(2024, 2, 10), date(2024, 3, 5), params={"serie_id": 433}, index_type="monthly_variation"
+            )
+        self.assertEqual(valores, {"2024-02": Decimal("0.83"), "2024-03": Decimal("0.16")})
+
+    def test_faixa_anterior_ao_historico_local_estende_a_serie(self):
+        self.semear_serie({"1993-01-01": Decimal("28.73"), "2024-01-01": Decimal("0.42")})
+        self.assertEqual(len(store.obter_serie(433, self.buscar)), 1)
+
+        self.buscar.chamadas.clear()
+        serie = store.obter_serie(433, self.buscar, desde=date(1993, 1, 1))
+        self.assertEqual(list(serie.intervalo("1993-01-01", "1993-12-31")), [("1993-01-01", Decimal("28.73"))])
+        self.assertEqual(self.buscar.chamadas[-1][1:], (date(1993, 1, 1), store.INICIO_HISTORICO - timedelta(days=1)))
+        self.assertEqual(SerieIndice.objects.get(serie_id=433).inicio_historico, date(1993, 1, 1))
+
+        self.buscar.chamadas.clear()
+        store.obter_serie(433, self.buscar, desde=date(1993, 6, 1))
+        self.assertEqual(self.buscar.chamadas, [])
+
+    def test_falha_ao_estender_historico_serve_o_que_ha(self):
+        self.semear_serie({"2024-01-01": Decimal("0.42")})
+
+        def sem_rede(*args):
+            raise requests.exceptions.ConnectionError("sem rede")
+
+        serie = store.obter_serie(433, sem_rede, desde=date(1993, 1, 1))
+        self.assertEqual(list(serie.intervalo("", "9999")), [("2024-01-01", Decimal("0.42"))])
+        self.assertEqual(serie.inicio_historico, store.INICIO_HISTORICO)
+        self.assertEqual(SerieIndice.objects.get(serie_id=433).inicio_historico, store.INICIO_HISTORICO)
+
+
+class RevalidacaoEmSegundoPlanoTest(IndicesIsoladosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tarefas = []
+        patcher = patch.object(store, "executar_em_segundo_plano", self.tarefas.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_serie_desatualizada_e_servida_na_hora_e_revalidada_depois(self):
+        buscar = BuscadorFalso({"2024-01-01": Decimal("0.42")})
+        store.sincronizar_serie(433, buscar)
+        SerieIndice.objects.filter(serie_id=433).update(sincronizado_em=timezone.now() - timedelta(days=1))
+        buscar.dados["2024-02-01"] = Decimal("0.83")
+        n_chamadas = len(buscar.chamadas)
+
+        serie = store.obter_serie(433, buscar)
+        self.assertEqual(len(serie), 1)
+        self.assertTrue(store.frescor_serie(433)["desatualizada"])
+        self.assertEqual(len(buscar.chamadas), n_chamadas)  # nenhuma espera pela API
+
+        # Pedidos seguintes não agendam uma segunda revalidação da mesma série
+        store.obter_serie(433, buscar)
+        self.assertEqual(len(self.tarefas), 1)
+
+        self.tarefas.pop()()
+        serie = store.obter_serie(433, buscar)
+        self.assertEqual(len(serie), 2)
+        self.assertEqual(store.frescor_serie(433)["ultima_observacao"], "2024-02-01")
+        self.assertFalse(store.frescor_serie(433)["desatualizada"])
+
+    def test_falha_recente_nao_gera_nova_tentativa(self):
+        chamadas = []
+
+        def buscar(*args):
+            chamadas.append(args)
+            raise requests.exceptions.ConnectionError("sem rede")
+
+        store.obter_serie(433, buscar, hoje=date(2024, 2, 15))
+        store.obter_serie(433, buscar, hoje=date(2024, 2, 15))
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(self.tarefas, [])
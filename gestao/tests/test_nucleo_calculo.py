@@ -0,0 +1,107 @@
+# gestao/tests/test_nucleo_calculo.py
+
+import json
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase
+
+from gestao import views
+from gestao.calculators import CalculadoraMonetaria
+from gestao.services.calculo import CalculoEngine
+from gestao.services.indices import fatores
+from gestao.services.indices.planner import IndicesPlanejados
+from gestao.services.indices.resolver import IndiceResolver
+from gestao.services.nucleo_calculo import NucleoCalculo
+
+IPCA = {"2024-01": Decimal("1.20"), "2024-02": Decimal("1.50"), "2024-03": Decimal("1.10")}
+FATOR = Decimal("1.012") * Decimal("1.015") * Decimal("1.011")
+
+
+def q2(x) -> Decimal:
+    return Decimal(x).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+class ServicoFalso:
+    def __init__(self):
+        self.buscas = []
+
+    def get_indices_por_periodo(self, chave, inicio, fim):
+        self.buscas.append((chave, inicio, fim))
+        return {k: v for k, v in IPCA.items() if f"{inicio:%Y-%m}" <= k <= f"{fim:%Y-%m}"}
+
+    def get_meta(self, chave):
+        return {"type": "monthly_variation"}
+
+    def frescor(self, chaves):
+        return {}
+
+
+class NucleoCalculoTest(SimpleTestCase):
+
+    def setUp(self):
+        fatores.limpar_tabelas()
+        self.servico = ServicoFalso()
+
+    def test_fator_uma_vez_por_faixa(self):
+        nucleo = NucleoCalculo(servico=self.servico)
+        nucleo.adicionar("IPCA", date(2024, 1, 1), date(2024, 3, 31))
+        nucleo.adicionar("IPCA", date(2024, 2, 10), date(2024, 3, 31))
+        nucleo.preparar()
+
+        for _ in range(3):
+            fator, lacunas, sem_dados = nucleo.fator("IPCA", "monthly_variation", date(2024, 1, 1), date(2024, 3, 31))
+        self.assertEqual(fator, FATOR)
+        self.assertEqual((lacunas, sem_dados), ([], False))
+        pro_rata = nucleo.fator("IPCA", "monthly_variation", date(2024, 2, 10), date(2024, 3, 31), pro_rata=True).fator
+        self.assertEqual(pro_rata, (1 + Decimal("0.015") / 29 * 20) * Decimal("1.011"))
+
+        self.assertEqual(self.servico.buscas, [("IPCA", date(2024, 1, 1), date(2024, 3, 31))])
+        self.assertEqual(nucleo.memo.como_dict(), {"faixas": 2, "acertos": 2, "falhas": 2})
+
+    def test_sem_dados_pela_cobertura_da_tabela(self):
+        nucleo = NucleoCalculo(servico=self.servico)
+        nucleo.adicionar("IPCA", date(2023, 10, 1), date(2024, 3, 31))
+        nucleo.preparar()
+
+        with patch.object(IndicesPlanejados, "get_indices_por_periodo") as recorte:
+            sem_dados = nucleo.fator("IPCA", "monthly_variation", date(2023, 10, 5), date(2023, 12, 20)).sem_dados
+            com_dados = nucleo.fator("IPCA", "monthly_variation", date(2023, 12, 5), date(2024, 1, 20)).sem_dados
+        recorte.assert_not_called()
+        self.assertEqual((sem_dados, com_dados), (True, False))
+
+    def test_quatro_pontos_de_entrada_chegam_ao_mesmo_valor(self):
+        esperado = q2(Decimal("1000.00") * FATOR)
+
+        with patch.object(CalculoEngine, "_buscar_indices",
+                          lambda _, chave, ini, fim: self.servico.get_indices_por_periodo(chave, ini, fim)):
+            motor = CalculoEngine({"parcelas": [{
+                "descricao": "P1", "valor_original": Decimal("1000.00"), "data_evento": date(2024, 1, 1),
+                "faixas": [{"indice": "IPCA", "data_inicio": date(2024, 1, 1), "data_fim": date(2024, 3, 31),
+                            "juros_tipo": "NENHUM", "juros_taxa_mensal": Decimal("0"), "pro_rata": False}],
+            }], "extras": {}}).run()
+        self.assertEqual(q2(motor["parcelas"][0]["valor_final"]), esperado)
+
+        resolver = IndiceResolver(self.servico).corrigir_parcelas({"parcelas": [{
+            "valor": "1000,00", "data_valor": "01/01/2024",
+            "faixas": [{"inicio": "01/01/2024", "fim": "31/03/2024", "indice": "IPCA"}],
+        }]})
+        self.assertEqual(Decimal(resolver["parcelas"][0]["faixas"][0]["fator"]), FATOR)
+
+        fase = SimpleNamespace(ordem=1, indice="IPCA", data_inicio=date(2024, 1, 1), data_fim=date(2024, 3, 31),
+                               juros_tipo=None, juros_taxa=None)
+        with patch("gestao.services.nucleo_calculo.get_servico_indices", return_value=self.servico):
+            calculadora = CalculadoraMonetaria().calcular_fases(Decimal("1000.00"), [fase])
+        self.assertEqual(calculadora["resumo"]["valor_final"], esperado)
+
+        request = RequestFactory().post("/", json.dumps({"parcelas": [{
+            "valor": "1000,00", "data_valor": "01/01/2024",
+            "faixas": [{"inicio": "01/01/2024", "fim": "31/03/2024", "indice": "IPCA"}],
+        }]}), content_type="application/json")
+        request.user = User(username="calculista")
+        with patch("gestao.views.get_servico_indices", return_value=self.servico):
+            resposta = json.loads(views.calculo_wizard_calcular(request).content)
+        self.assertEqual(resposta["total"], f"{esperado:.2f}")
@@ -0,0 +1,47 @@
+# gestao/tests/test_periodos.py
+
+import calendar
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.test import SimpleTestCase
+
+from gestao.services.periodos import MesPeriodo, mes_periodo, meses_periodo
+
+
+def meses_legado(inicio: date, fim: date):
+    """Laço mensal com relativedelta/monthrange/strftime, como os motores faziam."""
+    saida, d = [], inicio
+    while d <= fim:
+        dias_mes = calendar.monthrange(d.year, d.month)[1]
+        if inicio.strftime('%Y-%m') == fim.strftime('%Y-%m'):
+            dias = (fim - inicio).days + 1
+        elif d.year == inicio.year and d.month == inicio.month:
+            dias = dias_mes - inicio.day + 1
+        elif d.year == fim.year and d.month == fim.month:
+            dias = fim.day
+        else:
+            dias = dias_mes
+        saida.append((d.strftime('%Y-%m'), dias, dias_mes))
+        d = d.replace(day=1) + relativedelta(months=1)
+    return saida
+
+
+class MesesPeriodoTest(SimpleTestCase):
+
+    def test_exemplo(self):
+        self.assertEqual(meses_periodo(date(2024, 1, 15), date(2024, 3, 10)), (
+            MesPeriodo(24288, "2024-01", 17, 31),
+            MesPeriodo(24289, "2024-02", 29, 29),
+            MesPeriodo(24290, "2024-03", 10, 31),
+        ))
+        self.assertEqual(meses_periodo(date(2023, 2, 3), date(2023, 2, 20)), (MesPeriodo(24277, "2023-02", 18, 28),))
+
+    def test_equivale_ao_laco_mensal(self):
+        inicio = date(1999, 11, 7)
+        for i in range(300):
+            ini = inicio + timedelta(days=37 * i)
+            fim = ini + timedelta(days=(i * 53) % 900)
+            meses = meses_periodo(ini, fim)
+            self.assertEqual([(m.chave, m.dias_aplicados, m.dias_no_mes) for m in meses], meses_legado(ini, fim))
+            self.assertEqual(mes_periodo(meses[-1].ordinal, ini, fim), meses[-1])
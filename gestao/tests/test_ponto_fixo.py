@@ -0,0 +1,136 @@
+# gestao/tests/test_ponto_fixo.py
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from gestao.calculators import CalculadoraMonetaria
+from gestao.services import ponto_fixo
+from gestao.services.calculo import CalculoEngine
+from gestao.services.indices import fatores
+from gestao.services.indices.resolver import IndiceResolver
+
+TIPOS = {"IPCA": "monthly_variation", "SELIC_DIARIA": "daily_rate"}
+
+
+def q2(x) -> Decimal:
+    return Decimal(x).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def series_longas():
+    """IPCA mensal e SELIC diária (dias úteis) de 1995 a 2024, sintéticos."""
+    aleatorio = random.Random(2024)
+    ipca = {f"{ano:04d}-{mes:02d}": Decimal(aleatorio.randint(-50, 200)) / 100
+            for ano in range(1995, 2025) for mes in range(1, 13)}
+    selic, dia, taxa = {}, date(1995, 1, 1), Decimal("0.055131")
+    while dia <= date(2024, 12, 31):
+        if dia.weekday() < 5:
+            if aleatorio.random() < 1 / 30:  # a taxa muda a cada reunião do Copom
+                taxa = Decimal(aleatorio.randint(15000, 65000)) / 1000000
+            selic[dia.isoformat()] = taxa
+        dia += timedelta(days=1)
+    return {"IPCA": ipca, "SELIC_DIARIA": selic}
+
+
+SERIES = series_longas()
+
+
+class ServicoFalso:
+    def get_indices_por_periodo(self, chave, inicio, fim):
+        if TIPOS[chave] == "daily_rate":
+            k0, k1 = inicio.isoformat(), fim.isoformat()
+        else:
+            k0, k1 = f"{inicio:%Y-%m}", f"{fim:%Y-%m}"
+        return {k: v for k, v in SERIES[chave].items() if k0 <= k <= k1}
+
+    def get_meta(self, chave):
+        return {"type": TIPOS[chave]}
+
+    def frescor(self, chaves):
+        return {}
+
+
+class PontoFixoTest(SimpleTestCase):
+
+    def test_conversoes_e_arredondamento(self):
+        self.assertEqual(ponto_fixo.fator_percentual(Decimal("0")), ponto_fixo.ESCALA)
+        self.assertEqual(ponto_fixo.fator_percentual(Decimal("50")), 3 * ponto_fixo.ESCALA // 2)
+        self.assertEqual(ponto_fixo.fator_percentual(Decimal("-100")), 0)
+        # 1 + 0.42/100 arredondado uma única vez na escala
+        self.assertEqual(ponto_fixo.fator_percentual(Decimal("0.42")),
+                         round(Fraction("1.0042") * ponto_fixo.ESCALA))
+        # Metade para cima no último bit
+        self.assertEqual(ponto_fixo.multiplicar(3, ponto_fixo.ESCALA // 2), 2)
+        self.assertEqual(ponto_fixo.multiplicar(1, ponto_fixo.ESCALA // 2), 1)
+
+    def test_tabela_em_ponto_fixo(self):
+        variacoes = {"2024-01": Decimal("1.20"), "2024-02": Decimal("1.50"), "2024-03": Decimal("1.10")}
+        tabela = fatores.NumeroIndiceMensal(ponto_fixo=True)
+        tabela.atualizar(variacoes, fatores.ordinal_chave_mes("2024-01"), fatores.ordinal_chave_mes("2024-03"))
+        fator = tabela.fator(fatores.ordinal_chave_mes("2024-01"), fatores.ordinal_chave_mes("2024-03"))
+        self.assertIsInstance(fator, Decimal)
+        self.assertLess(abs(fator - Decimal("1.012") * Decimal("1.015") * Decimal("1.011")), Decimal("1e-17"))
+
+
+class PontoFixoParidadeTest(SimpleTestCase):
+    """Os três motores chegam ao mesmo centavo com as tabelas em Decimal ou em ponto fixo."""
+
+    def setUp(self):
+        self.addCleanup(fatores.limpar_tabelas)
+
+    def _calcular(self, ponto_fixo_ligado):
+        fatores.limpar_tabelas()
+        servico = ServicoFalso()
+        with override_settings(GESTAO_CALCULO_PONTO_FIXO=ponto_fixo_ligado):
+            parcelas = []
+            for i in range(60):
+                inicio = date(1995 + i % 25, 1 + i % 12, 1 + i % 28)
+                citacao = min(inicio + timedelta(days=400 + 97 * i), date(2024, 6, 28))
+                parcelas.append({
+                    "descricao": f"P{i}", "valor_original": Decimal(1000 + 37 * i) + Decimal(i) / 100,
+                    "data_evento": inicio,
+                    "faixas": [
+                        {"indice": "IPCA", "data_inicio": inicio, "data_fim": citacao, "juros_tipo": "SIMPLES",
+                         "juros_taxa_mensal": Decimal("1"), "pro_rata": bool(i % 2)},
+                        {"indice": "SELIC_DIARIA", "data_inicio": citacao + timedelta(days=1),
+                         "data_fim": date(2024, 12, 31), "juros_tipo": "NENHUM",
+                         "juros_taxa_mensal": Decimal("0"), "pro_rata": False, "modo_selic_exclusiva": True},
+                    ],
+                })
+            with patch.object(CalculoEngine, "_buscar_indices",
+                              lambda _, chave, ini, fim: servico.get_indices_por_periodo(chave, ini, fim)):
+                motor = CalculoEngine({"parcelas": parcelas, "extras": {}}).run()
+
+            resolver = IndiceResolver(servico).corrigir_parcelas({"parcelas": [{
+                "valor": "123456,78", "data_valor": "15/03/1996",
+                "faixas": [{"inicio": "15/03/1996", "fim": "10/08/2009", "indice": "IPCA"},
+                           {"inicio": "11/08/2009", "fim": "31/12/2024", "indice": "SELIC_DIARIA"}],
+            }]})
+
+            fases = [SimpleNamespace(ordem=1, indice="SELIC_DIARIA", data_inicio=date(2000, 1, 3),
+                                     data_fim=date(2024, 12, 31), juros_tipo=None, juros_taxa=None)]
+            with patch("gestao.services.nucleo_calculo.get_servico_indices", return_value=servico):
+                calculadora = CalculadoraMonetaria().calcular_fases(Decimal("98765.43"), fases)
+
+        return motor, resolver, calculadora
+
+    def test_paridade_ao_centavo(self):
+        motor_dec, resolver_dec, calculadora_dec = self._calcular(False)
+        motor_pf, resolver_pf, calculadora_pf = self._calcular(True)
+        self.assertTrue(fatores._tabelas and all(tabela.ponto_fixo for tabela in fatores._tabelas.values()))
+
+        self.assertFalse([p for p in motor_dec["parcelas"] if p["descricao"].startswith("ERRO")])
+        for dec, pf in zip(motor_dec["parcelas"], motor_pf["parcelas"]):
+            for campo in ("correcao_total", "juros_total", "valor_final"):
+                self.assertEqual(q2(pf[campo]), q2(dec[campo]), f"{dec['descricao']}: {campo}")
+        self.assertEqual(q2(motor_pf["resumo"]["total_geral"]), q2(motor_dec["resumo"]["total_geral"]))
+        self.assertTrue(resolver_dec["ok"], resolver_dec["erros"])
+        self.assertEqual(resolver_pf["totais"], resolver_dec["totais"])
+        self.assertEqual(resolver_pf["parcelas"][0]["valor_final"], resolver_dec["parcelas"][0]["valor_final"])
+        self.assertEqual(calculadora_pf["resumo"]["valor_final"], calculadora_dec["resumo"]["valor_final"])
+        self.assertGreater(calculadora_dec["resumo"]["valor_final"], Decimal("98765.43") * 5)
@@ -0,0 +1,92 @@
+# gestao/tests/test_revisoes.py
+
+import copy
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from gestao.models import CalculoRascunho, ObservacaoIndice, RevisaoIndice, SerieIndice
+from gestao.services import revisoes
+from gestao.services.calculo import executar_calculo
+from gestao.services.indices import store
+from gestao.services.indices.providers import BacenSGSProvider
+from gestao.tests.utils import IndicesIsoladosMixin, payload_ipca
+
+IPCA = {"2023-01-01": Decimal("0.53"), "2023-02-01": Decimal("0.84"), "2023-03-01": Decimal("0.71"),
+        "2024-01-01": Decimal("0.42"), "2024-02-01": Decimal("0.83"), "2024-03-01": Decimal("0.16")}
+
+
+class RevisaoIndicesTest(IndicesIsoladosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.dados = dict(IPCA)
+        self.semear_serie(self.dados)
+
+    def _salvar_rascunho(self, inicio, fim):
+        resultados = executar_calculo(payload_ipca(inicio, fim))
+        rascunho = CalculoRascunho.objects.create(descricao=f"{inicio}..{fim}", ultimo_resultado_json=resultados)
+        revisoes.registrar_dependencias(rascunho, resultados["dependencias_indices"])
+        return rascunho
+
+    def _sincronizar_no_dia_seguinte(self):
+        return self.sincronizar_no_dia_seguinte(segundo_plano=lambda tarefa: tarefa())
+
+    def test_revisao_versiona_a_serie(self):
+        self.dados["2024-02-01"] = Decimal("0.86")
+        self.dados["2024-04-01"] = Decimal("0.38")
+        self.assertEqual(self._sincronizar_no_dia_seguinte(), 1)
+
+        serie = SerieIndice.objects.get(serie_id=433)
+        self.assertEqual(serie.versao, 1)
+        revisao = RevisaoIndice.objects.get(serie=serie)
+        self.assertEqual((revisao.data_inicio, revisao.data_fim, revisao.observacoes),
+                         (date(2024, 2, 1), date(2024, 2, 1), 1))
+        self.assertEqual(ObservacaoIndice.objects.get(serie=serie, data=date(2024, 2, 1)).valor, Decimal("0.86"))
+
+        # Sem mudanças, a versão não muda
+        self._sincronizar_no_dia_seguinte()
+        self.assertEqual(SerieIndice.objects.get(serie_id=433).versao, 1)
+
+    def test_apenas_rascunhos_afetados_sao_recalculados(self):
+        afetado = self._salvar_rascunho("2024-01-15", "2024-03-31")
+        intocado = self._salvar_rascunho("2023-01-01", "2023-03-31")
+        self.assertEqual(afetado.dependencias_indices.get().indice, "IPCA")
+        resultado_intocado = copy.deepcopy(CalculoRascunho.objects.get(pk=intocado.pk).ultimo_resultado_json)
+        valor_antes = Decimal(afetado.ultimo_resultado_json["resumo"]["total_geral"])
+
+        self.dados["2024-02-01"] = Decimal("1.83")
+        self._sincronizar_no_dia_seguinte()
+
+        afetado.refresh_from_db()
+        self.assertFalse(afetado.resultado_desatualizado)
+        self.assertAlmostEqual(Decimal(afetado.ultimo_resultado_json["resumo"]["total_geral"]) / valor_antes,
+                               Decimal("1.0183") / Decimal("1.0083"), places=10)
+        self.assertEqual(CalculoRascunho.objects.get(pk=intocado.pk).ultimo_resultado_json, resultado_intocado)
+
+    def test_comando_recalcula_sem_agendar_em_segundo_plano(self):
+        rascunho = self._salvar_rascunho("2024-01-15", "2024-03-31")
+        self.dados["2024-02-01"] = Decimal("1.83")
+        SerieIndice.objects.update(sincronizado_em=timezone.now() - timedelta(days=1))
+
+        segundo_plano, saida = MagicMock(), StringIO()
+        # Fora do TestCase, o commit de cada série acontece dentro do comando
+        with patch.object(store, "executar_em_segundo_plano", segundo_plano), \
+                patch.object(BacenSGSProvider, "_fetch_from_api", lambda _, sid, ini, fim: self.buscar(sid, ini, fim)), \
+                patch.object(store.transaction, "on_commit", lambda funcao, **kwargs: funcao()):
+            call_command("sincronizar_indices", "IPCA", stdout=saida)
+
+        segundo_plano.assert_not_called()
+        self.assertIn("1 rascunho(s) recalculado(s)", saida.getvalue())
+        rascunho.refresh_from_db()
+        self.assertFalse(rascunho.resultado_desatualizado)
+
+    def test_revisao_de_competencia_afeta_o_mes_inteiro(self):
+        self.assertEqual(revisoes.chaves_afetadas(433, date(2024, 2, 1), date(2024, 2, 1)),
+                         {"IPCA": (date(2024, 2, 1), date(2024, 2, 29)),
+                          "IPCA_12M": (date(2024, 2, 1), date(2025, 1, 31))})
@@ -0,0 +1,46 @@
+# gestao/tests/test_tabela_compilada.py
+
+import os
+from datetime import date
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from gestao.services.indices import tabela_compilada
+from gestao.services.indices.providers import StaticTableProvider
+from gestao.tests.utils import IndicesIsoladosMixin
+
+CSV_TJSP = "data;fator\n01/02/2024;71,12345678901\n01/01/2024;70,98765432100\n01/03/2024;71,2\n"
+
+
+class TabelaCompiladaTest(IndicesIsoladosMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pasta = self.usar_pasta_de_dados({"tabela_tjsp.csv": CSV_TJSP})
+        self.csv = self.pasta / "tabela_tjsp.csv"
+
+    def _consultar(self, inicio=date(2024, 1, 1), fim=date(2024, 12, 31)):
+        return StaticTableProvider().get_indices(inicio, fim, params={"filename": "tabela_tjsp.csv"})
+
+    def test_compila_ordenado_e_sem_perda_de_precisao(self):
+        self.assertEqual(self._consultar(), {
+            "2024-01": Decimal("70.98765432100"), "2024-02": Decimal("71.12345678901"), "2024-03": Decimal("71.2"),
+        })
+        self.assertEqual(self._consultar(date(2024, 2, 15), date(2024, 2, 20)), {"2024-02": Decimal("71.12345678901")})
+
+        tabela = tabela_compilada.tabela_compilada(self.csv, lambda p: {})
+        self.assertEqual(list(tabela.ordinais), sorted(tabela.ordinais))
+        self.assertTrue((self.pasta / "tabela_tjsp.csv.gtab").exists())
+
+    def test_recompila_quando_o_csv_muda(self):
+        self._consultar()
+        self.csv.write_text(CSV_TJSP + "01/04/2024;71,5\n", encoding="utf-8")
+        self.assertEqual(self._consultar(date(2024, 4, 1), date(2024, 4, 30)), {"2024-04": Decimal("71.5")})
+
+        # Mesmo tamanho e mtime, conteúdo diferente: detectado pelo hash ao reabrir
+        st = self.csv.stat()
+        self.csv.write_text(CSV_TJSP + "01/04/2024;71,6\n", encoding="utf-8")
+        os.utime(self.csv, ns=(st.st_atime_ns, st.st_mtime_ns))
+        tabela_compilada.fechar_tabelas()
+        self.assertEqual(self._consultar(date(2024, 4, 1), date(2024, 4, 30)), {"2024-04": Decimal("71.6")})
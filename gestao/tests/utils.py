@@ -0,0 +1,96 @@
+# gestao/tests/utils.py
+
+"""
+Apoio comum aos testes de índices e de cálculos: isolamento do registro de providers,
+séries semeadas no armazenamento local, pasta de tabelas estáticas e payloads do wizard.
+"""
+
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict
+from unittest.mock import MagicMock, patch
+
+from django.utils import timezone
+
+from gestao.models import SerieIndice
+from gestao.services.indices import pacote, store
+from gestao.services.indices.providers import reset_providers
+
+# Série do IPCA no SGS
+SERIE_IPCA = 433
+
+
+class BuscadorFalso:
+    """Simula a API do SGS sobre `dados` ({'YYYY-MM-DD': valor}), registrando cada janela consultada."""
+
+    def __init__(self, dados):
+        self.dados = dados
+        self.chamadas = []
+
+    def __call__(self, serie_id, inicio, fim):
+        self.chamadas.append((serie_id, inicio, fim))
+        return {k: v for k, v in self.dados.items() if inicio.isoformat() <= k <= fim.isoformat()}
+
+
+def provider_falso(valores) -> MagicMock:
+    """Provider (MagicMock) cujo `get_indices` devolve sempre `valores`."""
+    provider = MagicMock()
+    provider.get_indices.return_value = valores
+    return provider
+
+
+def payload_ipca(inicio: str, fim: str, valor_original: str = "1000.00", **faixa) -> dict:
+    """Payload do wizard com uma parcela e uma faixa de IPCA (sem juros, salvo `faixa`)."""
+    return {
+        "global": {}, "extras": {},
+        "parcelas": [{
+            "descricao": "Parcela 1", "valor_original": valor_original, "data_evento": inicio,
+            "faixas": [dict({"indice": "IPCA", "data_inicio": inicio, "data_fim": fim, "juros_tipo": "NENHUM",
+                             "juros_taxa_mensal": "0", "pro_rata": False}, **faixa)],
+        }],
+    }
+
+
+class IndicesIsoladosMixin:
+    """
+    Cada teste parte do registro de providers limpo (séries em memória, tabelas de
+    fatores, derivadas, métricas) e o deixa limpo ao terminar.
+    """
+
+    def setUp(self):
+        super().setUp()
+        reset_providers()
+        self.addCleanup(reset_providers)
+
+    def semear_serie(self, dados: Dict, serie_id: int = SERIE_IPCA) -> BuscadorFalso:
+        """Sincroniza a série a partir de `dados`; alterações posteriores em `self.buscar.dados` simulam a fonte."""
+        self.buscar = BuscadorFalso(dados)
+        store.sincronizar_serie(serie_id, self.buscar)
+        return self.buscar
+
+    def sincronizar_no_dia_seguinte(self, serie_id: int = SERIE_IPCA, segundo_plano=lambda tarefa: None) -> int:
+        """
+        Sincroniza de novo como se a anterior tivesse sido ontem, entregando `serie_revisada`.
+        `segundo_plano` recebe o recálculo agendado (padrão: descartado).
+        """
+        SerieIndice.objects.filter(serie_id=serie_id).update(sincronizado_em=timezone.now() - timedelta(days=1))
+        with patch.object(store, "executar_em_segundo_plano", segundo_plano), \
+                self.captureOnCommitCallbacks(execute=True):
+            return store.sincronizar_serie(serie_id, self.buscar)
+
+    def gravar_series_sincronizadas(self, series) -> None:
+        """Grava {serie_id: [(data ISO, valor)]} no banco, como se sincronizadas agora (sem API)."""
+        pacote.gravar_series(series)
+        SerieIndice.objects.update(sincronizado_em=timezone.now())
+
+    def usar_pasta_de_dados(self, arquivos: Dict[str, str]) -> Path:
+        """Pasta temporária com os arquivos das tabelas estáticas, no lugar de `data/`."""
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        for nome, conteudo in arquivos.items():
+            (Path(pasta.name) / nome).write_text(conteudo, encoding="utf-8")
+        patcher = patch("gestao.services.indices.providers._project_data_dir", return_value=Path(pasta.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return Path(pasta.name)
@@ -85,8 +85,10 @@ urlpatterns = [
     path('calculos/novo/', views.calculo_wizard_view, name='calculo_novo'),
     path('calculos/novo/processo/<int:processo_pk>/', views.calculo_wizard_view, name='calculo_novo_com_processo'),
     path('api/calculos/simular/', views.simular_calculo_api, name='api_simular_calculo'),
+    path('api/calculos/<int:pk>/atualizar/', views.atualizar_rascunho_api, name='api_atualizar_calculo'),
     path('api/indices/catalogo/', views.api_indices_catalogo, name='api_indices_catalogo'),
     path('api/indices/valores/', views.api_indices_valores, name='api_indices_valores'),
+    path('api/indices/metricas/', views.api_indices_metricas, name='api_indices_metricas'),
 
     # --- Importação Projudi ---
     path('importacao/projudi/', views.importacao_projudi_view, name='importacao_projudi'),
@@ -8,6 +8,7 @@
 from __future__ import annotations
 
 # --- Standard Library ---
+import hashlib
 import json
 import logging
 import locale
@@ -50,6 +51,8 @@ from django.template import Context, Template
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.http import require_POST
 #from weasyprint import HTML
 from decimal import Decimal, ROUND_HALF_UP
@@ -81,7 +84,10 @@ from .models import (
 from .services.indices.catalog import INDICE_CATALOG, public_catalog_for_api
 from .services.indices.resolver import ServicoIndices, calcular
 from .nfse_service import NFSEService
-from .services.calculo import CalculoEngine
+from .services.cache_resultados import resultado_em_cache
+from .services.calculo import atualizar_calculo, executar_calculo
+from .services.calendario import get_calendario
+from .services.revisoes import registrar_dependencias
 from .utils import data_por_extenso, valor_por_extenso
 from decimal import InvalidOperation
 
@@ -92,8 +98,11 @@ from django.http import  HttpRequest
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 
-from .services.indices.providers import ServicoIndices
-from .services.indices.catalog import INDICE_CATALOG
+from .services.indices.providers import ServicoIndices, get_servico_indices
+from .services.indices.catalog import INDICE_CATALOG, public_catalog_snapshot
+from .services.indices import metricas
+from .services.indices.planner import planejar
+from .services.nucleo_calculo import NucleoCalculo
 
 # ==============================================================================
 # CONFIGURAÇÕES E CONSTANTES GLOBAIS
@@ -234,7 +243,7 @@ def _perform_calculation(dados):
     """
     try:
         indice_selecionado_display = dict(CalculoForm.INDICE_CHOICES).get(dados['indice'])
-        servico_indices = ServicoIndices()
+        servico_indices = get_servico_indices()
         indices_periodo = servico_indices.get_indices_por_periodo(
             dados['indice'], dados['data_inicio'], dados['data_fim']
         )
@@ -582,6 +591,10 @@ def detalhe_processo(request, pk):
         'todos_modelos': ModeloDocumento.objects.all().order_by('titulo'),
         'form_movimentacao': MovimentacaoForm(initial={'responsavel': request.user}),
         'dados_tipos_movimentacao_json': json.dumps(dados_tipos_movimentacao),
+        'dias_sem_expediente_json': json.dumps([
+            d.isoformat() for d in get_calendario().dias_sem_expediente(date(today.year - 1, 1, 1),
+                                                                       date(today.year + 1, 12, 31))
+        ]),
         'form_recurso': RecursoForm(),
         'form_incidente': IncidenteForm(),
         'form_pagamento': PagamentoForm(),
@@ -3078,94 +3091,21 @@ def simular_calculo_api(request):
     Esta view agora atua como um 'gatekeeper', garantindo 100% da integridade dos dados.
     """
 
-    def _to_decimal(value, field_name="Valor"):
-        """Função utilitária robusta para conversão de string para Decimal."""
-        if value is None or str(value).strip() == '':
-            return Decimal('0.00')
-
-        s_value = str(value).strip()
-        if ',' in s_value:
-            s_value = s_value.replace('.', '').replace(',', '.')
-
-        try:
-            return Decimal(s_value)
-        except InvalidOperation:
-            raise ValueError(f"{field_name} inválido: '{value}' não é um número válido.")
-
-    def _sanitize_and_validate_payload(payload):
-        """
-        Valida e normaliza rigorosamente o payload. Levanta ValueError em caso de falha.
-        """
-        if not isinstance(payload, dict):
-            raise ValueError("O corpo da requisição deve ser um objeto JSON.")
-
-        # Valida parcelas
-        parcelas = payload.get("parcelas")
-        if not parcelas or not isinstance(parcelas, list):
-            raise ValueError("É necessário fornecer pelo menos uma parcela para o cálculo.")
-
-        for i, p_data in enumerate(parcelas):
-            p_num = i + 1
-            p_data["descricao"] = p_data.get("descricao") or f"Parcela {p_num}"
-            p_data["valor_original"] = _to_decimal(p_data.get("valor_original"), f"Valor original da Parcela {p_num}")
-
-            try:
-                p_data["data_evento"] = date.fromisoformat(p_data.get("data_evento"))
-            except (TypeError, ValueError):
-                raise ValueError(
-                    f"Parcela {p_num}: Data do valor é inválida ou está ausente. Use o formato AAAA-MM-DD.")
-
-            if not p_data.get("faixas"):
-                raise ValueError(f"Parcela {p_num}: Nenhuma faixa de cálculo foi definida.")
-
-            for j, f_data in enumerate(p_data["faixas"]):
-                f_num = j + 1
-                try:
-                    f_data["data_inicio"] = date.fromisoformat(f_data.get("data_inicio"))
-                    f_data["data_fim"] = date.fromisoformat(f_data.get("data_fim"))
-                except (TypeError, ValueError):
-                    raise ValueError(
-                        f"Parcela {p_num}, Faixa {f_num}: Datas de início/fim são inválidas ou ausentes. Use AAAA-MM-DD.")
-
-                if f_data["data_inicio"] > f_data["data_fim"]:
-                    raise ValueError(
-                        f"Parcela {p_num}, Faixa {f_num}: A data de início não pode ser posterior à data de fim.")
-
-                f_data["juros_taxa_mensal"] = _to_decimal(f_data.get("juros_taxa_mensal"),
-                                                          f"Taxa de juros da Faixa {f_num}")
-
-        # Valida extras
-        extras = payload.get("extras", {})
-        if isinstance(extras, dict):
-            extras["multa_percentual"] = _to_decimal(extras.get("multa_percentual"), "Percentual de multa")
-            extras["honorarios_percentual"] = _to_decimal(extras.get("honorarios_percentual"),
-                                                          "Percentual de honorários")
-
-        return payload
-
     try:
         raw_payload = json.loads(request.body)
-        sanitized_payload = _sanitize_and_validate_payload(raw_payload)
+        resultados = resultado_em_cache("simular", raw_payload, executar_calculo)
+        form_data = resultados['form_data']
 
-        engine = CalculoEngine(sanitized_payload)
-        resultados = engine.run()
-
-        processo_numero = sanitized_payload.get('global', {}).get('numero_processo')
+        processo_numero = form_data.get('global', {}).get('numero_processo')
         processo = Processo.objects.filter(numero_processo=processo_numero).first() if processo_numero else None
 
-        resultados['form_data'] = sanitized_payload
-        for parcela in resultados['form_data']['parcelas']:
-            parcela['data_evento'] = parcela['data_evento'].isoformat()
-            for faixa in parcela['faixas']:
-                faixa['data_inicio'] = faixa['data_inicio'].isoformat()
-                faixa['data_fim'] = faixa['data_fim'].isoformat()
-
         rascunho = CalculoRascunho.objects.create(
             processo=processo,
-            descricao=sanitized_payload.get('global', {}).get('observacoes') or "Cálculo gerado pelo Wizard",
+            descricao=form_data.get('global', {}).get('observacoes') or "Cálculo gerado pelo Wizard",
             usuario_criacao=request.user,
             ultimo_resultado_json=resultados
         )
+        registrar_dependencias(rascunho, resultados['dependencias_indices'])
 
         return JsonResponse({
             'status': 'success',
@@ -3179,42 +3119,52 @@ def simular_calculo_api(request):
         return JsonResponse({'status': 'error', 'message': f'Ocorreu um erro inesperado no servidor.'}, status=500)
 
 
+
+@require_POST
 @login_required
-def api_indices_catalogo(request):
+def atualizar_rascunho_api(request, pk):
     """
-    Retorna o catálogo de índices econômicos disponíveis para o frontend.
+    "Atualizar até hoje": avança o último resultado do rascunho até `data_final`
+    (padrão: hoje), reaproveitando os checkpoints das parcelas. Um resultado marcado
+    como desatualizado (série revisada) é recalculado por inteiro.
     """
+    rascunho = get_object_or_404(CalculoRascunho, pk=pk)
+    anterior = rascunho.ultimo_resultado_json or {}
+    if not anterior.get('form_data'):
+        return JsonResponse({'status': 'error', 'message': 'O rascunho não tem cálculo salvo.'}, status=400)
+
     try:
-        indices = public_catalog_for_api()
-        return JsonResponse({"indices": indices})
+        corpo = json.loads(request.body or b'{}')
+        data_final = date.fromisoformat(corpo['data_final']) if corpo.get('data_final') else timezone.localdate()
+        resultados = atualizar_calculo(anterior, data_final, reaproveitar=not rascunho.resultado_desatualizado)
+    except (json.JSONDecodeError, ValueError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
     except Exception as e:
-        logger.error(f"Erro ao buscar o catálogo de índices: {e}", exc_info=True)
-        return JsonResponse({"error": "Não foi possível carregar o catálogo de índices."}, status=500)
+        logger.error(f"Erro inesperado ao atualizar o rascunho {pk}: {e}", exc_info=True)
+        return JsonResponse({'status': 'error', 'message': f'Ocorreu um erro inesperado no servidor.'}, status=500)
 
+    # Só a gravação fica na transação: a sincronização de índices e o cálculo acima não
+    # devem segurar travas do banco.
+    rascunho.ultimo_resultado_json = resultados
+    rascunho.resultado_desatualizado = False
+    with transaction.atomic():
+        rascunho.save(update_fields=['ultimo_resultado_json', 'resultado_desatualizado', 'data_modificacao'])
+        registrar_dependencias(rascunho, resultados['dependencias_indices'])
+    return JsonResponse({'status': 'success', 'data': resultados, 'rascunho_pk': rascunho.pk})
 
-@login_required
-def api_indices_valores(request):
+def _resposta_condicional(request: HttpRequest, response: HttpResponse, max_age: int,
+                          etag: str | None = None, last_modified=None) -> HttpResponse:
     """
-    Retorna os valores de um índice específico em um período.
+    Aplica ETag (hash do conteúdo, se não informado), Last-Modified e Cache-Control
+    privado à resposta; devolve 304 se o cliente já tiver a mesma versão.
     """
-    nome = request.GET.get("indice")
-    ini = request.GET.get("inicio")
-    fim = request.GET.get("fim")
-    if not (nome and ini and fim):
-        return HttpResponseBadRequest("Parâmetros obrigatórios: indice, inicio, fim (YYYY-MM-DD).")
-
-    try:
-        data_inicio = date.fromisoformat(ini)
-        data_fim = date.fromisoformat(fim)
-    except Exception:
-        return HttpResponseBadRequest("Datas inválidas (use YYYY-MM-DD).")
-
-    svc = ServicoIndices()
-    try:
-        valores = svc.get_indices_por_periodo(nome, data_inicio, data_fim)
-        return JsonResponse({"indice": nome, "valores": valores})
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=400)
+    etag = quote_etag(etag or hashlib.sha256(response.content).hexdigest()[:32])
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, max_age=max_age)
+    return get_conditional_response(request, etag=etag, last_modified=last_modified and last_modified.timestamp(),
+                                    response=response)
 
 
 @login_required
@@ -3222,20 +3172,23 @@ def api_indices_catalogo(request: HttpRequest):
     """
     Retorna o catálogo de índices econômicos disponíveis para o frontend.
     Esta view é essencial para o funcionamento do Wizard de Cálculo.
+    O catálogo é serializado uma vez por processo e validado por ETag/Last-Modified.
     """
     try:
-        # A função public_catalog_for_api() está em gestao/services/indices/catalog.py
-        indices = public_catalog_for_api()
-        return JsonResponse({"indices": indices})
+        catalogo = public_catalog_snapshot()
     except Exception as e:
         logger.error(f"Erro ao buscar o catálogo de índices: {e}", exc_info=True)
         return JsonResponse({"error": "Não foi possível carregar o catálogo de índices."}, status=500)
+    response = HttpResponse(catalogo.content, content_type="application/json")
+    return _resposta_condicional(request, response, max_age=3600, etag=catalogo.etag,
+                                 last_modified=catalogo.last_modified)
 
 
 @login_required
 def api_indices_valores(request: HttpRequest):
     """
-    (Opcional/Futuro) Retorna os valores de um índice específico em um período.
+    Retorna os valores de um índice específico em um período.
+    Com `formato=colunas`, devolve arrays paralelos (`datas`, `valores`) em vez de um objeto.
     """
     nome = request.GET.get("indice")
     ini = request.GET.get("inicio")
@@ -3249,13 +3202,33 @@ def api_indices_valores(request: HttpRequest):
     except Exception:
         return HttpResponseBadRequest("Datas inválidas (use YYYY-MM-DD).")
 
-    svc = ServicoIndices()
+    svc = get_servico_indices()
     try:
         valores = svc.get_indices_por_periodo(nome, data_inicio, data_fim)
-        return JsonResponse({"indice": nome, "valores": valores})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
+    if request.GET.get("formato") == "colunas":
+        chaves = sorted(valores)
+        payload = {"indice": nome, "formato": "colunas", "datas": chaves, "valores": [str(valores[k]) for k in chaves]}
+    else:
+        payload = {"indice": nome, "valores": valores}
+    # As séries são sincronizadas no máximo uma vez por dia.
+    return _resposta_condicional(request, JsonResponse(payload), max_age=300)
+
+
+@staff_member_required
+def api_indices_metricas(request: HttpRequest):
+    """
+    Métricas dos provedores de índices do worker que atendeu a requisição (contadores,
+    histogramas de latência, volume por série) e o estado das séries no armazenamento local.
+    """
+    dados = {"armazenamento": metricas.estado_armazenamento(), **metricas.snapshot()}
+    response = JsonResponse(dados)
+    patch_cache_control(response, no_store=True)
+    return response
+
+
 def _to_decimal_br(v):
     """
     Converte '1.234,56' ou '1234.56' em Decimal('1234.56').
@@ -3381,7 +3354,18 @@ def calculo_wizard_calcular(request: HttpRequest):
     if not parcelas:
         return JsonResponse({"ok": False, "erro": "Inclua ao menos uma parcela."}, status=400)
 
-    svc = ServicoIndices()
+    nucleo = NucleoCalculo(servico=get_servico_indices())
+
+    # Busca cada índice uma única vez, no período que cobre todas as faixas que o usam
+    for p in parcelas:
+        for f in p.get("faixas") or []:
+            indice_key = (f.get("indice") or "").strip()
+            try:
+                if indice_key in INDICE_CATALOG:
+                    nucleo.adicionar(indice_key, _parse_date_smart(f.get("inicio", "")), _parse_date_smart(f.get("fim", "")))
+            except ValueError:
+                continue
+    nucleo.preparar()
 
     total_corrigido = Decimal("0")
     resultado_parcelas: List[Dict[str, Any]] = []
@@ -3420,35 +3404,20 @@ def calculo_wizard_calcular(request: HttpRequest):
                         status=400,
                     )
 
+                # aplicação de exemplo
+                tipo = INDICE_CATALOG[indice_key].get("type", "daily_rate")
                 try:
-                    indices = svc.get_indices_por_periodo(indice_key, inicio, fim)
+                    if tipo == "monthly_variation":
+                        # Π (1 + var/100) das competências, pelo número-índice da série
+                        fator = nucleo.fator(indice_key, tipo, inicio, fim).fator
+                    else:
+                        fator = nucleo.fator_taxas_anuais(indice_key, inicio, fim)
                 except Exception as e:
                     return JsonResponse(
                         {"ok": False, "erro": f"Parcela {idx}, faixa {j}: falha ao obter índice ({e})."},
                         status=400,
                     )
-
-                # aplicação de exemplo
-                tipo = INDICE_CATALOG[indice_key].get("type", "daily_rate")
-                if tipo == "monthly_variation":
-                    fator = Decimal("1")
-                    for k in sorted(indices.keys()):
-                        try:
-                            var = (indices[k] or Decimal("0")) / Decimal("100")
-                        except Exception:
-                            var = Decimal("0")
-                        fator *= (Decimal("1") + var)
-                    valor_corrigido = (valor_corrigido * fator).quantize(Decimal("0.01"))
-                else:
-                    fator = Decimal("1")
-                    for k in sorted(indices.keys()):
-                        try:
-                            taxa_aa = (indices[k] or Decimal("0")) / Decimal("100")
-                            taxa_dia = taxa_aa / Decimal("252")
-                            fator *= (Decimal("1") + taxa_dia)
-                        except Exception:
-                            continue
-                    valor_corrigido = (valor_corrigido * fator).quantize(Decimal("0.01"))
+                valor_corrigido = (valor_corrigido * fator).quantize(Decimal("0.01"))
 
             # extras (passo 3)
             def _to_dec(x) -> Decimal:
@@ -3481,8 +3450,11 @@ def calculo_wizard_calcular(request: HttpRequest):
         # garante JSON legível em qualquer erro não previsto
         return JsonResponse({"ok": False, "erro": f"Falha inesperada: {e}"}, status=400)
 
-    return JsonResponse({"ok": True, "total": f"{total_corrigido:.2f}", "parcelas": resultado_parcelas})
+    return JsonResponse({
+        "ok": True, "total": f"{total_corrigido:.2f}", "parcelas": resultado_parcelas,
+        "frescor_indices": nucleo.frescor(),
+    })
 
 def ajax_calcular(request):
     data = json.loads(request.body.decode('utf-8'))
-    return JsonResponse(calcular(data), safe=False)
+    return JsonResponse(resultado_em_cache("resolver", data, calcular), safe=False)